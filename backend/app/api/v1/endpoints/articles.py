@@ -1,26 +1,486 @@
-from fastapi import APIRouter
+from typing import Any, Optional, FrozenSet
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+import json
+import structlog
 
+from app.core.cache import TTLCache
+from app.core.compression import compress_variants, negotiated_encoding, precompressed_response
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.http_cache import encoded_etag, latest, make_etag, is_not_modified, not_modified, set_validators
+from app.core.security import get_current_active_user
+from app.schemas.article import ArticleFeed, ArticlePublish, ArticleUpdate, DraftPatch, DraftState, ReadingBeacon
+from app.models.article import ArticleStatus, ArticleVisibility
+from app.models.user import User
+from app.services.article_service import ArticleService, etag_parts, parse_fields
+from app.services.draft_service import DraftService, StaleRevisionError
+from app.services.render_service import RenderService
+from app.services.revision_service import RevisionService
+from app.services.reading_buffer import reading_buffer
+from app.services.stats_service import StatsService
+from app.services.timeline import TimelineService
+from app.services.view_counter import view_counter
+from app.services.trending import trending
+from app.tasks.article_tasks import (
+    process_markdown_task, dispatch_after_publish, update_related_articles_task
+)
+from app.tasks.search_tasks import update_search_index_task
+from app.tasks.utils import enqueue
+
+logger = structlog.get_logger()
 router = APIRouter()
 
-@router.get("/")
-async def get_articles():
-    """Получение списка статей"""
-    return {"message": "Articles endpoint - to be implemented"}
+# Сериализованные и сжатые ответы страницы статьи по ETag; TTL ограничивает
+# устаревание счётчиков, которые в ETag не входят
+_detail_cache = TTLCache(maxsize=settings.ARTICLE_DETAIL_CACHE_SIZE, ttl=settings.ARTICLE_DETAIL_CACHE_TTL)
+
+def get_fields(
+    fields: Optional[str] = Query(None, description="Поля карточки через запятую")
+) -> Optional[FrozenSet[str]]:
+    """Разреженный набор полей карточек статей"""
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.get("/", response_model=ArticleFeed)
+async def get_articles(
+    request: Request,
+    response: Response,
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[FrozenSet[str]] = Depends(get_fields),
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """Лента опубликованных статей (курсорная пагинация, условный GET)"""
+    article_service = ArticleService(db)
+
+    try:
+        keys, next_cursor = await article_service.get_feed_keys(limit, cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+    # ETag страницы - по составу, версиям и счётчикам статей и профилям их
+    # авторов (etag_parts); Last-Modified не отдаётся: максимум updated_at не
+    # отражает появление в странице более старой статьи
+    etag = make_etag(
+        "feed", cursor, ",".join(sorted(fields)) if fields else "*",
+        *(":".join(map(str, etag_parts(key))) for key in keys)
+    )
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    articles = await article_service.get_published_by_ids([key.id for key in keys], fields)
+    set_validators(response, etag)
+
+    return {
+        "articles": [article.to_dict(include_content=False, fields=fields) for article in articles],
+        "next_cursor": next_cursor,
+        "has_next": next_cursor is not None
+    }
+
+@router.get("/trending")
+async def get_trending_articles(
+    limit: int = Query(20, ge=1, le=50),
+    fields: Optional[FrozenSet[str]] = Depends(get_fields),
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """Популярные статьи по рейтингу с затуханием во времени"""
+    await trending.ensure_seeded(db)
+    
+    ranking = await trending.top(limit)
+    scores = dict(ranking)
+    
+    articles = await ArticleService(db).get_published_by_ids(
+        [article_id for article_id, _ in ranking], fields
+    )
+    
+    return {
+        "articles": [
+            {**article.to_dict(include_content=False, fields=fields), "trending_score": scores[article.id]}
+            for article in articles
+        ]
+    }
+
+@router.get("/following")
+async def get_following_feed(
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[FrozenSet[str]] = Depends(get_fields),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """Лента статей авторов, на которых подписан пользователь"""
+    try:
+        article_ids, next_cursor = await TimelineService(db).get_page(current_user.id, limit, cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+    articles = await ArticleService(db).get_published_by_ids(article_ids, fields)
+    return {
+        "articles": [article.to_dict(include_content=False, fields=fields) for article in articles],
+        "next_cursor": next_cursor,
+        "has_next": next_cursor is not None
+    }
+
+# Ограничение размера тела beacon (50 событий укладываются с запасом)
+MAX_BEACON_SIZE = 16384
+
+@router.post("/beacon", status_code=status.HTTP_204_NO_CONTENT)
+async def collect_reading_events(request: Request) -> Response:
+    """
+    Приём пакета событий чтения от navigator.sendBeacon. Тело читается
+    как JSON независимо от Content-Type (sendBeacon шлёт text/plain, чтобы
+    обойтись без preflight); события только кладутся в буфер процесса.
+    """
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail="Beacon payload too large"
+    )
+    # Эндпоинт без аутентификации: тело больше лимита не читается целиком -
+    # по Content-Length отказ сразу, без него (chunked) чтение обрывается
+    content_length = request.headers.get("content-length")
+    if content_length is not None and (not content_length.isdigit() or int(content_length) > MAX_BEACON_SIZE):
+        raise too_large
+    
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_BEACON_SIZE:
+            raise too_large
+    
+    try:
+        beacon = ReadingBeacon.model_validate_json(body)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=e.errors(include_url=False, include_context=False)
+        )
+    
+    reading_buffer.push((event.article_id, event.type, event.value or 0.0) for event in beacon.events)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 @router.post("/")
 async def create_article():
     """Создание новой статьи"""
     return {"message": "Create article endpoint - to be implemented"}
 
+def article_validators(article, author_updated_at: Optional[datetime]) -> tuple:
+    """
+    ETag и Last-Modified статьи вместе с профилем автора, который входит в
+    ответ. ETag слабый: в тело входят ещё не сброшенные просмотры, а в ETag -
+    только сброшенные в БД, поэтому он меняется не чаще сброса
+    """
+    etag = make_etag("article", *etag_parts(article), weak=True)
+    return etag, latest(article.updated_at or article.published_at or article.created_at, author_updated_at)
+
 @router.get("/{slug}")
-async def get_article(slug: str):
-    """Получение статьи по slug"""
-    return {"message": f"Get article {slug} - to be implemented"}
+async def get_article(
+    slug: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """Получение статьи по slug с пререндеренным HTML"""
+    article_service = ArticleService(db)
+    
+    # Для 304 хватает узкой выборки - строка целиком не загружается
+    validators = await article_service.get_validators_by_slug(slug)
+    if (
+        not validators
+        or validators.status != ArticleStatus.PUBLISHED
+        or validators.visibility == ArticleVisibility.PRIVATE
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Article not found"
+        )
+    
+    await view_counter.incr(validators.id)
+    await trending.record(validators.id, "view")
+    
+    etag, last_modified = article_validators(validators, validators.author_updated_at)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(encoded_etag(etag, negotiated_encoding(request)), last_modified)
+    
+    variants = _detail_cache.get(etag)
+    if variants is None:
+        article = await article_service.get_by_slug(slug)
+        if not article:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Article not found"
+            )
+        pending = await view_counter.pending([article.id])
+        
+        data = article.to_dict(include_content=False)
+        data["views_count"] = (article.views_count or 0) + pending[article.id]
+        data["content_html"] = await RenderService(db).get_html(article)
+        
+        # Валидаторы по загруженной строке: статью могли изменить между запросами
+        etag, last_modified = article_validators(article, article.author.updated_at if article.author else None)
+        body = json.dumps(jsonable_encoder(data), ensure_ascii=False, separators=(",", ":"))
+        variants = compress_variants(body.encode("utf-8"))
+        _detail_cache.set(etag, variants)
+    
+    response = precompressed_response(request, variants, "application/json")
+    set_validators(response, encoded_etag(etag, response.headers.get("content-encoding")), last_modified)
+    return response
+
+@router.get("/{slug}/html")
+async def get_article_html(
+    slug: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """Пререндеренный HTML статьи заранее сжатыми байтами"""
+    article_service = ArticleService(db)
+    render_service = RenderService(db)
+    
+    validators = await article_service.get_validators_by_slug(slug)
+    if (
+        not validators
+        or validators.status != ArticleStatus.PUBLISHED
+        or validators.visibility == ArticleVisibility.PRIVATE
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Article not found"
+        )
+    
+    digest = validators.content_hash
+    if digest and is_not_modified(request, f'"{digest}"'):
+        return not_modified(encoded_etag(f'"{digest}"', negotiated_encoding(request)))
+    
+    variants = await render_service.get_html_variants(digest) if digest else None
+    if variants is None:
+        article = await article_service.get_by_slug(slug)
+        await render_service.ensure_rendered(article)
+        digest = article.content_hash
+        variants = await render_service.get_html_variants(digest)
+    
+    response = precompressed_response(request, variants, "text/html; charset=utf-8")
+    # HTML адресуется хешем исходника - это и есть его сильный ETag (у сжатых
+    # представлений - с суффиксом кодировки)
+    set_validators(response, encoded_etag(f'"{digest}"', response.headers.get("content-encoding")))
+    return response
+
+@router.get("/{slug}/related")
+async def get_related_articles(
+    slug: str,
+    limit: int = Query(5, ge=1, le=settings.RELATED_TOP_K),
+    fields: Optional[FrozenSet[str]] = Depends(get_fields),
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """Похожие статьи (предрассчитанный индекс)"""
+    article_service = ArticleService(db)
+    
+    article = await article_service.get_ref_by_slug(slug)
+    if (
+        not article
+        or article.status != ArticleStatus.PUBLISHED
+        or article.visibility == ArticleVisibility.PRIVATE
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Article not found"
+        )
+    
+    articles = await article_service.get_related(article.id, limit, fields)
+    return {"articles": [related.to_dict(include_content=False, fields=fields) for related in articles]}
+
+async def get_own_article_ref(slug: str, current_user: User, db: AsyncSession):
+    """Проверка, что статья существует и принадлежит текущему пользователю"""
+    article = await ArticleService(db).get_ref_by_slug(slug)
+    if not article:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Article not found"
+        )
+    if article.author_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return article
+
+@router.get("/{slug}/draft", response_model=DraftState)
+async def get_article_draft(
+    slug: str,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """Текущий черновик статьи для редактора"""
+    article = await get_own_article_ref(slug, current_user, db)
+    
+    revision, content = await DraftService(db).get_draft(article.id)
+    return {"revision": revision, "length": len(content), "content": content}
+
+@router.patch("/{slug}/draft", response_model=DraftState)
+async def patch_article_draft(
+    slug: str,
+    patch: DraftPatch,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """Автосохранение черновика дельтой относительно base_revision"""
+    article = await get_own_article_ref(slug, current_user, db)
+    
+    # Быстрый отказ без сборки текста черновика
+    if article.draft_revision != patch.base_revision:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "Stale base revision", "current_revision": article.draft_revision}
+        )
+    
+    try:
+        revision, content = await DraftService(db).apply_patch(article.id, patch.base_revision, patch.ops)
+    except StaleRevisionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "Stale base revision", "current_revision": e.current_revision}
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    
+    return {"revision": revision, "length": len(content)}
+
+@router.get("/{slug}/revisions")
+async def get_article_revisions(
+    slug: str,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """История версий статьи (без текстов)"""
+    article = await get_own_article_ref(slug, current_user, db)
+    
+    return {"revisions": await RevisionService(db).list_revisions(article.id)}
+
+@router.get("/{slug}/revisions/{revision}")
+async def get_article_revision(
+    slug: str,
+    revision: int,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """Текст указанной версии статьи"""
+    article = await get_own_article_ref(slug, current_user, db)
+    
+    content = await RevisionService(db).get_content(article.id, revision)
+    if content is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Revision not found"
+        )
+    
+    return {"revision": revision, "content": content}
+
+@router.get("/{slug}/stats")
+async def get_article_stats(
+    slug: str,
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    days: int = Query(30, ge=1, le=365),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """Статистика статьи по часам или дням из готовых агрегатов"""
+    article = await get_own_article_ref(slug, current_user, db)
+    
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    buckets = await StatsService(db).get_article_stats(article.id, granularity, since)
+    
+    return {"granularity": granularity, "buckets": buckets}
 
 @router.put("/{slug}")
-async def update_article(slug: str):
-    """Обновление статьи"""
-    return {"message": f"Update article {slug} - to be implemented"}
+async def update_article(
+    slug: str,
+    article_data: ArticleUpdate,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """Обновление статьи (прежний текст сохраняется в истории версий)"""
+    article_service = ArticleService(db)
+    
+    article = await article_service.get_by_slug(slug)
+    if not article:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Article not found"
+        )
+    if article.author_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    was_published = article.status == ArticleStatus.PUBLISHED
+    article = await article_service.update_article(article, article_data, current_user.id)
+    
+    # Хеш сбрасывается при изменении content - HTML нужно перерендерить
+    if article.content_hash is None:
+        enqueue(process_markdown_task, article.id)
+    if article.status == ArticleStatus.PUBLISHED and not was_published:
+        dispatch_after_publish([article.id])
+    elif was_published:
+        enqueue(update_related_articles_task, [article.id])
+        # Также убирает статью из индекса, если она стала непубличной или снята с публикации
+        enqueue(update_search_index_task, [article.id])
+    
+    return article.to_dict()
+
+@router.post("/{slug}/publish")
+async def publish_article(
+    slug: str,
+    publish_data: ArticlePublish,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """Публикация статьи сейчас или в запланированное время"""
+    article_service = ArticleService(db)
+    
+    article = await article_service.get_by_slug(slug)
+    if not article:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Article not found"
+        )
+    if article.author_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    if publish_data.scheduled_at and article.status != ArticleStatus.DRAFT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only drafts can be scheduled"
+        )
+    
+    if await article_service.publish(article, publish_data):
+        dispatch_after_publish([article.id])
+    
+    return {
+        "slug": article.slug,
+        "status": article.status.value,
+        "visibility": article.visibility.value,
+        "published_at": article.published_at,
+        "publish_at": article.publish_at
+    }
 
 @router.delete("/{slug}")
 async def delete_article(slug: str):
@@ -1,18 +1,58 @@
-from fastapi import APIRouter
+from typing import Any, Optional, FrozenSet
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.endpoints.articles import get_fields
+from app.core.database import get_db
+from app.services.search_service import SearchService, SearchUnavailableError
+from app.services.tag_search import MAX_COMPLETIONS, tag_index
+from app.services.user_service import UserService
 
 router = APIRouter()
 
 @router.get("/articles")
-async def search_articles():
-    """Поиск статей"""
-    return {"message": "Search articles - to be implemented"}
+async def search_articles(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы"),
+    fields: Optional[FrozenSet[str]] = Depends(get_fields),
+    facets: bool = Query(True, description="Фасеты по тегам, авторам и периоду публикации"),
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """Поиск статей с ранжированием, подсветкой совпадений и фасетами"""
+    search_service = SearchService(db)
+    try:
+        articles, next_cursor = await search_service.search_articles(q, limit, cursor, fields)
+        facet_counts = await search_service.facets(q) if facets else None
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except SearchUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=str(e)
+        )
+
+    return {"articles": articles, "next_cursor": next_cursor, "facets": facet_counts}
 
 @router.get("/users")
-async def search_users():
-    """Поиск пользователей"""
-    return {"message": "Search users - to be implemented"}
+async def search_users(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """Поиск пользователей по username и имени (с опечатками и по подстроке)"""
+    users = await UserService(db).search_users(q, limit)
+    return {"users": [user.public_profile for user in users]}
 
 @router.get("/tags")
-async def search_tags():
-    """Поиск тегов"""
-    return {"message": "Search tags - to be implemented"} 
\ No newline at end of file
+async def search_tags(
+    q: str = Query(..., min_length=1, max_length=50),
+    limit: int = Query(10, ge=1, le=MAX_COMPLETIONS),
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """Автодополнение тегов по началу имени или slug, популярные первыми"""
+    await tag_index.sync(db)
+    return {"tags": tag_index.complete(q, limit)}
@@ -1,15 +1,16 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 import structlog
 
 from app.core.database import get_db
+from app.core.http_cache import make_etag, is_not_modified, not_modified, set_validators
 from app.core.security import get_current_active_user, get_current_admin_user
 from app.schemas.user import (
-    UserResponse, UserUpdate, UserProfile, UserList, 
+    UserResponse, UserUpdate, PublicUserProfile, UserList, 
     PasswordChange, TelegramConnect, UserPreferences
 )
-from app.services.user_service import UserService
+from app.services.user_service import PROFILE_COUNTERS, UserService
 from app.models.user import User
 
 logger = structlog.get_logger()
@@ -42,7 +43,13 @@ async def update_current_user(
                 detail="Username already taken"
             )
     
-    updated_user = await user_service.update_user(str(current_user.id), user_data)
+    try:
+        updated_user = await user_service.update_user(str(current_user.id), user_data)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
     if not updated_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -52,7 +59,7 @@ async def update_current_user(
     return updated_user
 
 
-@router.get("/me/profile", response_model=UserProfile)
+@router.get("/me/profile", response_model=PublicUserProfile)
 async def get_current_user_profile(
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
@@ -117,15 +124,9 @@ async def connect_telegram(
     # Обновление данных пользователя
     update_data = {
         "telegram_id": telegram_data.telegram_id,
-        "telegram_username": telegram_data.telegram_username,
         "telegram_notifications": True
     }
     
-    if telegram_data.first_name:
-        update_data["first_name"] = telegram_data.first_name
-    if telegram_data.last_name:
-        update_data["last_name"] = telegram_data.last_name
-    
     updated_user = await user_service.update_user(str(current_user.id), update_data)
     if not updated_user:
         raise HTTPException(
@@ -146,7 +147,6 @@ async def disconnect_telegram(
     
     update_data = {
         "telegram_id": None,
-        "telegram_username": None,
         "telegram_notifications": False
     }
     
@@ -160,37 +160,43 @@ async def disconnect_telegram(
     return {"message": "Telegram account disconnected successfully"}
 
 
-@router.get("/{username}", response_model=UserProfile)
+@router.get("/{username}", response_model=PublicUserProfile)
 async def get_user_profile(
     username: str,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Получение профиля пользователя по username"""
     user_service = UserService(db)
     
-    # Получение пользователя по username
-    user = await user_service.get_by_username(username)
-    if not user:
+    # Профиль с агрегатами из кэша read model; при промахе - один запрос
+    profile_data = await user_service.get_profile_by_username(username)
+    if not profile_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
     # Проверка приватности профиля
-    if not user.is_public_profile and str(user.id) != str(current_user.id):
+    if not profile_data["is_public_profile"] and profile_data["id"] != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Profile is private"
         )
     
-    profile_data = await user_service.get_user_profile(str(user.id))
-    if not profile_data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User profile not found"
-        )
-    
+    # Счётчики меняются без version/updated_at (подписки, просмотры), но
+    # входят в тело - поэтому и в ETag; устаревают не дольше кэша профиля
+    etag = make_etag(
+        "user", profile_data["id"], profile_data["version"], profile_data["updated_at"],
+        *(profile_data[counter] for counter in PROFILE_COUNTERS)
+    )
+    last_modified = profile_data["updated_at"] or profile_data["created_at"]
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified, "private, no-cache")
+    
+    set_validators(response, etag, last_modified, "private, no-cache")
     return profile_data
 
 
@@ -218,7 +224,7 @@ async def follow_user(
             detail="Cannot follow yourself"
         )
     
-    success = await user_service.follow_user(str(current_user.id), str(user_to_follow.id))
+    success = await user_service.follow_user(current_user.id, user_to_follow.id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -245,7 +251,7 @@ async def unfollow_user(
             detail="User not found"
         )
     
-    success = await user_service.unfollow_user(str(current_user.id), str(user_to_unfollow.id))
+    success = await user_service.unfollow_user(current_user.id, user_to_unfollow.id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -258,8 +264,8 @@ async def unfollow_user(
 @router.get("/{username}/followers")
 async def get_user_followers(
     username: str,
-    skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы"),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
@@ -281,15 +287,27 @@ async def get_user_followers(
             detail="Profile is private"
         )
     
-    followers = await user_service.get_followers(str(user.id), skip, limit)
-    return {"followers": followers, "total": len(followers)}
+    try:
+        followers, next_cursor = await user_service.get_followers(user.id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # Общее число - из счётчика профиля, без COUNT по таблице подписок
+    return {
+        "followers": [item.public_profile for item in followers],
+        "total": user.followers_count or 0,
+        "next_cursor": next_cursor
+    }
 
 
 @router.get("/{username}/following")
 async def get_user_following(
     username: str,
-    skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы"),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
@@ -311,8 +329,20 @@ async def get_user_following(
             detail="Profile is private"
         )
     
-    following = await user_service.get_following(str(user.id), skip, limit)
-    return {"following": following, "total": len(following)}
+    try:
+        following, next_cursor = await user_service.get_following(user.id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # Общее число - из счётчика профиля, без COUNT по таблице подписок
+    return {
+        "following": [item.public_profile for item in following],
+        "total": user.following_count or 0,
+        "next_cursor": next_cursor
+    }
 
 
 # Административные эндпоинты
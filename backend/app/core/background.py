@@ -0,0 +1,34 @@
+"""
+Периодические фоновые задачи внутри процесса API
+"""
+
+from typing import Awaitable, Callable, List
+import asyncio
+import structlog
+
+logger = structlog.get_logger()
+
+_tasks: List[asyncio.Task] = []
+
+
+def start_periodic(name: str, func: Callable[[], Awaitable[object]], interval: float) -> None:
+    """Запуск корутины func каждые interval секунд"""
+    
+    async def _loop():
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await func()
+            except Exception as e:
+                logger.error("Periodic task failed", task=name, error=str(e))
+    
+    _tasks.append(asyncio.create_task(_loop(), name=name))
+    logger.info("Periodic task started", task=name, interval=interval)
+
+
+async def stop_periodic() -> None:
+    """Остановка всех периодических задач"""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
@@ -15,6 +15,8 @@ celery_app = Celery(
         "app.tasks.notification_tasks",
         "app.tasks.article_tasks",
         "app.tasks.payment_tasks",
+        "app.tasks.search_tasks",
+        "app.tasks.cleanup_tasks",
     ]
 )
 
@@ -43,9 +45,25 @@ celery_app.conf.update(
             "schedule": 3600.0,  # каждый час
         },
         "update-article-stats": {
-            "task": "app.tasks.article_tasks.update_article_statistics",
+            "task": "app.tasks.article_tasks.update_article_statistics_task",
             "schedule": 300.0,  # каждые 5 минут
         },
+        "publish-scheduled-articles": {
+            "task": "app.tasks.article_tasks.publish_scheduled_articles_task",
+            "schedule": settings.SCHEDULED_PUBLISH_INTERVAL,
+        },
+        "rebuild-related-articles": {
+            "task": "app.tasks.article_tasks.rebuild_related_articles_task",
+            "schedule": 86400.0,  # раз в сутки
+        },
+        "cleanup-article-events": {
+            "task": "app.tasks.cleanup_tasks.cleanup_article_events_task",
+            "schedule": 86400.0,  # раз в сутки
+        },
+        "cleanup-orphan-renders": {
+            "task": "app.tasks.cleanup_tasks.cleanup_orphan_renders_task",
+            "schedule": 86400.0,  # раз в сутки
+        },
         "send-daily-digest": {
             "task": "app.tasks.notification_tasks.send_daily_digest",
             "schedule": 86400.0,  # каждый день в 9:00
@@ -74,6 +92,11 @@ celery_app.conf.update(
             "exchange": "payments",
             "routing_key": "payments",
         },
+        # Писатель встроенного поискового индекса: воркер с -Q search -c 1
+        "search": {
+            "exchange": "search",
+            "routing_key": "search",
+        },
     },
     
     # Настройки роутинга
@@ -81,6 +104,7 @@ celery_app.conf.update(
         "app.tasks.email_tasks.*": {"queue": "email"},
         "app.tasks.notification_tasks.*": {"queue": "notifications"},
         "app.tasks.payment_tasks.*": {"queue": "payments"},
+        "app.tasks.search_tasks.*": {"queue": "search"},
     },
 )
 
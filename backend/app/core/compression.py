@@ -0,0 +1,183 @@
+"""
+Сжатие ответов: заранее сжатые варианты и middleware для остальных ответов
+"""
+
+from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Dict, Iterable, Optional
+import gzip
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli необязателен
+    brotli = None
+
+# Уровни для заранее сжатых вариантов: сжимаются один раз, поэтому максимальные
+GZIP_BEST_LEVEL = 9
+BROTLI_BEST_QUALITY = 11
+
+# Уровни для сжатия на лету: баланс размера и CPU воркера
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def available_encodings() -> tuple:
+    """Поддерживаемые кодировки в порядке предпочтения"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compress(data: bytes, encoding: str, best: bool = False) -> bytes:
+    """Сжатие тела ответа в указанной кодировке"""
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_BEST_QUALITY if best else BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_BEST_LEVEL if best else GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unknown encoding: {encoding}")
+
+
+def compress_variants(data: bytes) -> Dict[str, bytes]:
+    """Исходные байты и все поддерживаемые сжатые варианты"""
+    variants = {"identity": data}
+    for encoding in available_encodings():
+        variants[encoding] = compress(data, encoding, best=True)
+    return variants
+
+
+def choose_encoding(accept_encoding: Optional[str], available: Iterable[str]) -> str:
+    """Выбор кодировки по Accept-Encoding (с учётом q); identity, если подходящей нет"""
+    if not accept_encoding:
+        return "identity"
+
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name:
+            weights[name] = weight
+
+    best, best_weight = "identity", 0.0
+    for encoding in available:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def negotiated_encoding(request: Request) -> str:
+    """Кодировка, в которой клиент получит заранее сжатый ответ (для ETag в 304)"""
+    return choose_encoding(request.headers.get("accept-encoding"), available_encodings())
+
+
+def precompressed_response(
+    request: Request,
+    variants: Dict[str, bytes],
+    media_type: str,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Ответ готовыми байтами в кодировке, которую принимает клиент. ETag
+    вызывающий код выставляет через encoded_etag по Content-Encoding ответа
+    """
+    encoding = choose_encoding(
+        request.headers.get("accept-encoding"),
+        [encoding for encoding in available_encodings() if encoding in variants]
+    )
+    response = Response(content=variants[encoding], media_type=media_type, headers=headers)
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+class CompressionMiddleware:
+    """
+    Сжатие ответов на лету (br или gzip) для тел от minimum_size байт.
+    Ответы, у которых уже есть Content-Encoding (заранее сжатые), и
+    потоковые ответы передаются как есть.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"), available_encodings())
+        if encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    """Задерживает начало ответа до первого куска тела, чтобы решить, сжимать ли"""
+
+    def __init__(self, send: Send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self._start: Optional[Message] = None
+        self._passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if self._passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            self._start = message
+            return
+
+        if message["type"] != "http.response.body" or self._start is None:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        headers = MutableHeaders(raw=self._start["headers"])
+        content_type = headers.get("content-type", "")
+
+        if (
+            message.get("more_body", False)
+            or "content-encoding" in headers
+            or len(body) < self.minimum_size
+            or not content_type.startswith(COMPRESSIBLE_TYPES)
+        ):
+            self._passthrough = True
+            await self._send(self._start)
+            await self._send(message)
+            return
+
+        compressed = compress(body, self.encoding)
+        headers["Content-Encoding"] = self.encoding
+        headers["Content-Length"] = str(len(compressed))
+        headers.add_vary_header("Accept-Encoding")
+        # Сжатое представление побайтно отличается от исходного
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
+
+        self._passthrough = True
+        await self._send(self._start)
+        await self._send({"type": "http.response.body", "body": compressed})
@@ -32,6 +32,72 @@ class Settings(BaseSettings):
     REDIS_URL: str = Field(default="redis://localhost:6379", env="REDIS_URL")
     REDIS_CACHE_TTL: int = 3600  # 1 час
     
+    # Буферизованные счётчики
+    VIEW_COUNTER_FLUSH_INTERVAL: int = 60  # Сброс внутрипроцессного буфера, секунд
+    
+    # Черновики
+    DRAFT_SNAPSHOT_INTERVAL: int = 20  # Полный снимок текста каждые N ревизий
+    DRAFT_MAX_LENGTH: int = 50000  # Как в валидаторе ArticleBase.content
+    
+    # История версий
+    REVISION_KEYFRAME_INTERVAL: int = 16  # Полный текст каждые N версий
+    REVISION_CODEC: str = "zlib"  # zlib или zstd (нужен пакет zstandard)
+    
+    # Популярные статьи
+    TRENDING_HALF_LIFE_HOURS: float = 12.0  # Период полураспада вклада события
+    TRENDING_MAX_SIZE: int = 1000  # Сколько статей хранится в рейтинге
+    TRENDING_WINDOW_DAYS: int = 7  # Окно начального заполнения рейтинга
+    
+    # Профили пользователей
+    PROFILE_CACHE_SIZE: int = 10000  # Профилей в памяти процесса (без Redis)
+    PROFILE_CACHE_TTL: int = 60  # Секунд; предел устаревания счётчиков статей и просмотров
+    
+    # Лента подписок
+    TIMELINE_MAX_SIZE: int = 800  # Статей в ленте пользователя в Redis
+    TIMELINE_FANOUT_MAX_FOLLOWERS: int = 10000  # Статьи более крупных авторов подмешиваются при чтении
+    TIMELINE_FANOUT_BATCH_SIZE: int = 1000  # Подписчиков в одном конвейере Redis
+    TIMELINE_TTL: int = 604800  # Лента неактивного пользователя удаляется через неделю, секунд
+    
+    # Отложенная публикация
+    SCHEDULED_PUBLISH_INTERVAL: float = 30.0  # Период задачи публикации, секунд
+    SCHEDULED_PUBLISH_BATCH_SIZE: int = 1000  # Максимум статей за один проход
+    SCHEDULED_PUBLISH_FANOUT_CHUNK: int = 200  # Статей в одной задаче пост-обработки
+    
+    # Похожие статьи
+    RELATED_INDEX_PATH: str = "data/related_index.npz"  # Модель TF-IDF и векторы статей
+    RELATED_TOP_K: int = 10  # Сколько похожих статей хранится на статью
+    RELATED_TAG_WEIGHT: float = 0.3  # Доля пересечения тегов в итоговой близости
+    RELATED_MIN_DF: int = 2  # Слово должно встречаться хотя бы в N статьях
+    RELATED_MAX_DF: float = 0.5  # и не более чем в такой доле статей
+    RELATED_MAX_FEATURES: int = 100000  # Размер словаря
+    
+    # Статистика статей
+    STATS_ROLLUP_LAG_SECONDS: int = 5  # Более свежие события ждут следующего прохода
+    STATS_ROLLUP_BATCH_SIZE: int = 100000  # Максимум событий (по id) за один проход
+    STATS_EVENTS_RETENTION_DAYS: int = 30  # Сколько хранить уже учтённые сырые события
+    READING_BUFFER_SIZE: int = 100000  # Событий beacon в кольцевом буфере процесса
+    READING_FLUSH_INTERVAL: int = 10  # Сброс буфера событий чтения, секунд
+    READING_EVENTS_INSERT_BATCH: int = 1000  # Строк в одном INSERT
+
+    # Поиск
+    SEARCH_TS_CONFIG: str = "russian"  # Конфигурация текстового поиска PostgreSQL
+    SEARCH_SNIPPET_WORDS: int = 24  # Слов во фрагменте с подсветкой
+    SEARCH_BACKEND: str = "database"  # database - индекс СУБД, bm25 - встроенный индекс
+    SEARCH_INDEX_PATH: str = "data/search_index.bin"  # Файл встроенного индекса (mmap)
+    USER_SEARCH_REFRESH_INTERVAL: int = 30  # Синхронизация индекса пользователей в памяти, секунд
+    TAG_INDEX_CHECK_INTERVAL: float = 1.0  # Проверка версии индекса тегов в Redis, секунд
+    TAG_INDEX_REFRESH_INTERVAL: int = 60  # Полная перезагрузка индекса тегов без Redis, секунд
+    SEARCH_CACHE_SIZE: int = 2048  # Закэшированных страниц результатов поиска в памяти процесса
+    SEARCH_CACHE_TTL: int = 300  # Секунд; без Redis - предел устаревания после публикации
+    SEARCH_FACET_MAX_DOCS: int = 5000  # Статей, по которым считаются фасеты поиска
+    SEARCH_FACET_SIZE: int = 10  # Значений в фасете тегов и авторов
+
+    # Сжатие ответов
+    COMPRESSION_MIN_SIZE: int = 1024  # Меньшие ответы не сжимаются
+    ARTICLE_DETAIL_CACHE_SIZE: int = 512  # Заранее сжатых ответов статей в памяти процесса
+    ARTICLE_DETAIL_CACHE_TTL: int = 60  # Секунд; как часто обновляются счётчики в ответе
+    RENDER_ORPHAN_RETENTION_HOURS: int = 24  # Рендеры, на которые не ссылается ни одна статья, удаляются через N часов
+    
     # Celery
     CELERY_BROKER_URL: str = Field(default="redis://localhost:6379", env="CELERY_BROKER_URL")
     
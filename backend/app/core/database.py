@@ -3,6 +3,7 @@
 """
 
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool
@@ -40,6 +41,13 @@ AsyncSessionLocal = sessionmaker(
 # Базовый класс для моделей
 Base = declarative_base()
 
+def insert_ignore(db: AsyncSession, table):
+    """INSERT, пропускающий строки с уже существующим ключом (по диалекту сессии)"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        return mysql.insert(table).prefix_with("IGNORE")
+    return (postgresql if dialect == "postgresql" else sqlite).insert(table).on_conflict_do_nothing()
+
 async def get_db() -> AsyncSession:
     """Получение сессии базы данных"""
     async with AsyncSessionLocal() as session:
@@ -0,0 +1,112 @@
+"""
+Условные GET-запросы: ETag, Last-Modified и ответ 304
+"""
+
+from fastapi import Request, Response
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+import hashlib
+
+
+def make_etag(*parts, weak: bool = False) -> str:
+    """
+    ETag из версионных полей ресурса (id, version, updated_at...); слабый -
+    если тело может отличаться при тех же полях
+    """
+    raw = "|".join(part.isoformat() if isinstance(part, datetime) else str(part) for part in parts)
+    etag = '"' + hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest() + '"'
+    return "W/" + etag if weak else etag
+
+
+def http_date(value: datetime) -> str:
+    """Дата в формате HTTP (IMF-fixdate, GMT)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+# Кодировки (Content-Encoding), для которых у сильного ETag есть суффикс
+ETAG_ENCODINGS = ("br", "gzip")
+
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """
+    ETag представления в кодировке encoding: сильный валидатор обязан
+    различать побайтно разные тела, поэтому у сжатых - суффикс ("abc-br").
+    Слабый ETag общий для всех кодировок
+    """
+    if not encoding or encoding == "identity" or etag.startswith("W/"):
+        return etag
+    return etag[:-1] + "-" + encoding + '"'
+
+
+def _base_etag(tag: str) -> str:
+    """ETag без W/ и суффикса кодировки"""
+    tag = tag.removeprefix("W/")
+    for encoding in ETAG_ENCODINGS:
+        if tag.endswith(f'-{encoding}"'):
+            return tag[:-len(encoding) - 2] + '"'
+    return tag
+
+
+def latest(*values: Optional[datetime]) -> Optional[datetime]:
+    """Наибольшая из дат (пропуская None); даты без часового пояса - в UTC"""
+    dates = [
+        value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+        for value in values if value is not None
+    ]
+    return max(dates) if dates else None
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    Проверка If-None-Match (слабое сравнение, RFC 9110; подходит ETag
+    любой кодировки представления), а при его отсутствии - If-Modified-Since
+    с точностью до секунды.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        candidates = {_base_etag(tag.strip()) for tag in if_none_match.split(",")}
+        return _base_etag(etag) in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # "-0000" и даты без зоны дают наивное время - это UTC
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+
+    return False
+
+
+def set_validators(
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    cache_control: str = "public, no-cache"
+) -> None:
+    """Заголовки валидаторов; no-cache - кешировать можно, но с проверкой"""
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    response.headers["Cache-Control"] = cache_control
+
+
+def not_modified(
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    cache_control: str = "public, no-cache"
+) -> Response:
+    """Ответ 304 без тела с теми же валидаторами"""
+    response = Response(status_code=304)
+    set_validators(response, etag, last_modified, cache_control)
+    return response
@@ -0,0 +1,50 @@
+"""
+Подключение к Redis
+"""
+
+from typing import Optional
+import time
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+# Пауза перед повторной попыткой подключения после неудачи
+RECONNECT_INTERVAL = 30.0
+
+_client: Optional[aioredis.Redis] = None
+_retry_at = 0.0
+
+
+async def get_redis() -> Optional[aioredis.Redis]:
+    """Общий клиент Redis (None, если Redis не настроен или недоступен)"""
+    global _client, _retry_at
+    
+    if _client is not None:
+        return _client
+    if not settings.REDIS_URL or time.monotonic() < _retry_at:
+        return None
+    
+    client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+    try:
+        await client.ping()
+    except (RedisError, OSError) as e:
+        _retry_at = time.monotonic() + RECONNECT_INTERVAL
+        logger.warning("Redis unavailable, using in-process fallback", error=str(e))
+        await client.aclose()
+        return None
+    
+    _client = client
+    return _client
+
+
+async def close_redis() -> None:
+    """Закрытие клиента Redis (нужно при завершении каждого event loop)"""
+    global _client
+    
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,95 @@
+"""
+Компактные текстовые дельты
+
+Дельта - список операций над исходным текстом:
+    int > 0  - оставить n символов
+    int < 0  - удалить n символов
+    str      - вставить строку
+Не покрытый операциями хвост исходного текста сохраняется.
+"""
+
+from difflib import SequenceMatcher
+from typing import List, Union
+
+DeltaOp = Union[int, str]
+
+# Максимальный размер изменённого блока для посимвольного уточнения
+CHAR_DIFF_LIMIT = 4000
+
+
+def apply_delta(text: str, ops: List[DeltaOp]) -> str:
+    """Применение дельты к тексту (ValueError, если дельта не подходит к тексту)"""
+    parts = []
+    position = 0
+
+    for op in ops:
+        if isinstance(op, bool):
+            raise ValueError("Invalid delta operation")
+        if isinstance(op, str):
+            parts.append(op)
+        elif isinstance(op, int) and op > 0:
+            if position + op > len(text):
+                raise ValueError("Delta retains past the end of the text")
+            parts.append(text[position:position + op])
+            position += op
+        elif isinstance(op, int) and op < 0:
+            if position - op > len(text):
+                raise ValueError("Delta deletes past the end of the text")
+            position -= op
+        else:
+            raise ValueError("Invalid delta operation")
+
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def make_delta(old: str, new: str) -> List[DeltaOp]:
+    """
+    Построение дельты old -> new. Сравнение идёт по строкам, изменённые
+    небольшие блоки уточняются посимвольно; хвостовое сохранение опускается.
+    """
+    ops: List[DeltaOp] = []
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        old_block = "".join(old_lines[i1:i2])
+        new_block = "".join(new_lines[j1:j2])
+        if tag == "equal":
+            _push(ops, len(old_block))
+        elif tag == "replace" and len(old_block) + len(new_block) <= CHAR_DIFF_LIMIT:
+            _diff_chars(ops, old_block, new_block)
+        else:
+            _push(ops, -len(old_block))
+            _push(ops, new_block)
+
+    if ops and isinstance(ops[-1], int) and ops[-1] > 0:
+        ops.pop()
+    return ops
+
+
+def _diff_chars(ops: List[DeltaOp], old: str, new: str) -> None:
+    """Посимвольная дельта для небольшого изменённого блока"""
+    matcher = SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            _push(ops, i2 - i1)
+            continue
+        _push(ops, i1 - i2)
+        _push(ops, new[j1:j2])
+
+
+def _push(ops: List[DeltaOp], op: DeltaOp) -> None:
+    """Добавление операции со склейкой с предыдущей однотипной"""
+    if not op:
+        return
+    if ops:
+        last = ops[-1]
+        if isinstance(op, str) and isinstance(last, str):
+            ops[-1] = last + op
+            return
+        if isinstance(op, int) and isinstance(last, int) and (op > 0) == (last > 0):
+            ops[-1] = last + op
+            return
+    ops.append(op)
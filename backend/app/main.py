@@ -15,6 +15,13 @@ import structlog
 from app.core.config import settings
 from app.api.v1.api import api_router
 from app.core.database import engine, Base
+from app.core.background import start_periodic, stop_periodic
+from app.core.compression import CompressionMiddleware
+from app.core.redis import close_redis
+from app.services.view_counter import flush_article_views
+from app.services.reading_buffer import flush_reading_events
+from app.services.user_search import refresh_user_index
+from app.models.search import ensure_search_schema
 
 # Настройка логирования
 structlog.configure(
@@ -60,11 +67,37 @@ async def startup_event():
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
         logger.info("Database tables created")
+    
+    # Поисковые индексы в БД, созданной до их появления (идемпотентно)
+    try:
+        async with engine.begin() as conn:
+            if await ensure_search_schema(conn):
+                logger.info("Search index schema created")
+    except Exception as e:
+        logger.error("Failed to create search index schema", error=str(e))
+    
+    # Сброс внутрипроцессного буфера просмотров (когда Redis недоступен)
+    start_periodic("flush-article-views", flush_article_views, settings.VIEW_COUNTER_FLUSH_INTERVAL)
+    # Сброс событий чтения, принятых beacon-эндпоинтом
+    start_periodic("flush-reading-events", flush_reading_events, settings.READING_FLUSH_INTERVAL)
+    
+    # Триграммный индекс пользователей в памяти (в PostgreSQL поиск идёт через pg_trgm)
+    if engine.dialect.name != "postgresql":
+        start_periodic("refresh-user-index", refresh_user_index, settings.USER_SEARCH_REFRESH_INTERVAL)
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Очистка при завершении приложения"""
     logger.info("Shutting down Teletype.in Analog API")
+    
+    await stop_periodic()
+    await flush_article_views()
+    await flush_reading_events()
+    await close_redis()
+
+# Сжатие ответов: добавляется первым, чтобы оказаться ближе всех к
+# приложению и получать тело ответа одним куском
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
 
 # Middleware для CORS
 app.add_middleware(
@@ -1,24 +1,37 @@
 # Импорт всех моделей для Alembic
 from app.models.user import User, UserRole, UserStatus
-from app.models.article import Article, ArticleStatus, ArticleVisibility
+from app.models.follow import Follow
+from app.models.article import Article, ArticleStatus, ArticleVisibility, ArticleRender, ArticleRelated
 from app.models.tag import Tag
+from app.models.revision import DraftRevision, ArticleRevision
 from app.models.interaction import Comment, CommentStatus, Like, Bookmark, Notification, NotificationType
 from app.models.payment import Payment, PaymentStatus
+from app.models import search  # Регистрация DDL полнотекстового индекса
+from app.models.stats import ArticleEvent, ArticleStatsHourly, ArticleStatsDaily, StatsWatermark
 
 # Экспорт всех моделей
 __all__ = [
     # User models
     "User", "UserRole", "UserStatus",
     
+    # Follow models
+    "Follow",
+    
     # Article models
-    "Article", "ArticleStatus", "ArticleVisibility",
+    "Article", "ArticleStatus", "ArticleVisibility", "ArticleRender", "ArticleRelated",
     
     # Tag models
     "Tag",
     
+    # Revision models
+    "DraftRevision", "ArticleRevision",
+    
     # Interaction models
     "Comment", "CommentStatus", "Like", "Bookmark", "Notification", "NotificationType",
     
     # Payment models
     "Payment", "PaymentStatus",
+    
+    # Stats models
+    "ArticleEvent", "ArticleStatsHourly", "ArticleStatsDaily", "StatsWatermark",
 ] 
\ No newline at end of file
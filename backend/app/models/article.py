@@ -4,12 +4,14 @@
 
 from sqlalchemy import (
     Column, Integer, String, Text, Boolean, DateTime, 
-    ForeignKey, Enum, JSON, Index
+    ForeignKey, Enum, JSON, Index, Float, LargeBinary
 )
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
+from sqlalchemy import event
 import enum
 from datetime import datetime
+from typing import Iterable, Optional
 
 from app.core.database import Base
 
@@ -37,6 +39,9 @@ class Article(Base):
     slug = Column(String(250), unique=True, index=True, nullable=False)
     subtitle = Column(String(300), nullable=True)
     content = Column(Text, nullable=False)
+    content_hash = Column(String(64), nullable=True)  # SHA-256 отрендеренного content
+    draft_revision = Column(Integer, default=0, server_default="0", nullable=False)  # Последняя ревизия черновика
+    version = Column(Integer, default=1, server_default="1", nullable=False)  # Растёт при каждой правке (ETag)
     excerpt = Column(Text, nullable=True)  # Краткое описание
     
     # Мета-информация
@@ -55,6 +60,7 @@ class Article(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     published_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    publish_at = Column(DateTime(timezone=True), nullable=True)  # Запланированная публикация
     
     # Статистика
     views_count = Column(Integer, default=0)
@@ -84,10 +90,15 @@ class Article(Base):
     # Индексы для производительности
     __table_args__ = (
         Index("idx_article_author_status", "author_id", "status"),
+        Index("idx_article_author_published", "author_id", "published_at"),
         Index("idx_article_published", "published_at", "status", "visibility"),
         Index("idx_article_views", "views_count"),
+        Index("idx_article_scheduled", "status", "publish_at"),
     )
     
+    # Каждый ORM UPDATE увеличивает version (и проверяет, что строку не изменили параллельно)
+    __mapper_args__ = {"version_id_col": version}
+    
     def __repr__(self):
         return f"<Article(id={self.id}, title='{self.title}', status='{self.status}')>"
     
@@ -109,35 +120,76 @@ class Article(Base):
         """Публичный URL статьи"""
         return f"/{self.author.username}/{self.slug}"
     
-    def to_dict(self, include_content: bool = True) -> dict:
-        """Преобразование в словарь"""
-        data = {
-            "id": self.id,
-            "title": self.title,
-            "slug": self.slug,
-            "subtitle": self.subtitle,
-            "excerpt": self.excerpt,
-            "cover_image": self.cover_image,
-            "reading_time": self.reading_time,
-            "word_count": self.word_count,
-            "status": self.status.value,
-            "visibility": self.visibility.value,
-            "created_at": self.created_at,
-            "updated_at": self.updated_at,
-            "published_at": self.published_at,
-            "views_count": self.views_count,
-            "likes_count": self.likes_count,
-            "comments_count": self.comments_count,
-            "shares_count": self.shares_count,
-            "allow_comments": self.allow_comments,
-            "is_featured": self.is_featured,
-            "is_pinned": self.is_pinned,
-            "author": self.author.public_profile if self.author else None,
-            "tags": [tag.name for tag in self.tags] if self.tags else [],
-            "public_url": self.public_url
-        }
+    def to_dict(self, include_content: bool = True, fields: Optional[Iterable[str]] = None) -> dict:
+        """Преобразование в словарь (fields - разреженный набор полей карточки)"""
+        selected = CARD_FIELDS if fields is None else [f for f in CARD_FIELDS if f in fields]
+        data = {field: _CARD_SERIALIZERS[field](self) for field in selected}
         
         if include_content:
             data["content"] = self.content
             
         return data
+
+
+# Тяжёлые колонки, которые не нужны спискам и карточкам
+HEAVY_COLUMNS = ("content", "settings", "analytics")
+
+# Сериализаторы полей карточки статьи (порядок определяет порядок ключей)
+_CARD_SERIALIZERS = {
+    "id": lambda a: a.id,
+    "title": lambda a: a.title,
+    "slug": lambda a: a.slug,
+    "subtitle": lambda a: a.subtitle,
+    "excerpt": lambda a: a.excerpt,
+    "cover_image": lambda a: a.cover_image,
+    "reading_time": lambda a: a.reading_time,
+    "word_count": lambda a: a.word_count,
+    "status": lambda a: a.status.value,
+    "visibility": lambda a: a.visibility.value,
+    "created_at": lambda a: a.created_at,
+    "updated_at": lambda a: a.updated_at,
+    "published_at": lambda a: a.published_at,
+    "views_count": lambda a: a.views_count,
+    "likes_count": lambda a: a.likes_count,
+    "comments_count": lambda a: a.comments_count,
+    "shares_count": lambda a: a.shares_count,
+    "allow_comments": lambda a: a.allow_comments,
+    "is_featured": lambda a: a.is_featured,
+    "is_pinned": lambda a: a.is_pinned,
+    "author": lambda a: a.author.public_profile if a.author else None,
+    "tags": lambda a: [tag.name for tag in a.tags] if a.tags else [],
+    "public_url": lambda a: a.public_url,
+}
+
+CARD_FIELDS = tuple(_CARD_SERIALIZERS)
+
+
+@event.listens_for(Article.content, "set")
+def _reset_content_hash(target, value, oldvalue, initiator):
+    """Сброс хеша отрендеренного HTML при изменении Markdown"""
+    if value != oldvalue:
+        target.content_hash = None
+
+
+class ArticleRender(Base):
+    """Отрендеренный и очищенный HTML, адресуемый хешем Markdown-исходника"""
+    __tablename__ = "article_renders"
+    
+    content_hash = Column(String(64), primary_key=True)
+    html = Column(Text, nullable=False)
+    html_gzip = Column(LargeBinary, nullable=True)  # Заранее сжатые варианты html
+    html_br = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<ArticleRender(content_hash='{self.content_hash}')>"
+
+
+class ArticleRelated(Base):
+    """Предрассчитанные похожие статьи (rank 0 - самая близкая)"""
+    __tablename__ = "article_related"
+    
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    related_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), nullable=False, index=True)
+    score = Column(Float, nullable=False)
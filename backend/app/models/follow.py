@@ -0,0 +1,31 @@
+"""
+Модель графа подписок
+"""
+
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index, CheckConstraint
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class Follow(Base):
+    """
+    Подписка follower_id на following_id. Первичный ключ отвечает на
+    «подписан ли» и не даёт подписаться дважды; индексы по (пользователь,
+    created_at, другой пользователь) покрывают страницы подписок и
+    подписчиков в обоих направлениях без обращения к таблице.
+    """
+    __tablename__ = "follows"
+
+    follower_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    following_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        CheckConstraint("follower_id <> following_id", name="ck_follow_not_self"),
+        Index("idx_follow_following", "follower_id", "created_at", "following_id"),
+        Index("idx_follow_followers", "following_id", "created_at", "follower_id"),
+    )
+
+    def __repr__(self):
+        return f"<Follow(follower_id={self.follower_id}, following_id={self.following_id})>"
@@ -0,0 +1,68 @@
+"""
+Модели ревизий статей
+"""
+
+from sqlalchemy import (
+    Column, Integer, String, Text, Boolean, DateTime, ForeignKey, JSON,
+    LargeBinary, UniqueConstraint
+)
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+class DraftRevision(Base):
+    """
+    Ревизия черновика при автосохранении: либо полный снимок текста,
+    либо дельта относительно предыдущей ревизии (см. app.core.textdiff)
+    """
+    __tablename__ = "article_draft_revisions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), nullable=False)
+    revision = Column(Integer, nullable=False)
+    
+    # Ровно одно из полей заполнено
+    snapshot = Column(Text, nullable=True)
+    delta = Column(JSON, nullable=True)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("article_id", "revision", name="uq_draft_revision"),
+    )
+    
+    def __repr__(self):
+        return f"<DraftRevision(article_id={self.article_id}, revision={self.revision})>"
+    
+    @property
+    def is_snapshot(self) -> bool:
+        """Является ли ревизия полным снимком"""
+        return self.snapshot is not None
+
+
+class ArticleRevision(Base):
+    """
+    Сохранённая версия статьи: сжатый полный текст (ключевой кадр) или
+    сжатая дельта относительно предыдущей сохранённой версии
+    """
+    __tablename__ = "article_revisions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), nullable=False)
+    revision = Column(Integer, nullable=False)
+    
+    is_keyframe = Column(Boolean, default=False, nullable=False)
+    codec = Column(String(8), nullable=False)  # zlib, zstd
+    payload = Column(LargeBinary, nullable=False)
+    content_length = Column(Integer, nullable=False)  # Длина восстановленного текста
+    content_hash = Column(String(64), nullable=False)  # SHA-256 восстановленного текста
+    
+    author_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("article_id", "revision", name="uq_article_revision"),
+    )
+    
+    def __repr__(self):
+        return f"<ArticleRevision(article_id={self.article_id}, revision={self.revision}, keyframe={self.is_keyframe})>"
@@ -0,0 +1,146 @@
+"""
+Поисковые индексы: полнотекстовый индекс статей (tsvector + GIN в
+PostgreSQL, FTS5 в SQLite) и триграммные индексы пользователей (pg_trgm)
+"""
+
+from sqlalchemy import DDL, event
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import settings
+from app.models.article import Article
+from app.models.user import User
+
+# Веса полей: заголовок важнее подзаголовка, тот - описания, описание - текста
+SEARCH_FIELDS = ("title", "subtitle", "excerpt", "content")
+SEARCH_WEIGHTS = ("A", "B", "C", "D")  # PostgreSQL setweight
+FTS5_WEIGHTS = (10.0, 5.0, 2.0, 1.0)  # SQLite bm25, в порядке колонок FTS5
+
+FTS_TABLE = "articles_fts"
+
+
+def weighted_vector(prefix: str = "") -> str:
+    """Выражение tsvector статьи с весами полей"""
+    return " || ".join(
+        f"setweight(to_tsvector('{settings.SEARCH_TS_CONFIG}', coalesce({prefix}{field}, '')), '{weight}')"
+        for field, weight in zip(SEARCH_FIELDS, SEARCH_WEIGHTS)
+    )
+
+
+_fields = ", ".join(SEARCH_FIELDS)
+_new_fields = ", ".join(f"new.{field}" for field in SEARCH_FIELDS)
+_old_fields = ", ".join(f"old.{field}" for field in SEARCH_FIELDS)
+
+# PostgreSQL: хранимая колонка search_vector, пересчитываемая триггером только
+# при изменении текстовых полей (UPDATE счётчиков вектор не пересобирает)
+POSTGRES_DDL = (
+    "ALTER TABLE articles ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    f"""
+    CREATE OR REPLACE FUNCTION articles_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {weighted_vector('NEW.')};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS articles_search_vector ON articles",
+    f"""
+    CREATE TRIGGER articles_search_vector
+    BEFORE INSERT OR UPDATE OF {_fields} ON articles
+    FOR EACH ROW EXECUTE FUNCTION articles_search_vector_update()
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_article_search ON articles USING GIN (search_vector)",
+    # Заполнение вектора уже существующих статей
+    f"UPDATE articles SET search_vector = {weighted_vector()} WHERE search_vector IS NULL",
+)
+
+
+# SQLite: FTS5-таблица с внешним содержимым (текст не дублируется),
+# синхронизируемая триггерами
+def fts_table_ddl(name: str = FTS_TABLE) -> str:
+    """CREATE для FTS5-таблицы статей (другое имя - при перестройке с подменой)"""
+    return f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5(
+        {_fields}, content='articles', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """
+
+
+SQLITE_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON articles BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_fields}) VALUES (new.id, {_new_fields});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON articles BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_fields}) VALUES ('delete', old.id, {_old_fields});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_fields} ON articles BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_fields}) VALUES ('delete', old.id, {_old_fields});
+        INSERT INTO {FTS_TABLE}(rowid, {_fields}) VALUES (new.id, {_new_fields});
+    END
+    """,
+)
+SQLITE_TRIGGER_NAMES = tuple(f"{FTS_TABLE}_{suffix}" for suffix in ("ai", "ad", "au"))
+
+SQLITE_DDL = (
+    fts_table_ddl(),
+    *SQLITE_TRIGGERS,
+    # Заполнение индекса уже существующими статьями
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+for _statement in POSTGRES_DDL:
+    event.listen(Article.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+for _statement in SQLITE_DDL:
+    event.listen(Article.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+
+# PostgreSQL: триграммы для поиска пользователей по подстроке и с опечатками;
+# префиксный btree - для запросов короче триграммы. В SQLite поиск идёт по
+# индексу в памяти процесса (app.services.user_search)
+POSTGRES_USER_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS idx_user_username_trgm ON users USING GIN (lower(username) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_user_display_name_trgm ON users USING GIN (lower(display_name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_user_username_prefix ON users (lower(username) text_pattern_ops)",
+)
+
+for _statement in POSTGRES_USER_DDL:
+    event.listen(User.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+
+
+async def ensure_search_schema(conn: AsyncConnection) -> bool:
+    """
+    Поисковые индексы для уже существующей БД: after_create срабатывает
+    только при создании таблиц. Выражения идемпотентны; создание и
+    заполнение выполняются, только если индекса ещё нет, поэтому повторный
+    вызов (каждый запуск приложения) ничего не блокирует. True - индекс создан.
+    """
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        exists = (await conn.exec_driver_sql(
+            f"SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '{FTS_TABLE}'"
+        )).first()
+        if exists:
+            return False
+        for statement in SQLITE_DDL:
+            await conn.exec_driver_sql(statement)
+        return True
+
+    if dialect == "postgresql":
+        for statement in POSTGRES_USER_DDL:
+            await conn.exec_driver_sql(statement)
+        exists = (await conn.exec_driver_sql(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = 'articles' AND column_name = 'search_vector'"
+        )).first()
+        if exists:
+            return False
+        for statement in POSTGRES_DDL:
+            await conn.exec_driver_sql(statement)
+        return True
+
+    return False
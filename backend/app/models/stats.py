@@ -0,0 +1,73 @@
+"""
+Модели статистики статей: сырые события и почасовые/посуточные агрегаты
+"""
+
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, Float, Date, DateTime, ForeignKey, Index
+)
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+# В SQLite автоинкремент работает только у INTEGER PRIMARY KEY
+EventId = BigInteger().with_variant(Integer, "sqlite")
+
+
+class ArticleEvent(Base):
+    """
+    Сырое событие статьи. Просмотры пишутся агрегированно (count > 1)
+    при сбросе буфера счётчика, поэтому таблица растёт не на каждый просмотр.
+    """
+    __tablename__ = "article_events"
+
+    id = Column(EventId, primary_key=True, autoincrement=True)
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), nullable=False)
+    event_type = Column(String(20), nullable=False)  # view, like, comment, share, read, ...
+    count = Column(Integer, default=1, nullable=False)
+    value = Column(Float, nullable=True)  # Например, секунды чтения
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("idx_article_event_created", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<ArticleEvent(id={self.id}, article_id={self.article_id}, type='{self.event_type}')>"
+
+
+class _StatsColumns:
+    """Общие колонки агрегатов"""
+    views = Column(Integer, default=0, nullable=False)
+    likes = Column(Integer, default=0, nullable=False)
+    comments = Column(Integer, default=0, nullable=False)
+    shares = Column(Integer, default=0, nullable=False)
+    reads = Column(Integer, default=0, nullable=False)  # Дочитывания
+    read_seconds = Column(Float, default=0, nullable=False)  # Суммарное время чтения
+
+
+class ArticleStatsHourly(_StatsColumns, Base):
+    """Статистика статьи за час (bucket - начало часа, UTC)"""
+    __tablename__ = "article_stats_hourly"
+
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+
+
+class ArticleStatsDaily(_StatsColumns, Base):
+    """Статистика статьи за сутки (UTC)"""
+    __tablename__ = "article_stats_daily"
+
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True)
+    bucket = Column(Date, primary_key=True)
+
+
+class StatsWatermark(Base):
+    """
+    Последнее учтённое в агрегатах событие (по id) для каждого потребителя;
+    строка views_flush - номер последней применённой пачки просмотров
+    """
+    __tablename__ = "stats_watermarks"
+
+    name = Column(String(50), primary_key=True)
+    last_event_id = Column(EventId, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -39,6 +39,7 @@ class User(Base):
     avatar_url = Column(String(500), nullable=True)
     website = Column(String(255), nullable=True)
     location = Column(String(100), nullable=True)
+    is_public_profile = Column(Boolean, default=True)
     
     # Статус и роль
     is_active = Column(Boolean, default=True)
@@ -53,7 +54,8 @@ class User(Base):
     
     # Метаданные
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), index=True)  # Индекс - для синхронизации поиска
+    version = Column(Integer, default=1, server_default="1", nullable=False)  # Растёт при правке профиля (ETag)
     last_login = Column(DateTime(timezone=True), nullable=True)
     
     # Статистика
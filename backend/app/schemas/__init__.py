@@ -6,8 +6,8 @@ from app.schemas.user import (
 )
 from app.schemas.article import (
     ArticleBase, ArticleCreate, ArticleUpdate, ArticleResponse, ArticleDetail,
-    ArticleList, ArticleSearch, ArticleStats, ArticleView, ArticleShare,
-    ArticleDraft, ArticlePublish
+    ArticleList, ArticleFeed, ArticleSearch, ArticleStats, ArticleView, ArticleShare,
+    ArticleDraft, ArticlePublish, DraftPatch, DraftState
 )
 
 # Экспорт всех схем
@@ -19,6 +19,6 @@ __all__ = [
     
     # Article schemas
     "ArticleBase", "ArticleCreate", "ArticleUpdate", "ArticleResponse", "ArticleDetail",
-    "ArticleList", "ArticleSearch", "ArticleStats", "ArticleView", "ArticleShare",
-    "ArticleDraft", "ArticlePublish",
+    "ArticleList", "ArticleFeed", "ArticleSearch", "ArticleStats", "ArticleView", "ArticleShare",
+    "ArticleDraft", "ArticlePublish", "DraftPatch", "DraftState",
 ] 
\ No newline at end of file
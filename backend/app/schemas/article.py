@@ -1,6 +1,6 @@
-from typing import Optional, List
-from pydantic import BaseModel, Field, field_validator
-from datetime import datetime
+from typing import Optional, List, Literal, Union
+from pydantic import BaseModel, Field, field_validator, model_validator
+from datetime import datetime, timezone
 import uuid
 
 from app.models.article import ArticleStatus, ArticleVisibility
@@ -79,7 +79,18 @@ class ArticleUpdate(BaseModel):
             return v
         if len(v) > 20:
             raise ValueError('Maximum 20 meta keywords allowed')
+        # Хранятся одной строкой через запятую (String(255))
+        if len(", ".join(v)) > 255:
+            raise ValueError('Meta keywords must fit in 255 characters')
         return v
+    
+    @model_validator(mode='after')
+    def reject_unsupported_fields(self):
+        # У статьи пока нет колонок под эти поля - молча отбрасывать их нельзя
+        unsupported = sorted(self.model_fields_set & {"meta_title", "cover_image_alt", "allow_likes"})
+        if unsupported:
+            raise ValueError(f"Fields are not supported yet: {', '.join(unsupported)}")
+        return self
 
 
 class ArticleResponse(ArticleBase):
@@ -126,6 +137,13 @@ class ArticleList(BaseModel):
     has_prev: bool
 
 
+class ArticleFeed(BaseModel):
+    """Лента статей с курсорной пагинацией"""
+    articles: List[dict]
+    next_cursor: Optional[str] = None
+    has_next: bool
+
+
 class ArticleSearch(BaseModel):
     """Параметры поиска статей"""
     query: Optional[str] = None
@@ -176,6 +194,28 @@ class ArticleDraft(BaseModel):
     auto_save: bool = True
 
 
+class DraftPatch(BaseModel):
+    """Дельта автосохранения черновика относительно известной ревизии"""
+    base_revision: int = Field(..., ge=0)
+    ops: List[Union[int, str]] = Field(..., max_length=10000)
+    
+    @field_validator('ops')
+    @classmethod
+    def validate_ops(cls, v):
+        if any(op == 0 for op in v if isinstance(op, int)):
+            raise ValueError('Zero-length operations are not allowed')
+        if sum(len(op) for op in v if isinstance(op, str)) > 50000:
+            raise ValueError('Inserted text must be less than 50,000 characters')
+        return v
+
+
+class DraftState(BaseModel):
+    """Состояние черновика"""
+    revision: int
+    length: int
+    content: Optional[str] = None
+
+
 class ArticlePublish(BaseModel):
     """Публикация статьи"""
     status: ArticleStatus = ArticleStatus.PUBLISHED
@@ -183,9 +223,35 @@ class ArticlePublish(BaseModel):
     publish_now: bool = True
     scheduled_at: Optional[datetime] = None
     
-    @field_validator('scheduled_at', mode='before')
+    @field_validator('scheduled_at')
     @classmethod
     def validate_scheduled_at(cls, v):
-        if v and v <= datetime.utcnow():
+        if v is None:
+            return v
+        # Время без часового пояса считается UTC
+        if v.tzinfo is None:
+            v = v.replace(tzinfo=timezone.utc)
+        if v <= datetime.now(timezone.utc):
             raise ValueError('Scheduled time must be in the future')
-        return v 
\ No newline at end of file
+        return v 
+
+class ReadingEvent(BaseModel):
+    """
+    Событие чтения из beacon: scroll - глубина прокрутки (0-100%),
+    time - секунды на странице с прошлого beacon, read - статья дочитана
+    """
+    article_id: int = Field(..., ge=1)
+    type: Literal["scroll", "time", "read"]
+    value: Optional[float] = Field(None, ge=0, le=3600)
+    
+    @field_validator('value')
+    @classmethod
+    def validate_value(cls, v, info):
+        if v is not None and info.data.get('type') == 'scroll' and v > 100:
+            raise ValueError('Scroll depth must be between 0 and 100')
+        return v
+
+
+class ReadingBeacon(BaseModel):
+    """Пакет событий чтения, отправляемый navigator.sendBeacon"""
+    events: List[ReadingEvent] = Field(..., min_length=1, max_length=50)
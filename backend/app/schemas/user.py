@@ -87,6 +87,25 @@ class UserProfile(UserResponse):
     total_likes: int = 0
 
 
+class PublicUserProfile(BaseModel):
+    """Профиль пользователя из read model (без email и служебных полей)"""
+    id: int
+    username: str
+    display_name: Optional[str] = None
+    bio: Optional[str] = None
+    avatar_url: Optional[str] = None
+    website: Optional[str] = None
+    location: Optional[str] = None
+    is_public_profile: bool = True
+    articles_count: int = 0
+    followers_count: int = 0
+    following_count: int = 0
+    total_views: int = 0
+    total_likes: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
 class UserList(BaseModel):
     """Список пользователей для пагинации"""
     users: List[UserResponse]
@@ -2,10 +2,12 @@
 from app.services.user_service import UserService
 from app.services.auth_service import AuthService
 from app.services.email_service import EmailService
+from app.services.article_service import ArticleService
 
 # Экспорт всех сервисов
 __all__ = [
     "UserService",
     "AuthService", 
     "EmailService",
+    "ArticleService",
 ] 
\ No newline at end of file
@@ -0,0 +1,406 @@
+"""
+Сервис для работы со статьями
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload, load_only
+from sqlalchemy.orm.attributes import flag_modified
+from sqlalchemy import case, func, tuple_, update
+from datetime import datetime, timezone
+from typing import Optional, List, Tuple, Iterable, FrozenSet, Set
+from slugify import slugify
+
+from app.models.article import Article, ArticleRelated, ArticleStatus, ArticleVisibility, CARD_FIELDS
+from app.models.tag import Tag
+from app.models.user import User
+from app.schemas.article import ArticlePublish, ArticleUpdate
+from app.core.pagination import encode_cursor, decode_cursor
+from app.services.draft_service import DraftService
+from app.services.revision_service import RevisionService
+from app.services.search_cache import search_cache
+from app.services.tag_search import notify_tags_changed
+import structlog
+
+logger = structlog.get_logger()
+
+# Колонки, без которых нельзя сериализовать поле карточки
+_FIELD_COLUMNS = {
+    "author": ("author_id",),
+    "public_url": ("author_id", "slug"),
+    "tags": (),
+}
+
+# Колонки автора, которые читает User.public_profile в карточке
+_AUTHOR_COLUMNS = (
+    "username", "display_name", "bio", "avatar_url", "website", "location",
+    "articles_count", "followers_count", "created_at"
+)
+
+# Поля ArticleUpdate, которые переносятся в статью как есть
+_UPDATE_FIELDS = ("title", "excerpt", "visibility", "allow_comments", "meta_description")
+
+# Скорость чтения для оценки reading_time (слов в минуту)
+WORDS_PER_MINUTE = 200
+
+# Колонки, всегда нужные спискам (ключ keyset-пагинации)
+_LIST_COLUMNS = ("published_at",)
+
+# Счётчики карточки и поля профиля автора: меняют тело ответа, но не
+# version статьи, поэтому входят в её ETag (см. etag_parts)
+COUNTER_FIELDS = ("views_count", "likes_count", "comments_count", "shares_count")
+AUTHOR_VALIDATOR_FIELDS = ("version", "updated_at", "articles_count", "followers_count")
+
+
+def _validator_columns() -> tuple:
+    """Колонки для etag_parts; поля автора - с префиксом author_ (нужен join User)"""
+    return (
+        *(getattr(Article, field) for field in COUNTER_FIELDS),
+        *(getattr(User, field).label(f"author_{field}") for field in AUTHOR_VALIDATOR_FIELDS)
+    )
+
+
+def etag_parts(article) -> tuple:
+    """
+    Части ETag статьи: по строке get_validators_by_slug/get_feed_keys или
+    по загруженной статье с автором - для обеих одинаковые
+    """
+    if isinstance(article, Article):
+        author = article.author
+        author_values = tuple(getattr(author, field) if author else None for field in AUTHOR_VALIDATOR_FIELDS)
+    else:
+        author_values = tuple(getattr(article, f"author_{field}") for field in AUTHOR_VALIDATOR_FIELDS)
+    return (
+        article.id, article.version, article.updated_at,
+        *(getattr(article, field) for field in COUNTER_FIELDS),
+        *author_values
+    )
+
+
+def parse_fields(fields: Optional[str]) -> Optional[FrozenSet[str]]:
+    """Разбор параметра fields=a,b,c (ValueError для неизвестных полей)"""
+    if not fields:
+        return None
+
+    requested = frozenset(field.strip() for field in fields.split(",") if field.strip())
+    unknown = requested.difference(CARD_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return requested
+
+
+def text_stats(content: str) -> Tuple[int, int]:
+    """Число слов и время чтения (в минутах) для текста статьи"""
+    word_count = len(content.split())
+    return word_count, max(1, round(word_count / WORDS_PER_MINUTE))
+
+
+def card_options(fields: Optional[Iterable[str]] = None) -> list:
+    """
+    Опции загрузки для карточек статей: в SELECT попадают только колонки,
+    нужные запрошенным полям (content, settings, analytics - никогда).
+    Обращение к незагруженной колонке вызывает ошибку, а не скрытый запрос.
+    """
+    selected = CARD_FIELDS if fields is None else tuple(fields)
+
+    columns = set(_LIST_COLUMNS)
+    for field in selected:
+        columns.update(_FIELD_COLUMNS.get(field, (field,)))
+    columns.discard("id")
+
+    options = [load_only(*(getattr(Article, column) for column in sorted(columns)), raiseload=True)]
+    if "author" in selected or "public_url" in selected:
+        options.append(
+            selectinload(Article.author).load_only(*(getattr(User, column) for column in _AUTHOR_COLUMNS))
+        )
+    if "tags" in selected:
+        options.append(selectinload(Article.tags))
+    return options
+
+
+class ArticleService:
+    """Сервис для работы со статьями"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_by_slug(self, slug: str) -> Optional[Article]:
+        """Получение статьи по slug вместе с автором и тегами"""
+        result = await self.db.execute(
+            select(Article)
+            .where(Article.slug == slug)
+            .options(
+                selectinload(Article.author),
+                selectinload(Article.tags)
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def get_ref_by_slug(self, slug: str):
+        """Лёгкая выборка id/автора/статуса статьи без загрузки строки целиком"""
+        result = await self.db.execute(
+            select(Article.id, Article.author_id, Article.status, Article.visibility, Article.draft_revision)
+            .where(Article.slug == slug)
+        )
+        return result.one_or_none()
+
+    async def get_validators_by_slug(self, slug: str):
+        """
+        Только поля для ETag/Last-Modified (etag_parts) и проверки доступа,
+        без строки целиком
+        """
+        result = await self.db.execute(
+            select(
+                Article.id,
+                Article.version,
+                Article.content_hash,
+                Article.status,
+                Article.visibility,
+                Article.created_at,
+                Article.updated_at,
+                Article.published_at,
+                *_validator_columns()
+            )
+            .outerjoin(User, User.id == Article.author_id)
+            .where(Article.slug == slug)
+        )
+        return result.one_or_none()
+
+    async def get_published_by_ids(
+        self,
+        article_ids: List[int],
+        fields: Optional[Iterable[str]] = None
+    ) -> List[Article]:
+        """Публичные статьи (карточки) по списку id в порядке этого списка"""
+        if not article_ids:
+            return []
+
+        result = await self.db.execute(
+            select(Article)
+            .where(
+                Article.id.in_(article_ids),
+                Article.status == ArticleStatus.PUBLISHED,
+                Article.visibility == ArticleVisibility.PUBLIC
+            )
+            .options(*card_options(fields))
+        )
+        articles = {article.id: article for article in result.scalars().all()}
+        return [articles[article_id] for article_id in article_ids if article_id in articles]
+
+    async def get_related(
+        self,
+        article_id: int,
+        limit: int = 5,
+        fields: Optional[Iterable[str]] = None
+    ) -> List[Article]:
+        """Похожие статьи из предрассчитанного article_related (чтение по первичному ключу)"""
+        result = await self.db.execute(
+            select(Article)
+            .join(ArticleRelated, ArticleRelated.related_id == Article.id)
+            .where(
+                ArticleRelated.article_id == article_id,
+                Article.status == ArticleStatus.PUBLISHED,
+                Article.visibility == ArticleVisibility.PUBLIC
+            )
+            .options(*card_options(fields))
+            .order_by(ArticleRelated.rank)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def get_feed_keys(self, limit: int = 20, cursor: Optional[str] = None):
+        """
+        Страница ленты без карточек: id, published_at и поля etag_parts по
+        keyset-пагинации (published_at, id). Условие на курсор идёт по
+        индексу idx_article_published, поэтому глубокие страницы стоят
+        столько же, сколько первая. По этим строкам считается ETag страницы.
+        """
+        query = (
+            select(
+                Article.id, Article.version, Article.updated_at, Article.published_at,
+                *_validator_columns()
+            )
+            .outerjoin(User, User.id == Article.author_id)
+            .where(
+                Article.status == ArticleStatus.PUBLISHED,
+                Article.visibility == ArticleVisibility.PUBLIC,
+                Article.published_at.isnot(None)
+            )
+            .order_by(Article.published_at.desc(), Article.id.desc())
+            .limit(limit + 1)
+        )
+
+        if cursor:
+            published_at, article_id = decode_cursor(cursor, datetime, int)
+            query = query.where(
+                tuple_(Article.published_at, Article.id) < (published_at, article_id)
+            )
+
+        result = await self.db.execute(query)
+        keys = list(result.all())
+
+        next_cursor = None
+        if len(keys) > limit:
+            keys = keys[:limit]
+            last = keys[-1]
+            next_cursor = encode_cursor(last.published_at, last.id)
+
+        return keys, next_cursor
+
+    async def get_published_feed(
+        self,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None
+    ) -> Tuple[List[Article], Optional[str]]:
+        """
+        Лента опубликованных статей: ключи страницы (get_feed_keys), затем
+        карточки по id. Авторы и теги догружаются пакетно (selectinload),
+        тяжёлые колонки не выбираются (см. card_options).
+        """
+        keys, next_cursor = await self.get_feed_keys(limit, cursor)
+        articles = await self.get_published_by_ids([key.id for key in keys], fields)
+        return articles, next_cursor
+
+    async def update_article(self, article: Article, data: ArticleUpdate, editor_id: int) -> Article:
+        """
+        Обновление статьи. При изменении текста прежняя версия уходит в
+        историю (RevisionService), а черновик начинается заново от нового текста.
+        """
+        values = data.model_dump(exclude_unset=True)
+        was_published = article.status == ArticleStatus.PUBLISHED
+
+        for field in _UPDATE_FIELDS:
+            if field in values:
+                setattr(article, field, values[field])
+        if "cover_image_url" in values:
+            article.cover_image = values["cover_image_url"]
+        if "meta_keywords" in values:
+            article.meta_keywords = ", ".join(values["meta_keywords"]) if values["meta_keywords"] else None
+
+        status = values.get("status")
+        if status is not None and status != article.status:
+            article.status = status
+            if status == ArticleStatus.PUBLISHED:
+                article.publish_at = None
+                if article.published_at is None:
+                    article.published_at = datetime.now(timezone.utc)
+
+        changed_tags: Set[int] = set()
+        if values.get("tags") is not None:
+            changed_tags = await self._set_tags(article, values["tags"])
+
+        content = values.get("content")
+        if content is not None and content != article.content:
+            old_content = article.content
+            article.content = content
+            article.word_count, article.reading_time = text_stats(content)
+
+            await RevisionService(self.db).record(article.id, old_content, content, editor_id)
+            await DraftService(self.db).reset(article.id, content)
+
+        await self.db.commit()
+        # Эти колонки менялись на стороне БД (onupdate, UPDATE в DraftService)
+        await self.db.refresh(article, ["updated_at", "draft_revision"])
+        await notify_tags_changed(changed_tags)
+        if was_published or article.status == ArticleStatus.PUBLISHED:
+            await search_cache.bump()
+        return article
+
+    async def _set_tags(self, article: Article, names: List[str]) -> Set[int]:
+        """
+        Замена тегов статьи (article.tags должны быть загружены): недостающие
+        теги создаются, articles_count меняется только у добавленных и
+        снятых. Возвращает id тегов с изменённым счётчиком.
+        """
+        wanted = {}
+        for name in names:
+            slug = slugify(name, max_length=50)
+            if slug:
+                wanted.setdefault(slug, name.strip()[:50])
+        current = {tag.slug: tag for tag in article.tags}
+        if set(wanted) == set(current):
+            return set()
+
+        result = await self.db.execute(select(Tag).where(Tag.slug.in_(list(wanted))))
+        tags = {tag.slug: tag for tag in result.scalars().all()}
+        for slug, name in wanted.items():
+            if slug not in tags:
+                tags[slug] = Tag(name=name, slug=slug, articles_count=0)
+                self.db.add(tags[slug])
+        await self.db.flush()
+
+        shifts = {tags[slug].id: 1 for slug in wanted if slug not in current}
+        shifts.update({tag.id: -1 for slug, tag in current.items() if slug not in wanted})
+        article.tags = [tags[slug] for slug in wanted]
+        # Связи живут в article_tags - строку статьи обновляем явно, чтобы
+        # выросла version (теги входят в карточку и её ETag)
+        flag_modified(article, "title")
+
+        await self.db.execute(
+            update(Tag)
+            .where(Tag.id.in_(list(shifts)))
+            .values(
+                articles_count=func.coalesce(Tag.articles_count, 0) + case(shifts, value=Tag.id, else_=0),
+                updated_at=Tag.updated_at
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return set(shifts)
+
+    async def publish(self, article: Article, data: ArticlePublish) -> bool:
+        """
+        Публикация статьи сразу или планирование на data.scheduled_at
+        (статья остаётся черновиком до publish_at). True - опубликована сейчас.
+        """
+        article.visibility = data.visibility
+
+        if data.scheduled_at is not None:
+            article.publish_at = data.scheduled_at
+            published = False
+        else:
+            article.publish_at = None
+            # Любой переход в PUBLISHED (в том числе из архива) запускает пост-обработку
+            published = data.status == ArticleStatus.PUBLISHED and article.status != ArticleStatus.PUBLISHED
+            article.status = data.status
+            if published and article.published_at is None:
+                article.published_at = datetime.now(timezone.utc)
+
+        await self.db.commit()
+        if data.scheduled_at is None:
+            # Публикация, снятие с публикации или смена видимости
+            await search_cache.bump()
+        return published
+
+    async def publish_due(self, now: datetime, limit: int) -> List[int]:
+        """
+        Публикация всех статей, чей publish_at наступил, одним UPDATE.
+        Кандидаты выбираются диапазоном по индексу idx_article_scheduled;
+        повторная проверка статуса в UPDATE не даёт двум параллельным
+        проходам опубликовать статью дважды. Возвращает id опубликованных.
+        """
+        due = (
+            select(Article.id)
+            .where(Article.status == ArticleStatus.DRAFT, Article.publish_at <= now)
+            .order_by(Article.publish_at)
+            .limit(limit)
+        )
+        result = await self.db.execute(
+            update(Article)
+            .where(Article.id.in_(due.scalar_subquery()), Article.status == ArticleStatus.DRAFT)
+            .values(
+                status=ArticleStatus.PUBLISHED,
+                published_at=Article.publish_at,
+                publish_at=None,
+                version=Article.version + 1
+            )
+            .returning(Article.id)
+            .execution_options(synchronize_session=False)
+        )
+        article_ids = list(result.scalars().all())
+        await self.db.commit()
+
+        if article_ids:
+            await search_cache.bump()
+            logger.info("Scheduled articles published", count=len(article_ids))
+        return article_ids
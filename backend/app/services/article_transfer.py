@@ -0,0 +1,256 @@
+"""
+Потоковый экспорт и импорт статей в NDJSON (одна статья на строку)
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import insert, update, case, func
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, TextIO
+import json
+import structlog
+from slugify import slugify
+
+from app.models.article import Article, ArticleStatus, ArticleVisibility
+from app.models.tag import Tag, article_tags
+from app.models.user import User
+from app.services.article_service import text_stats
+from app.services.search_cache import search_cache
+from app.services.tag_search import notify_tags_changed
+
+logger = structlog.get_logger()
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Колонки статьи, которые переносятся как есть
+EXPORT_COLUMNS = (
+    "slug", "title", "subtitle", "content", "excerpt", "cover_image",
+    "status", "visibility", "allow_comments",
+    "meta_description", "meta_keywords", "canonical_url",
+    "views_count", "likes_count", "comments_count", "shares_count",
+    "created_at", "updated_at", "published_at",
+)
+
+_DATETIME_COLUMNS = ("created_at", "updated_at", "published_at")
+_COUNTER_COLUMNS = ("views_count", "likes_count", "comments_count", "shares_count")
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (ArticleStatus, ArticleVisibility)):
+        return value.value
+    raise TypeError(f"Unsupported type: {type(value).__name__}")
+
+
+async def export_articles(db: AsyncSession, out: TextIO, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Выгрузка статей в NDJSON. Строки читаются серверным курсором пачками
+    по batch_size (yield_per), теги догружаются одним запросом на пачку -
+    память не зависит от числа статей.
+    """
+    query = (
+        select(Article.id, *(getattr(Article, column) for column in EXPORT_COLUMNS), User.username)
+        .join(User, User.id == Article.author_id)
+        .order_by(Article.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+    exported = 0
+    result = await db.stream(query)
+    async for rows in result.partitions():
+        tags = await _load_tag_names(db, [row.id for row in rows])
+        for row in rows:
+            record = {column: getattr(row, column) for column in EXPORT_COLUMNS}
+            record["author"] = row.username
+            record["tags"] = tags.get(row.id, [])
+            out.write(json.dumps(record, ensure_ascii=False, default=_json_default))
+            out.write("\n")
+        exported += len(rows)
+        logger.info("Articles exported", count=exported)
+
+    return exported
+
+
+async def import_articles(
+    db: AsyncSession,
+    lines: Iterable[str],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    default_author: Optional[str] = None
+) -> Dict[str, int]:
+    """
+    Загрузка статей из NDJSON пачками по batch_size: многострочные INSERT
+    без ORM-объектов, авторы и теги разрешаются одним запросом на пачку.
+    Статьи с уже существующим slug пропускаются, поэтому прерванный
+    импорт можно просто запустить заново.
+    """
+    stats = Counter(imported=0, skipped=0, tags_created=0)
+    authors: Dict[str, Optional[int]] = {}
+
+    batch: List[dict] = []
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            batch.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {line_number}: invalid JSON ({e.msg})")
+        if len(batch) >= batch_size:
+            await _import_batch(db, batch, authors, default_author, stats)
+            batch = []
+    if batch:
+        await _import_batch(db, batch, authors, default_author, stats)
+
+    if stats["imported"]:
+        await search_cache.bump()
+    return dict(stats)
+
+
+async def _import_batch(
+    db: AsyncSession,
+    records: List[dict],
+    authors: Dict[str, Optional[int]],
+    default_author: Optional[str],
+    stats: Counter
+) -> None:
+    """Вставка одной пачки статей, их тегов и связей article_tags"""
+    # Авторы: кеш username -> id на весь импорт, новые - одним запросом
+    usernames = {record.get("author") or default_author for record in records}
+    usernames.add(default_author)
+    unknown = [username for username in usernames if username and username not in authors]
+    if unknown:
+        result = await db.execute(select(User.username, User.id).where(User.username.in_(unknown)))
+        found = dict(result.all())
+        for username in unknown:
+            authors[username] = found.get(username)
+
+    # Существующие slug (в том числе из прошлого запуска) пропускаются
+    slugs = [record.get("slug") for record in records]
+    result = await db.execute(select(Article.slug).where(Article.slug.in_([slug for slug in slugs if slug])))
+    seen = set(result.scalars().all())
+
+    rows = []
+    tag_names: Dict[str, List[str]] = {}
+    for record in records:
+        slug = record.get("slug")
+        author_id = authors.get(record.get("author")) or authors.get(default_author)
+        if not slug or slug in seen or not author_id or not record.get("title") or record.get("content") is None:
+            stats["skipped"] += 1
+            continue
+        seen.add(slug)
+        rows.append(_article_row(record, author_id))
+        tag_names[slug] = record.get("tags") or []
+
+    if not rows:
+        return
+
+    result = await db.execute(insert(Article.__table__).returning(Article.id, Article.slug), rows)
+    article_ids = {slug: article_id for article_id, slug in result.all()}
+
+    tag_ids = await _link_tags(db, article_ids, tag_names, stats)
+
+    articles_per_author = Counter(row["author_id"] for row in rows)
+    await db.execute(
+        update(User)
+        .where(User.id.in_(list(articles_per_author)))
+        .values(
+            articles_count=func.coalesce(User.articles_count, 0)
+            + case(dict(articles_per_author), value=User.id, else_=0),
+            updated_at=User.updated_at
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    await db.commit()
+    await notify_tags_changed(tag_ids)
+    stats["imported"] += len(rows)
+    logger.info("Articles imported", count=stats["imported"], skipped=stats["skipped"])
+
+
+def _article_row(record: dict, author_id: int) -> dict:
+    """Строка для INSERT; у всех строк пачки одинаковый набор ключей"""
+    row = {column: record.get(column) for column in EXPORT_COLUMNS}
+    row["author_id"] = author_id
+    row["status"] = ArticleStatus(row["status"] or ArticleStatus.DRAFT.value)
+    row["visibility"] = ArticleVisibility(row["visibility"] or ArticleVisibility.PUBLIC.value)
+    row["allow_comments"] = True if row["allow_comments"] is None else bool(row["allow_comments"])
+    for column in _DATETIME_COLUMNS:
+        if row[column]:
+            row[column] = datetime.fromisoformat(row[column])
+    for column in _COUNTER_COLUMNS:
+        row[column] = int(row[column] or 0)
+    if row["created_at"] is None:
+        row["created_at"] = row["published_at"] or datetime.now(timezone.utc)
+    row["word_count"], row["reading_time"] = text_stats(row["content"])
+    return row
+
+
+async def _link_tags(
+    db: AsyncSession,
+    article_ids: Dict[str, int],
+    tag_names: Dict[str, List[str]],
+    stats: Counter
+) -> Set[int]:
+    """
+    Массовое разрешение тегов по slug и вставка связей article_tags;
+    возвращает id созданных тегов и тегов с изменённым счётчиком
+    """
+    names: Dict[str, str] = {}
+    for slug in article_ids:
+        for name in tag_names[slug]:
+            names.setdefault(slugify(name, max_length=50), name.strip()[:50])
+    names.pop("", None)
+    if not names:
+        return set()
+
+    result = await db.execute(select(Tag.slug, Tag.id).where(Tag.slug.in_(list(names))))
+    tag_ids = dict(result.all())
+
+    missing = [{"name": names[slug], "slug": slug, "articles_count": 0} for slug in names if slug not in tag_ids]
+    if missing:
+        result = await db.execute(insert(Tag.__table__).returning(Tag.slug, Tag.id), missing)
+        tag_ids.update(result.all())
+        stats["tags_created"] += len(missing)
+
+    links = {
+        (article_id, tag_ids[slugify(name, max_length=50)])
+        for slug, article_id in article_ids.items()
+        for name in tag_names[slug]
+        if slugify(name, max_length=50) in tag_ids
+    }
+    if not links:
+        return set(tag_ids.values())
+
+    await db.execute(
+        insert(article_tags),
+        [{"article_id": article_id, "tag_id": tag_id} for article_id, tag_id in links]
+    )
+
+    articles_per_tag = Counter(tag_id for _, tag_id in links)
+    await db.execute(
+        update(Tag)
+        .where(Tag.id.in_(list(articles_per_tag)))
+        .values(
+            articles_count=func.coalesce(Tag.articles_count, 0)
+            + case(dict(articles_per_tag), value=Tag.id, else_=0),
+            updated_at=Tag.updated_at
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return set(articles_per_tag)
+
+
+async def _load_tag_names(db: AsyncSession, article_ids: List[int]) -> Dict[int, List[str]]:
+    """Имена тегов для пачки статей одним запросом"""
+    result = await db.execute(
+        select(article_tags.c.article_id, Tag.name)
+        .join(Tag, Tag.id == article_tags.c.tag_id)
+        .where(article_tags.c.article_id.in_(article_ids))
+        .order_by(article_tags.c.article_id, Tag.name)
+    )
+    tags: Dict[int, List[str]] = {}
+    for article_id, name in result:
+        tags.setdefault(article_id, []).append(name)
+    return tags
@@ -166,10 +166,7 @@ class AuthService:
         """Обновление Telegram данных пользователя"""
         try:
             update_data = {
-                "telegram_id": str(telegram_data.get("id")),
-                "telegram_username": telegram_data.get("username"),
-                "first_name": telegram_data.get("first_name"),
-                "last_name": telegram_data.get("last_name")
+                "telegram_id": str(telegram_data.get("id"))
             }
             
             await self.user_service.update_user(user_id, update_data)
@@ -256,15 +253,9 @@ class AuthService:
             # Обновление данных пользователя
             update_data = {
                 "telegram_id": telegram_data.telegram_id,
-                "telegram_username": telegram_data.telegram_username,
                 "telegram_notifications": True
             }
             
-            if telegram_data.first_name:
-                update_data["first_name"] = telegram_data.first_name
-            if telegram_data.last_name:
-                update_data["last_name"] = telegram_data.last_name
-            
             user = await self.user_service.update_user(user_id, update_data)
             return user is not None
             
@@ -277,7 +268,6 @@ class AuthService:
         try:
             update_data = {
                 "telegram_id": None,
-                "telegram_username": None,
                 "telegram_notifications": False
             }
             
@@ -0,0 +1,169 @@
+"""
+Сервис автосохранения черновиков дельтами
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import update, delete, func
+from typing import List, Tuple
+import structlog
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.textdiff import DeltaOp, apply_delta
+from app.models.article import Article
+from app.models.revision import DraftRevision
+
+logger = structlog.get_logger()
+
+# Текст последней ревизии черновика: (article_id, revision) -> content.
+# Ревизии неизменяемы, поэтому записи не устаревают
+_draft_cache = LRUCache(maxsize=256)
+
+
+class StaleRevisionError(Exception):
+    """Дельта построена не от текущей ревизии черновика"""
+
+    def __init__(self, current_revision: int):
+        super().__init__(f"Draft is at revision {current_revision}")
+        self.current_revision = current_revision
+
+
+class DraftService:
+    """
+    Черновик хранится как цепочка ревизий: полный снимок каждые
+    DRAFT_SNAPSHOT_INTERVAL ревизий, между ними - дельты. В строке статьи
+    меняется только номер ревизии, сам текст в articles не переписывается.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.snapshot_interval = settings.DRAFT_SNAPSHOT_INTERVAL
+
+    async def get_draft(self, article_id: int) -> Tuple[int, str]:
+        """Текущая ревизия черновика и её текст"""
+        result = await self.db.execute(
+            select(Article.draft_revision).where(Article.id == article_id)
+        )
+        revision = result.scalar_one()
+        return revision, await self._load_text(article_id, revision)
+
+    async def apply_patch(
+        self,
+        article_id: int,
+        base_revision: int,
+        ops: List[DeltaOp]
+    ) -> Tuple[int, str]:
+        """
+        Применение дельты к ревизии base_revision. Устаревшая база
+        отклоняется по одному чтению номера ревизии, до сборки текста.
+        """
+        result = await self.db.execute(
+            select(Article.draft_revision).where(Article.id == article_id)
+        )
+        current = result.scalar_one()
+        if current != base_revision:
+            raise StaleRevisionError(current)
+
+        text = apply_delta(await self._load_text(article_id, base_revision), ops)
+        if len(text) > settings.DRAFT_MAX_LENGTH:
+            raise ValueError(f"Content must be less than {settings.DRAFT_MAX_LENGTH} characters")
+
+        revision = base_revision + 1
+        is_snapshot = revision % self.snapshot_interval == 0
+
+        # Сравнение с базой защищает от гонки двух параллельных сохранений
+        result = await self.db.execute(
+            update(Article)
+            .where(Article.id == article_id, Article.draft_revision == base_revision)
+            .values(draft_revision=revision, updated_at=Article.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            await self.db.rollback()
+            raise StaleRevisionError(await self._current_revision(article_id))
+
+        self.db.add(DraftRevision(
+            article_id=article_id,
+            revision=revision,
+            snapshot=text if is_snapshot else None,
+            delta=None if is_snapshot else ops
+        ))
+        if is_snapshot:
+            # Ревизии до нового снимка больше не нужны для сборки текста
+            await self.db.execute(
+                delete(DraftRevision)
+                .where(DraftRevision.article_id == article_id, DraftRevision.revision < revision)
+            )
+        await self.db.commit()
+
+        _draft_cache.set((article_id, revision), text)
+        return revision, text
+
+    async def reset(self, article_id: int, content: str) -> int:
+        """
+        Новая базовая ревизия черновика после сохранения статьи: снимок с
+        сохранённым текстом, прежняя цепочка удаляется. Сессию фиксирует
+        вызывающий код.
+        """
+        await self.db.execute(
+            update(Article)
+            .where(Article.id == article_id)
+            .values(draft_revision=Article.draft_revision + 1)
+            .execution_options(synchronize_session=False)
+        )
+        revision = await self._current_revision(article_id)
+
+        await self.db.execute(
+            delete(DraftRevision).where(DraftRevision.article_id == article_id)
+        )
+        self.db.add(DraftRevision(article_id=article_id, revision=revision, snapshot=content))
+        return revision
+
+    async def _current_revision(self, article_id: int) -> int:
+        result = await self.db.execute(
+            select(Article.draft_revision).where(Article.id == article_id)
+        )
+        return result.scalar_one()
+
+    async def _load_text(self, article_id: int, revision: int) -> str:
+        """Сборка текста ревизии: последний снимок и не более N-1 дельт после него"""
+        text = _draft_cache.get((article_id, revision))
+        if text is not None:
+            return text
+
+        snapshot_revision = (
+            select(func.max(DraftRevision.revision))
+            .where(
+                DraftRevision.article_id == article_id,
+                DraftRevision.revision <= revision,
+                DraftRevision.snapshot.isnot(None)
+            )
+            .scalar_subquery()
+        )
+        result = await self.db.execute(
+            select(DraftRevision)
+            .where(
+                DraftRevision.article_id == article_id,
+                DraftRevision.revision <= revision,
+                DraftRevision.revision >= func.coalesce(snapshot_revision, 0)
+            )
+            .order_by(DraftRevision.revision)
+        )
+        chain = list(result.scalars().all())
+
+        if chain and chain[0].is_snapshot:
+            text = chain[0].snapshot
+            chain = chain[1:]
+        else:
+            # Цепочка начинается от сохранённого текста статьи (ревизия 0)
+            result = await self.db.execute(
+                select(Article.content).where(Article.id == article_id)
+            )
+            text = result.scalar_one()
+
+        for entry in chain:
+            text = apply_delta(text, entry.delta)
+
+        _draft_cache.set((article_id, revision), text)
+        return text
@@ -0,0 +1,124 @@
+"""
+Кэш профилей пользователей (read model) по id и по username
+"""
+
+from redis.exceptions import RedisError
+from datetime import datetime
+from typing import Iterable, Optional
+import json
+import structlog
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis import get_redis
+
+logger = structlog.get_logger()
+
+PROFILE_KEY_PREFIX = "users:profile:"
+PROFILE_USERNAME_KEY_PREFIX = "users:profile:username:"
+
+_DATETIME_FIELDS = ("created_at", "updated_at")
+
+# id по username и профиль по id - за один запрос к Redis
+_GET_BY_USERNAME_SCRIPT = """
+local user_id = redis.call('GET', KEYS[1])
+if not user_id then
+    return false
+end
+return redis.call('GET', ARGV[1] .. user_id)
+"""
+
+
+def _dumps(profile: dict) -> str:
+    return json.dumps({
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in profile.items()
+    })
+
+
+def _loads(raw: str) -> dict:
+    profile = json.loads(raw)
+    for key in _DATETIME_FIELDS:
+        if profile.get(key) is not None:
+            profile[key] = datetime.fromisoformat(profile[key])
+    return profile
+
+
+class ProfileCache:
+    """
+    Профиль хранится один раз (по id), username ссылается на id. Ссылка
+    проверяется по username в самом профиле, поэтому после переименования
+    достаточно удалить профиль по id - старый username перестанет находиться.
+    Счётчики статей и просмотров не инвалидируются и устаревают не дольше
+    PROFILE_CACHE_TTL. Без Redis используется TTL-кэш процесса; изменения
+    из других процессов тогда видны через тот же TTL.
+    """
+
+    def __init__(self):
+        self._local = TTLCache(maxsize=settings.PROFILE_CACHE_SIZE, ttl=settings.PROFILE_CACHE_TTL)
+        self._local_ids = TTLCache(maxsize=settings.PROFILE_CACHE_SIZE, ttl=settings.PROFILE_CACHE_TTL)
+
+    async def get(self, user_id: int) -> Optional[dict]:
+        """Профиль по id (None при промахе)"""
+        redis = await get_redis()
+        if redis is not None:
+            try:
+                raw = await redis.get(f"{PROFILE_KEY_PREFIX}{user_id}")
+                return _loads(raw) if raw else None
+            except RedisError as e:
+                logger.warning("Failed to read profile from Redis", error=str(e))
+        return self._local.get(user_id)
+
+    async def get_by_username(self, username: str) -> Optional[dict]:
+        """Профиль по username (в нижнем регистре)"""
+        profile = None
+        redis = await get_redis()
+        if redis is not None:
+            try:
+                raw = await redis.eval(
+                    _GET_BY_USERNAME_SCRIPT, 1, f"{PROFILE_USERNAME_KEY_PREFIX}{username}", PROFILE_KEY_PREFIX
+                )
+                profile = _loads(raw) if raw else None
+            except RedisError as e:
+                logger.warning("Failed to read profile from Redis", error=str(e))
+                redis = None
+        if redis is None:
+            user_id = self._local_ids.get(username)
+            profile = self._local.get(user_id) if user_id is not None else None
+
+        if profile is None or profile["username"] != username:
+            return None
+        return profile
+
+    async def set(self, profile: dict) -> None:
+        """Сохранение профиля и ссылки username -> id"""
+        redis = await get_redis()
+        if redis is not None:
+            try:
+                async with redis.pipeline(transaction=False) as pipe:
+                    pipe.set(f"{PROFILE_KEY_PREFIX}{profile['id']}", _dumps(profile), ex=settings.PROFILE_CACHE_TTL)
+                    pipe.set(
+                        f"{PROFILE_USERNAME_KEY_PREFIX}{profile['username']}", profile["id"],
+                        ex=settings.PROFILE_CACHE_TTL
+                    )
+                    await pipe.execute()
+                return
+            except RedisError as e:
+                logger.warning("Failed to cache profile in Redis", error=str(e))
+        self._local.set(profile["id"], profile)
+        self._local_ids.set(profile["username"], profile["id"])
+
+    async def invalidate(self, user_ids: Iterable[int]) -> None:
+        """Удаление профилей после изменения (вызывается после коммита)"""
+        user_ids = list(user_ids)
+        for user_id in user_ids:
+            self._local.delete(user_id)
+        redis = await get_redis()
+        if redis is not None and user_ids:
+            try:
+                await redis.delete(*[f"{PROFILE_KEY_PREFIX}{user_id}" for user_id in user_ids])
+            except RedisError as e:
+                logger.warning("Failed to invalidate profiles in Redis", error=str(e))
+
+
+profile_cache = ProfileCache()
@@ -0,0 +1,117 @@
+"""
+Буфер событий чтения из beacon: кольцевой буфер в памяти процесса,
+сбрасываемый в article_events пакетными вставками
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from collections import deque
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Deque, Dict, Iterable, Tuple
+import structlog
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.article import Article
+from app.services.stats_service import record_events
+
+logger = structlog.get_logger()
+
+# Глубина прокрутки хранится с шагом в 10%, чтобы события схлопывались
+SCROLL_STEP = 10
+
+# id статей в одном запросе проверки существования
+ID_CHECK_BATCH = 1000
+
+
+class ReadingBuffer:
+    """
+    Приём событий не трогает БД: они попадают в deque фиксированного размера
+    (при переполнении вытесняются самые старые). При сбросе одинаковые
+    события схлопываются в одну строку article_events с count и суммой value.
+    """
+
+    def __init__(self, maxlen: int):
+        self._events: Deque[Tuple[int, str, float]] = deque(maxlen=maxlen)
+        self._lock = Lock()
+        self.dropped = 0
+
+    def push(self, events: Iterable[Tuple[int, str, float]]) -> None:
+        """Добавление событий (article_id, type, value) в буфер"""
+        with self._lock:
+            for event in events:
+                if len(self._events) == self._events.maxlen:
+                    self.dropped += 1
+                self._events.append(event)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def _drain(self) -> list:
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            logger.warning("Reading events dropped on buffer overflow", dropped=dropped)
+        return events
+
+    async def flush(self, db: AsyncSession) -> int:
+        """Сброс буфера: схлопывание событий и вставка пачками"""
+        events = self._drain()
+        if not events:
+            return 0
+
+        rows: Dict[Tuple[int, str, float], dict] = {}
+        for article_id, event_type, value in events:
+            if event_type == "scroll":
+                key = (article_id, event_type, float(int(value) // SCROLL_STEP * SCROLL_STEP))
+            else:
+                key = (article_id, event_type, 0.0)
+            row = rows.get(key)
+            if row is None:
+                row = rows[key] = {
+                    "article_id": article_id,
+                    "event_type": event_type,
+                    "count": 0,
+                    "value": key[2] if event_type == "scroll" else 0.0,
+                }
+            row["count"] += 1
+            if event_type != "scroll":
+                row["value"] += value
+
+        try:
+            # Идентификаторы приходят от клиента: события удалённых и
+            # несуществующих статей отбрасываются. Проверка идёт пачками -
+            # IN со всеми id буфера превысил бы лимит параметров драйвера
+            article_ids = sorted({row["article_id"] for row in rows.values()})
+            existing = set()
+            for start in range(0, len(article_ids), ID_CHECK_BATCH):
+                result = await db.execute(
+                    select(Article.id).where(Article.id.in_(article_ids[start:start + ID_CHECK_BATCH]))
+                )
+                existing.update(result.scalars())
+            now = datetime.now(timezone.utc)
+            batch = [dict(row, created_at=now) for row in rows.values() if row["article_id"] in existing]
+
+            for start in range(0, len(batch), settings.READING_EVENTS_INSERT_BATCH):
+                await record_events(db, batch[start:start + settings.READING_EVENTS_INSERT_BATCH])
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            # События возвращаются в буфер до следующей попытки
+            self.push(events)
+            raise
+
+        logger.info("Reading events flushed", events=len(events), rows=len(batch))
+        return len(batch)
+
+
+reading_buffer = ReadingBuffer(settings.READING_BUFFER_SIZE)
+
+
+async def flush_reading_events() -> int:
+    """Сброс буфера событий чтения в отдельной сессии БД"""
+    async with AsyncSessionLocal() as db:
+        return await reading_buffer.flush(db)
@@ -0,0 +1,382 @@
+"""
+Индекс похожих статей: TF-IDF по тексту и пересечение тегов
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import delete, insert, or_
+from collections import Counter
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+import math
+import os
+import re
+import numpy as np
+from scipy import sparse
+import structlog
+
+from app.core.config import settings
+from app.core.filelock import index_lock
+from app.models.article import Article, ArticleRelated, ArticleStatus, ArticleVisibility
+from app.models.tag import article_tags
+
+logger = structlog.get_logger()
+
+# Слова из букв длиной от 2 символов; цифры и разметка Markdown отбрасываются
+TOKEN_RE = re.compile(r"[^\W\d_]{2,}")
+
+# Заголовок весит как несколько повторов текста
+TITLE_WEIGHT = 3
+
+# Строк матрицы близости, считаемых за раз (ограничивает пиковую память)
+SIMILARITY_CHUNK = 256
+
+# Статей, читаемых из БД за один fetch
+DOCUMENT_BATCH_SIZE = 1000
+
+# (article_id, токены, id тегов)
+Document = Tuple[int, List[str], List[int]]
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Разбиение текста на слова в нижнем регистре"""
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def _normalize_rows(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    """L2-нормировка строк (косинусная близость становится скалярным произведением)"""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(sparse.diags(1.0 / norms, dtype=np.float32) @ matrix)
+
+
+class RelatedIndex:
+    """
+    Векторы опубликованных статей: строки text_matrix - TF-IDF (словарь и
+    idf фиксируются при полной перестройке), строки tag_matrix - теги.
+    kth_score - близость k-й похожей статьи для каждой строки: по ней
+    инкрементальное обновление решает, чьи списки задевает изменённая статья.
+    """
+
+    def __init__(
+        self,
+        terms: List[str],
+        idf: np.ndarray,
+        ids: np.ndarray,
+        text_matrix: sparse.csr_matrix,
+        tag_ids: np.ndarray,
+        tag_matrix: sparse.csr_matrix,
+        kth_score: np.ndarray
+    ):
+        self.terms = terms
+        self.idf = idf
+        self.vocabulary = {term: column for column, term in enumerate(terms)}
+        self.ids = ids
+        self.text_matrix = text_matrix
+        self.tag_ids = tag_ids
+        self.tag_vocabulary = {int(tag_id): column for column, tag_id in enumerate(tag_ids)}
+        self.tag_matrix = tag_matrix
+        self.kth_score = kth_score
+        self.positions = {int(article_id): row for row, article_id in enumerate(ids)}
+
+    @classmethod
+    def empty(cls, terms: List[str], idf: np.ndarray) -> "RelatedIndex":
+        return cls(
+            terms,
+            idf,
+            np.zeros(0, dtype=np.int64),
+            sparse.csr_matrix((0, len(terms)), dtype=np.float32),
+            np.zeros(0, dtype=np.int64),
+            sparse.csr_matrix((0, 0), dtype=np.float32),
+            np.zeros(0, dtype=np.float32)
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def vectorize(self, documents: List[Document]) -> Tuple[np.ndarray, sparse.csr_matrix, sparse.csr_matrix]:
+        """Векторы документов в текущем словаре; новые теги добавляются в словарь тегов"""
+        rows, columns, values = [], [], []
+        tag_rows, tag_columns = [], []
+        new_tags = []
+
+        for row, (_, tokens, tags) in enumerate(documents):
+            counts = Counter(token for token in tokens if token in self.vocabulary)
+            for term, count in counts.items():
+                column = self.vocabulary[term]
+                rows.append(row)
+                columns.append(column)
+                # Сублинейный tf: длинные статьи не доминируют за счёт повторов
+                values.append((1.0 + math.log(count)) * self.idf[column])
+            for tag_id in set(tags):
+                if tag_id not in self.tag_vocabulary:
+                    self.tag_vocabulary[tag_id] = len(self.tag_vocabulary)
+                    new_tags.append(tag_id)
+                tag_rows.append(row)
+                tag_columns.append(self.tag_vocabulary[tag_id])
+
+        if new_tags:
+            self.tag_ids = np.concatenate([self.tag_ids, np.array(new_tags, dtype=np.int64)])
+            self.tag_matrix.resize((self.tag_matrix.shape[0], len(self.tag_ids)))
+
+        shape = (len(documents), len(self.terms))
+        text = sparse.csr_matrix((np.array(values, dtype=np.float32), (rows, columns)), shape=shape)
+        tag_shape = (len(documents), len(self.tag_ids))
+        tag = sparse.csr_matrix((np.ones(len(tag_rows), dtype=np.float32), (tag_rows, tag_columns)), shape=tag_shape)
+
+        ids = np.array([article_id for article_id, _, _ in documents], dtype=np.int64)
+        return ids, _normalize_rows(text), _normalize_rows(tag)
+
+    def append(self, parts: List[Tuple[np.ndarray, sparse.csr_matrix, sparse.csr_matrix]]) -> None:
+        """Добавление векторизованных пачек (одно склеивание на все пачки)"""
+        if not parts:
+            return
+        tag_columns = len(self.tag_ids)
+        for _, _, tag in parts:
+            tag.resize((tag.shape[0], tag_columns))
+
+        self.ids = np.concatenate([self.ids] + [ids for ids, _, _ in parts])
+        self.text_matrix = sparse.vstack([self.text_matrix] + [text for _, text, _ in parts], format="csr")
+        self.tag_matrix = sparse.vstack([self.tag_matrix] + [tag for _, _, tag in parts], format="csr")
+        added = sum(len(ids) for ids, _, _ in parts)
+        self.kth_score = np.concatenate([self.kth_score, np.zeros(added, dtype=np.float32)])
+        self.positions = {int(article_id): row for row, article_id in enumerate(self.ids)}
+
+    def remove(self, article_ids: Iterable[int]) -> None:
+        """Удаление статей из индекса"""
+        drop = [self.positions[article_id] for article_id in article_ids if article_id in self.positions]
+        if not drop:
+            return
+        keep = np.ones(len(self.ids), dtype=bool)
+        keep[drop] = False
+        self.ids = self.ids[keep]
+        self.text_matrix = self.text_matrix[keep]
+        self.tag_matrix = self.tag_matrix[keep]
+        self.kth_score = self.kth_score[keep]
+        self.positions = {int(article_id): row for row, article_id in enumerate(self.ids)}
+
+    def similarities(self, rows: np.ndarray) -> sparse.csr_matrix:
+        """Близость указанных строк ко всем статьям индекса"""
+        weight = settings.RELATED_TAG_WEIGHT
+        text = self.text_matrix[rows] @ self.text_matrix.T
+        tag = self.tag_matrix[rows] @ self.tag_matrix.T
+        return sparse.csr_matrix((1.0 - weight) * text + weight * tag)
+
+    def top_k(self, rows: np.ndarray, k: int) -> Dict[int, List[Tuple[int, float]]]:
+        """Списки k самых близких статей для указанных строк (считаются порциями)"""
+        result = {}
+        for start in range(0, len(rows), SIMILARITY_CHUNK):
+            chunk = rows[start:start + SIMILARITY_CHUNK]
+            scores = self.similarities(chunk)
+            for offset, row in enumerate(chunk):
+                related = self._row_top_k(scores, offset, row, k)
+                self.kth_score[row] = related[-1][1] if len(related) >= k else 0.0
+                result[int(self.ids[row])] = related
+        return result
+
+    def _row_top_k(self, scores: sparse.csr_matrix, offset: int, row: int, k: int) -> List[Tuple[int, float]]:
+        start, end = scores.indptr[offset], scores.indptr[offset + 1]
+        columns = scores.indices[start:end]
+        values = scores.data[start:end]
+        mask = (columns != row) & (values > 0)
+        columns, values = columns[mask], values[mask]
+        if len(values) > k:
+            best = np.argpartition(-values, k)[:k]
+            columns, values = columns[best], values[best]
+        # По убыванию близости, при равенстве - по id для стабильности
+        order = np.lexsort((self.ids[columns], -values))
+        return [(int(self.ids[column]), float(values[i])) for i, column in zip(order, columns[order])]
+
+    def save(self, path: str) -> None:
+        """Атомарная запись индекса (читатели не видят файл наполовину)"""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                terms=np.array(self.terms, dtype=str),
+                idf=self.idf,
+                ids=self.ids,
+                text_data=self.text_matrix.data,
+                text_indices=self.text_matrix.indices,
+                text_indptr=self.text_matrix.indptr,
+                tag_ids=self.tag_ids,
+                tag_data=self.tag_matrix.data,
+                tag_indices=self.tag_matrix.indices,
+                tag_indptr=self.tag_matrix.indptr,
+                kth_score=self.kth_score
+            )
+        os.replace(tmp, target)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["RelatedIndex"]:
+        """Загрузка индекса; None, если он ещё не построен"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            ids = data["ids"]
+            terms = data["terms"].tolist()
+            tag_ids = data["tag_ids"]
+            text = sparse.csr_matrix(
+                (data["text_data"], data["text_indices"], data["text_indptr"]),
+                shape=(len(ids), len(terms))
+            )
+            tag = sparse.csr_matrix(
+                (data["tag_data"], data["tag_indices"], data["tag_indptr"]),
+                shape=(len(ids), len(tag_ids))
+            )
+            return cls(terms, data["idf"], ids, text, tag_ids, tag, data["kth_score"])
+
+
+class RelatedService:
+    """
+    Расчёт похожих статей. Результат хранится в article_related, страница
+    статьи читает его одним запросом по первичному ключу.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.path = settings.RELATED_INDEX_PATH
+        self.top_k = settings.RELATED_TOP_K
+
+    async def rebuild(self) -> int:
+        """Полная перестройка: новый словарь и idf, списки для всех статей"""
+        with index_lock(self.path):
+            return await self._rebuild()
+
+    async def _rebuild(self) -> int:
+        # Первый проход - документная частота, второй - векторы
+        df: Counter = Counter()
+        total = 0
+        async for documents in self._documents():
+            for _, tokens, _ in documents:
+                df.update(set(tokens))
+            total += len(documents)
+
+        max_df = settings.RELATED_MAX_DF * total
+        terms = [
+            term for term, count in df.most_common()
+            if count >= settings.RELATED_MIN_DF and count <= max_df
+        ][:settings.RELATED_MAX_FEATURES]
+        idf = np.array([math.log((1 + total) / (1 + df[term])) + 1.0 for term in terms], dtype=np.float32)
+        del df
+
+        index = RelatedIndex.empty(terms, idf)
+        parts = []
+        async for documents in self._documents():
+            parts.append(index.vectorize(documents))
+        index.append(parts)
+
+        related = index.top_k(np.arange(len(index)), self.top_k)
+        await self.db.execute(delete(ArticleRelated))
+        await self._write(related)
+        await self.db.commit()
+        index.save(self.path)
+
+        logger.info("Related articles rebuilt", articles=len(index), terms=len(terms))
+        return len(index)
+
+    async def refresh(self, article_ids: List[int]) -> int:
+        """
+        Инкрементальное обновление после публикации или правки статей.
+        Пересчитываются списки самих статей, статей, где они уже были, и
+        статей, у которых изменённая статья ближе их текущей k-й похожей.
+        Новые слова не попадают в словарь до следующей полной перестройки.
+        """
+        with index_lock(self.path):
+            index = RelatedIndex.load(self.path)
+            if index is None:
+                return await self._rebuild()
+
+            changed = set(article_ids)
+            documents = []
+            async for batch in self._documents(changed):
+                documents.extend(batch)
+            present = {article_id for article_id, _, _ in documents}
+
+            # Статьи, в чьих списках изменённые статьи уже есть
+            result = await self.db.execute(
+                select(ArticleRelated.article_id).where(ArticleRelated.related_id.in_(changed))
+            )
+            affected: Set[int] = set(result.scalars().all())
+
+            index.remove(changed)
+            if documents:
+                index.append([index.vectorize(documents)])
+
+            rows = np.array([index.positions[article_id] for article_id in present], dtype=np.int64)
+            related = index.top_k(rows, self.top_k)
+
+            # Близость симметрична: строки изменённых статей дают близость
+            # изменённой статьи к каждой другой
+            if len(rows):
+                scores = index.similarities(rows).tocoo()
+                hits = scores.data > index.kth_score[scores.col]
+                affected.update(int(article_id) for article_id in index.ids[scores.col[hits]])
+
+            affected -= changed
+            affected_rows = np.array(
+                sorted(index.positions[article_id] for article_id in affected if article_id in index.positions),
+                dtype=np.int64
+            )
+            related.update(index.top_k(affected_rows, self.top_k))
+
+            await self.db.execute(
+                delete(ArticleRelated).where(
+                    or_(
+                        ArticleRelated.article_id.in_(changed | affected),
+                        ArticleRelated.related_id.in_(changed - present)
+                    )
+                )
+            )
+            await self._write(related)
+            await self.db.commit()
+            index.save(self.path)
+
+        logger.info("Related articles refreshed", changed=len(changed), affected=len(affected))
+        return len(related)
+
+    async def _write(self, related: Dict[int, List[Tuple[int, float]]]) -> None:
+        """Вставка списков многострочными INSERT"""
+        rows = [
+            {"article_id": article_id, "rank": rank, "related_id": related_id, "score": score}
+            for article_id, items in related.items()
+            for rank, (related_id, score) in enumerate(items)
+        ]
+        for start in range(0, len(rows), DOCUMENT_BATCH_SIZE * 10):
+            await self.db.execute(insert(ArticleRelated), rows[start:start + DOCUMENT_BATCH_SIZE * 10])
+
+    async def _documents(self, article_ids: Optional[Set[int]] = None) -> AsyncIterator[List[Document]]:
+        """Опубликованные публичные статьи пачками: токены текста и id тегов"""
+        query = (
+            select(Article.id, Article.title, Article.excerpt, Article.content)
+            .where(
+                Article.status == ArticleStatus.PUBLISHED,
+                Article.visibility == ArticleVisibility.PUBLIC
+            )
+            .order_by(Article.id)
+            .execution_options(yield_per=DOCUMENT_BATCH_SIZE)
+        )
+        if article_ids is not None:
+            query = query.where(Article.id.in_(article_ids))
+
+        result = await self.db.stream(query)
+        async for rows in result.partitions():
+            ids = [row.id for row in rows]
+            tags: Dict[int, List[int]] = {}
+            tag_result = await self.db.execute(
+                select(article_tags.c.article_id, article_tags.c.tag_id)
+                .where(article_tags.c.article_id.in_(ids))
+            )
+            for article_id, tag_id in tag_result:
+                tags.setdefault(article_id, []).append(tag_id)
+
+            yield [
+                (
+                    row.id,
+                    tokenize(row.title) * TITLE_WEIGHT + tokenize(row.excerpt) + tokenize(row.content),
+                    tags.get(row.id, [])
+                )
+                for row in rows
+            ]
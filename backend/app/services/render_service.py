@@ -0,0 +1,200 @@
+"""
+Сервис рендеринга Markdown в очищенный HTML
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import delete, update
+from sqlalchemy.orm.attributes import set_committed_value
+from bs4 import BeautifulSoup
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+import hashlib
+import bleach
+import markdown
+import structlog
+
+from app.models.article import Article, ArticleRender
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.database import insert_ignore
+from app.core.compression import available_encodings, compress_variants
+
+logger = structlog.get_logger()
+
+MARKDOWN_EXTENSIONS = ["extra", "sane_lists", "smarty"]
+
+ALLOWED_TAGS = [
+    "p", "br", "hr", "h1", "h2", "h3", "h4", "h5", "h6",
+    "strong", "em", "b", "i", "u", "s", "del", "ins", "mark", "sub", "sup",
+    "a", "img", "blockquote", "code", "pre", "span",
+    "ul", "ol", "li", "dl", "dt", "dd",
+    "table", "thead", "tbody", "tr", "th", "td",
+    "abbr", "figure", "figcaption",
+]
+
+ALLOWED_ATTRIBUTES = {
+    "a": ["href", "title", "rel", "target"],
+    "img": ["src", "alt", "title", "width", "height", "loading", "decoding"],
+    "abbr": ["title"],
+    "code": ["class"],
+    "span": ["class"],
+    "th": ["align"],
+    "td": ["align"],
+    "h1": ["id"], "h2": ["id"], "h3": ["id"], "h4": ["id"], "h5": ["id"], "h6": ["id"],
+}
+
+ALLOWED_PROTOCOLS = ["http", "https", "mailto"]
+
+# HTML адресуется хешем исходника, поэтому записи в кэше никогда не устаревают
+_html_cache = LRUCache(maxsize=512)
+
+# Байты HTML по кодировкам (identity, gzip, br) для отдачи без сжатия на лету
+_variants_cache = LRUCache(maxsize=256)
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 Markdown-исходника"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def render_markdown(content: str) -> str:
+    """Markdown -> HTML -> очистка bleach -> постобработка ссылок и изображений"""
+    html = markdown.markdown(content, extensions=MARKDOWN_EXTENSIONS, output_format="html")
+    html = bleach.clean(
+        html,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        protocols=ALLOWED_PROTOCOLS,
+        strip=True
+    )
+
+    soup = BeautifulSoup(html, "html.parser")
+    for link in soup.find_all("a", href=True):
+        if link["href"].startswith(("http://", "https://")):
+            link["rel"] = "nofollow noopener noreferrer"
+            link["target"] = "_blank"
+    for image in soup.find_all("img"):
+        image["loading"] = "lazy"
+        image["decoding"] = "async"
+
+    return str(soup)
+
+
+class RenderService:
+    """Сервис пререндеринга статей"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_cached_html(self, digest: str) -> Optional[str]:
+        """Получение готового HTML по хешу (кэш процесса, затем БД)"""
+        html = _html_cache.get(digest)
+        if html is not None:
+            return html
+
+        result = await self.db.execute(
+            select(ArticleRender.html).where(ArticleRender.content_hash == digest)
+        )
+        html = result.scalar_one_or_none()
+        if html is not None:
+            _html_cache.set(digest, html)
+        return html
+
+    async def get_html(self, article: Article) -> str:
+        """HTML статьи для чтения; рендер выполняется, только если его ещё нет"""
+        if article.content_hash:
+            html = await self.get_cached_html(article.content_hash)
+            if html is not None:
+                return html
+
+        return await self.ensure_rendered(article)
+
+    async def ensure_rendered(self, article: Article) -> str:
+        """Рендер статьи, если её Markdown изменился с прошлого рендера"""
+        digest = content_hash(article.content)
+
+        html = await self.get_cached_html(digest)
+        if html is None:
+            html = render_markdown(article.content)
+            variants = compress_variants(html.encode("utf-8"))
+            # Тот же текст может параллельно рендерить другой запрос или задача:
+            # строка с этим хешем у них одинаковая, поэтому конфликт пропускается
+            await self.db.execute(
+                insert_ignore(self.db, ArticleRender).values(
+                    content_hash=digest,
+                    html=html,
+                    html_gzip=variants.get("gzip"),
+                    html_br=variants.get("br")
+                )
+            )
+            _html_cache.set(digest, html)
+            logger.info("Article rendered", article_id=article.id, content_hash=digest)
+
+        if article.content_hash != digest:
+            # Хеш рендера - служебное поле, не правка статьи: updated_at и
+            # version (ETag) не меняются
+            await self.db.execute(
+                update(Article)
+                .where(Article.id == article.id)
+                .values(content_hash=digest, updated_at=Article.updated_at)
+                .execution_options(synchronize_session=False)
+            )
+            set_committed_value(article, "content_hash", digest)
+        await self.db.commit()
+
+        return html
+
+    async def get_html_variants(self, digest: str) -> Optional[Dict[str, bytes]]:
+        """
+        HTML рендера в виде готовых байтов по кодировкам. Варианты, которых
+        нет в строке (рендер старше сжатия или без brotli), досчитываются
+        один раз и сохраняются. None, если рендера с таким хешем нет.
+        """
+        variants = _variants_cache.get(digest)
+        if variants is not None:
+            return variants
+
+        result = await self.db.execute(
+            select(ArticleRender.html, ArticleRender.html_gzip, ArticleRender.html_br)
+            .where(ArticleRender.content_hash == digest)
+        )
+        row = result.one_or_none()
+        if row is None:
+            return None
+
+        variants = {"identity": row.html.encode("utf-8")}
+        if row.html_gzip is not None:
+            variants["gzip"] = row.html_gzip
+        if row.html_br is not None:
+            variants["br"] = row.html_br
+
+        if any(encoding not in variants for encoding in available_encodings()):
+            variants = compress_variants(variants["identity"])
+            await self.db.execute(
+                update(ArticleRender)
+                .where(ArticleRender.content_hash == digest)
+                .values(html_gzip=variants.get("gzip"), html_br=variants.get("br"))
+            )
+            await self.db.commit()
+
+        _variants_cache.set(digest, variants)
+        return variants
+
+    async def cleanup_orphans(self, now: Optional[datetime] = None) -> int:
+        """
+        Удаление рендеров, на которые не ссылается ни одна статья (остались
+        от прежних версий текста). Свежие строки не трогаются: рендер
+        записывается раньше, чем хеш попадает в статью.
+        """
+        now = now or datetime.now(timezone.utc)
+        referenced = select(Article.content_hash).where(Article.content_hash.isnot(None))
+        result = await self.db.execute(
+            delete(ArticleRender)
+            .where(
+                ArticleRender.created_at < now - timedelta(hours=settings.RENDER_ORPHAN_RETENTION_HOURS),
+                ArticleRender.content_hash.notin_(referenced)
+            )
+        )
+        await self.db.commit()
+        return result.rowcount
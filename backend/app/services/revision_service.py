@@ -0,0 +1,306 @@
+"""
+Сервис истории версий статей (сжатые дельты с ключевыми кадрами)
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import delete, func
+from datetime import datetime
+from typing import List, Optional, Tuple
+import json
+import zlib
+import structlog
+
+from app.core.config import settings
+from app.core.textdiff import DeltaOp, apply_delta, make_delta
+from app.models.revision import ArticleRevision
+from app.services.render_service import content_hash
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstd необязателен
+    zstandard = None
+
+logger = structlog.get_logger()
+
+ZLIB_LEVEL = 6
+ZLIB_MAX_LEVEL = 9
+ZSTD_LEVEL = 3
+ZSTD_MAX_LEVEL = 19
+
+
+def compress(data: bytes, codec: str, best: bool = False) -> bytes:
+    """Сжатие выбранным кодеком"""
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed")
+        return zstandard.ZstdCompressor(level=ZSTD_MAX_LEVEL if best else ZSTD_LEVEL).compress(data)
+    if codec == "zlib":
+        return zlib.compress(data, ZLIB_MAX_LEVEL if best else ZLIB_LEVEL)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    """Распаковка выбранным кодеком"""
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def encode_keyframe(text: str, codec: str, best: bool = False) -> bytes:
+    """Полный текст версии"""
+    return compress(text.encode("utf-8"), codec, best)
+
+
+def encode_delta(ops: List[DeltaOp], codec: str, best: bool = False) -> bytes:
+    """Дельта относительно предыдущей версии"""
+    return compress(json.dumps(ops, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), codec, best)
+
+
+def restore(entries: List[ArticleRevision]) -> str:
+    """Сборка текста из ключевого кадра и последующих дельт"""
+    if not entries or not entries[0].is_keyframe:
+        raise ValueError("Revision chain must start with a keyframe")
+
+    text = decompress(entries[0].payload, entries[0].codec).decode("utf-8")
+    for entry in entries[1:]:
+        text = apply_delta(text, json.loads(decompress(entry.payload, entry.codec)))
+    return text
+
+
+def default_codec() -> str:
+    """Кодек для новых версий (zstd только при установленном пакете)"""
+    if settings.REVISION_CODEC == "zstd" and zstandard is None:
+        return "zlib"
+    return settings.REVISION_CODEC
+
+
+class RevisionService:
+    """
+    История версий: ключевой кадр не реже чем каждые
+    REVISION_KEYFRAME_INTERVAL версий, между ними сжатые дельты. Сборка
+    любой версии требует не более N-1 применений дельт.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.keyframe_interval = settings.REVISION_KEYFRAME_INTERVAL
+
+    async def record(
+        self,
+        article_id: int,
+        old_content: Optional[str],
+        new_content: str,
+        author_id: Optional[int] = None
+    ) -> Optional[int]:
+        """
+        Сохранение новой версии. old_content - текст последней версии (обычно
+        Article.content до изменения), по нему строится дельта без сборки
+        цепочки. Сессию фиксирует вызывающий код.
+        """
+        result = await self.db.execute(
+            select(ArticleRevision.revision, ArticleRevision.content_hash)
+            .where(ArticleRevision.article_id == article_id)
+            .order_by(ArticleRevision.revision.desc())
+            .limit(1)
+        )
+        latest = result.one_or_none()
+        codec = default_codec()
+
+        if latest is None:
+            # Первая версия - исходный текст статьи, если он был
+            revision = 1
+            if old_content is not None and old_content != new_content:
+                self.db.add(self._keyframe(article_id, revision, old_content, codec, author_id))
+                revision = 2
+            since_keyframe = 0 if revision == 2 else None
+        else:
+            if old_content == new_content:
+                return None
+            revision = latest.revision + 1
+            # Дельта строится от old_content, только если он совпадает с последней версией
+            if old_content is None or content_hash(old_content) != latest.content_hash:
+                since_keyframe = None
+            else:
+                result = await self.db.execute(
+                    select(func.max(ArticleRevision.revision))
+                    .where(ArticleRevision.article_id == article_id, ArticleRevision.is_keyframe.is_(True))
+                )
+                since_keyframe = latest.revision - result.scalar_one()
+
+        if since_keyframe is None or since_keyframe + 1 >= self.keyframe_interval:
+            entry = self._keyframe(article_id, revision, new_content, codec, author_id)
+        else:
+            entry = ArticleRevision(
+                article_id=article_id,
+                revision=revision,
+                is_keyframe=False,
+                codec=codec,
+                payload=encode_delta(make_delta(old_content, new_content), codec),
+                content_length=len(new_content),
+                content_hash=content_hash(new_content),
+                author_id=author_id
+            )
+        self.db.add(entry)
+        await self.db.flush()
+
+        logger.info("Article revision recorded", article_id=article_id, revision=revision, keyframe=entry.is_keyframe)
+        return revision
+
+    async def get_content(self, article_id: int, revision: int) -> Optional[str]:
+        """Текст указанной версии"""
+        keyframe = (
+            select(func.max(ArticleRevision.revision))
+            .where(
+                ArticleRevision.article_id == article_id,
+                ArticleRevision.revision <= revision,
+                ArticleRevision.is_keyframe.is_(True)
+            )
+            .scalar_subquery()
+        )
+        result = await self.db.execute(
+            select(ArticleRevision)
+            .where(
+                ArticleRevision.article_id == article_id,
+                ArticleRevision.revision >= keyframe,
+                ArticleRevision.revision <= revision
+            )
+            .order_by(ArticleRevision.revision)
+        )
+        entries = list(result.scalars().all())
+        if not entries or entries[-1].revision != revision:
+            return None
+        return restore(entries)
+
+    async def list_revisions(self, article_id: int) -> List[dict]:
+        """Метаданные версий статьи (без распаковки)"""
+        result = await self.db.execute(
+            select(
+                ArticleRevision.revision,
+                ArticleRevision.is_keyframe,
+                ArticleRevision.content_length,
+                func.length(ArticleRevision.payload).label("stored_bytes"),
+                ArticleRevision.author_id,
+                ArticleRevision.created_at
+            )
+            .where(ArticleRevision.article_id == article_id)
+            .order_by(ArticleRevision.revision.desc())
+        )
+        return [dict(row._mapping) for row in result]
+
+    async def compact(
+        self,
+        article_id: int,
+        older_than: datetime,
+        keep_every: int = 1
+    ) -> Tuple[int, int]:
+        """
+        Перепаковка старой части цепочки: ключевые кадры ровно через
+        REVISION_KEYFRAME_INTERVAL версий, максимальная степень сжатия и, при
+        keep_every > 1, прореживание (остаётся каждая keep_every-я версия).
+        Возвращает (байт до, байт после).
+        """
+        result = await self.db.execute(
+            select(ArticleRevision)
+            .where(ArticleRevision.article_id == article_id)
+            .order_by(ArticleRevision.revision)
+        )
+        entries = list(result.scalars().all())
+        old = [entry for entry in entries if entry.created_at is not None and entry.created_at < older_than]
+        if len(old) < 2:
+            return 0, 0
+
+        # Последняя старая версия сохраняется всегда: от неё идут новые дельты
+        boundary = old[-1].revision
+        bytes_before = sum(len(entry.payload) for entry in old)
+        codec = default_codec()
+
+        texts = []
+        chain: List[ArticleRevision] = []
+        for entry in old:
+            chain = [entry] if entry.is_keyframe else chain + [entry]
+            texts.append(restore(chain))
+
+        kept = [
+            (entry, text) for index, (entry, text) in enumerate(zip(old, texts))
+            if index % keep_every == 0 or entry.revision == boundary
+        ]
+        dropped = {entry.revision for entry in old} - {entry.revision for entry, _ in kept}
+
+        bytes_after = 0
+        previous_text = None
+        for index, (entry, text) in enumerate(kept):
+            if index % self.keyframe_interval == 0:
+                entry.is_keyframe = True
+                entry.payload = encode_keyframe(text, codec, best=True)
+            else:
+                entry.is_keyframe = False
+                entry.payload = encode_delta(make_delta(previous_text, text), codec, best=True)
+            entry.codec = codec
+            bytes_after += len(entry.payload)
+            previous_text = text
+
+        if dropped:
+            await self.db.execute(
+                delete(ArticleRevision)
+                .where(ArticleRevision.article_id == article_id, ArticleRevision.revision.in_(dropped))
+            )
+
+        # Перепаковка могла сдвинуть фазу ключевых кадров: новые версии до
+        # первого собственного ключевого кадра не должны уйти дальше N-1 дельт
+        entries = [entry for entry in entries if entry.revision not in dropped]
+        newer = [entry for entry in entries if entry.revision > boundary]
+        since_keyframe = (len(kept) - 1) % self.keyframe_interval
+        for entry in newer:
+            if entry.is_keyframe:
+                break
+            since_keyframe += 1
+            if since_keyframe >= self.keyframe_interval:
+                text = self._restore_from(entries, entry.revision)
+                entry.is_keyframe = True
+                entry.payload = encode_keyframe(text, entry.codec)
+                since_keyframe = 0
+
+        await self.db.commit()
+        logger.info(
+            "Article revisions compacted",
+            article_id=article_id,
+            revisions=len(old),
+            dropped=len(dropped),
+            bytes_before=bytes_before,
+            bytes_after=bytes_after
+        )
+        return bytes_before, bytes_after
+
+    @staticmethod
+    def _restore_from(entries: List[ArticleRevision], revision: int) -> str:
+        """Сборка версии по уже загруженным (и, возможно, перепакованным) записям"""
+        chain: List[ArticleRevision] = []
+        for entry in entries:
+            if entry.revision > revision:
+                break
+            chain = [entry] if entry.is_keyframe else chain + [entry]
+        return restore(chain)
+
+    @staticmethod
+    def _keyframe(
+        article_id: int,
+        revision: int,
+        text: str,
+        codec: str,
+        author_id: Optional[int]
+    ) -> ArticleRevision:
+        return ArticleRevision(
+            article_id=article_id,
+            revision=revision,
+            is_keyframe=True,
+            codec=codec,
+            payload=encode_keyframe(text, codec),
+            content_length=len(text),
+            content_hash=content_hash(text),
+            author_id=author_id
+        )
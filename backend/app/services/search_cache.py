@@ -0,0 +1,95 @@
+"""
+Кэш результатов поиска с нормализацией запросов и инвалидацией по версии
+"""
+
+from redis.exceptions import RedisError
+from typing import Any, Hashable, Optional, Tuple
+import unicodedata
+import structlog
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis import get_redis
+
+logger = structlog.get_logger()
+
+SEARCH_VERSION_KEY = "search:version"
+
+# Разделитель дизъюнкций в запросе (websearch_to_tsquery, FTS5): AND связывает
+# сильнее, поэтому "a b or c" - это (a AND b) OR c
+_OR_OPERATOR = "or"
+
+
+def normalize_query(q: str) -> str:
+    """NFKC, нижний регистр и одиночные пробелы между словами"""
+    return " ".join(unicodedata.normalize("NFKC", q).lower().split())
+
+
+def query_key(q: str) -> str:
+    """
+    Ключ нормализованного запроса. И конъюнкция, и дизъюнкция коммутативны:
+    запрос разбивается на группы верхнего уровня по OR, слова внутри группы
+    и сами группы сортируются. Фразы в кавычках, исключения и OR без слова
+    с одной из сторон оставляются как есть.
+    """
+    words = q.split()
+    if '"' in q or any(word.startswith("-") for word in words):
+        return q
+
+    groups, group = set(), set()
+    for word in words + [_OR_OPERATOR]:
+        if word != _OR_OPERATOR:
+            group.add(word)
+        elif group:
+            groups.add(" ".join(sorted(group)))
+            group = set()
+        else:
+            return q  # OR в начале, в конце или подряд
+    return f" {_OR_OPERATOR} ".join(sorted(groups))
+
+
+class SearchCache:
+    """
+    Страницы результатов в памяти процесса. Ключ включает глобальную версию
+    поиска (счётчик в Redis): её увеличение при публикации и снятии статей
+    делает недостижимыми все прежние записи за O(1), они вытесняются LRU.
+    Без Redis версия локальна для процесса, и изменения в других процессах
+    видны через SEARCH_CACHE_TTL.
+    """
+
+    def __init__(self):
+        self._cache = TTLCache(maxsize=settings.SEARCH_CACHE_SIZE, ttl=settings.SEARCH_CACHE_TTL)
+        self._local_version = 0
+
+    async def version(self) -> int:
+        """Текущая версия поиска"""
+        redis = await get_redis()
+        if redis is not None:
+            try:
+                return int(await redis.get(SEARCH_VERSION_KEY) or 0)
+            except RedisError as e:
+                logger.warning("Failed to read search version from Redis", error=str(e))
+        return self._local_version
+
+    async def key(self, *parts: Hashable) -> Tuple[Hashable, ...]:
+        """Ключ записи с текущей версией поиска"""
+        return (await self.version(),) + parts
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[Any]:
+        return self._cache.get(key)
+
+    def set(self, key: Tuple[Hashable, ...], value: Any) -> None:
+        self._cache.set(key, value)
+
+    async def bump(self) -> None:
+        """Инвалидация всех закэшированных результатов"""
+        self._local_version += 1
+        redis = await get_redis()
+        if redis is not None:
+            try:
+                await redis.incr(SEARCH_VERSION_KEY)
+            except RedisError as e:
+                logger.warning("Failed to bump search version in Redis", error=str(e))
+
+
+search_cache = SearchCache()
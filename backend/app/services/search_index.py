@@ -0,0 +1,468 @@
+"""
+Встроенный поисковый индекс: инвертированный индекс на массивах и BM25
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from array import array
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from threading import Lock, local
+from typing import AsyncIterator, Iterable, List, Optional, Set, Tuple
+import json
+import math
+import mmap
+import os
+import re
+import time
+import numpy as np
+import structlog
+
+try:
+    import snowballstemmer
+except ImportError:  # pragma: no cover - без стеммера индексируются словоформы
+    snowballstemmer = None
+
+from app.core.config import settings
+from app.core.filelock import index_lock
+from app.models.article import Article, ArticleStatus, ArticleVisibility
+
+logger = structlog.get_logger()
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+CYRILLIC_RE = re.compile("[а-я]")
+
+# Нормализация слов, с которой построен индекс; файл с другой считается
+# устаревшим и перестраивается
+ANALYZER = "snowball-ru-en" if snowballstemmer is not None else "plain"
+
+# Основ слов в кэше стеммера: по закону Ципфа почти все слова текста повторяются
+STEM_CACHE_SIZE = 200000
+
+# Поле и число его повторов в документе: совпадение в заголовке весит больше
+FIELD_REPEATS = (("title", 3), ("subtitle", 2), ("excerpt", 2), ("content", 1))
+
+# Параметры BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+FILE_MAGIC = b"BM25IDX1"
+
+# Статей, читаемых из БД за один fetch
+DOCUMENT_BATCH_SIZE = 1000
+
+# (article_id, токены)
+Document = Tuple[int, List[str]]
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Слова текста в нижнем регистре"""
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+class _Stemmers(local):
+    """Стеммеры Snowball хранят состояние, поэтому у каждого потока свои"""
+
+    def __init__(self):
+        self.russian = snowballstemmer.stemmer("russian")
+        self.english = snowballstemmer.stemmer("english")
+
+
+_stemmers = _Stemmers() if snowballstemmer is not None else None
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(word: str) -> str:
+    """Основа слова в нижнем регистре: русский или английский Snowball по алфавиту слова"""
+    if _stemmers is None:
+        return word
+    word = word.replace("ё", "е")
+    if CYRILLIC_RE.search(word):
+        return _stemmers.russian.stemWord(word)
+    if word.isascii() and not word.isdigit():
+        return _stemmers.english.stemWord(word)
+    return word
+
+
+def analyze(text: Optional[str]) -> List[str]:
+    """Основы слов текста - то, что хранится в индексе"""
+    return [stem(token) for token in tokenize(text)]
+
+
+def document_tokens(row) -> List[str]:
+    """Основы слов статьи с повторами полей по FIELD_REPEATS"""
+    return [token for field, repeats in FIELD_REPEATS for token in analyze(getattr(row, field)) * repeats]
+
+
+class BM25Index:
+    """
+    Индекс из плоских массивов. Документы - позиции в doc_ids/doc_len.
+    Постинги отсортированы по термину: документы термина t лежат в
+    post_docs[term_offsets[t]:term_offsets[t + 1]] по возрастанию позиции,
+    частоты - в post_tf по тем же индексам. Массивы только читаются и
+    при загрузке с диска ссылаются прямо на mmap файла.
+    """
+
+    def __init__(
+        self,
+        terms: List[str],
+        doc_ids: np.ndarray,
+        doc_len: np.ndarray,
+        term_offsets: np.ndarray,
+        post_docs: np.ndarray,
+        post_tf: np.ndarray
+    ):
+        self.terms = terms
+        self.vocabulary = {term: term_id for term_id, term in enumerate(terms)}
+        self.doc_ids = doc_ids
+        self.doc_len = doc_len
+        self.term_offsets = term_offsets
+        self.post_docs = post_docs
+        self.post_tf = post_tf
+        self.avgdl = float(doc_len.mean()) if len(doc_len) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @classmethod
+    def build(cls, documents: Iterable[Document]) -> "BM25Index":
+        """Построение индекса с нуля"""
+        return cls([], *_empty_arrays()).update(documents, ())
+
+    def update(self, documents: Iterable[Document], removed: Iterable[int]) -> "BM25Index":
+        """
+        Новый индекс без removed и с documents (переиндексируемые статьи
+        заменяются). Постинги пересобираются векторно: фильтр по маске
+        живых документов, добавление новых и устойчивая сортировка по термину.
+        """
+        terms = list(self.terms)
+        vocabulary = dict(self.vocabulary)
+        new_ids, new_len = array("q"), array("I")
+        new_terms, new_docs, new_tf = array("I"), array("I"), array("I")
+
+        documents = list(documents)
+        removed_ids = set(removed) | {article_id for article_id, _ in documents}
+        live = ~np.isin(self.doc_ids, np.fromiter(removed_ids, dtype=np.int64, count=len(removed_ids)))
+        remap = np.cumsum(live, dtype=np.int64) - 1
+        base = int(live.sum())
+
+        for position, (article_id, tokens) in enumerate(documents, start=base):
+            new_ids.append(article_id)
+            new_len.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_id = vocabulary.get(term)
+                if term_id is None:
+                    term_id = vocabulary[term] = len(terms)
+                    terms.append(term)
+                new_terms.append(term_id)
+                new_docs.append(position)
+                new_tf.append(tf)
+
+        old_terms = np.repeat(
+            np.arange(len(self.terms), dtype=np.uint32), np.diff(self.term_offsets).astype(np.int64)
+        )
+        keep = live[self.post_docs]
+        post_terms = np.concatenate([old_terms[keep], np.frombuffer(new_terms, dtype=np.uint32)])
+        post_docs = np.concatenate([
+            remap[self.post_docs[keep]].astype(np.uint32), np.frombuffer(new_docs, dtype=np.uint32)
+        ])
+        post_tf = np.concatenate([self.post_tf[keep], np.frombuffer(new_tf, dtype=np.uint32)])
+
+        # Устойчивая сортировка сохраняет возрастание позиций внутри термина
+        order = np.argsort(post_terms, kind="stable")
+        counts = np.bincount(post_terms, minlength=len(terms))
+        term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(counts, out=term_offsets[1:])
+
+        return BM25Index(
+            terms,
+            np.concatenate([self.doc_ids[live], np.frombuffer(new_ids, dtype=np.int64)]),
+            np.concatenate([self.doc_len[live], np.frombuffer(new_len, dtype=np.uint32)]),
+            term_offsets,
+            post_docs[order],
+            post_tf[order]
+        )
+
+    @classmethod
+    def merge(cls, parts: Iterable["BM25Index"]) -> "BM25Index":
+        """
+        Объединение индексов непересекающихся наборов статей: словари
+        сливаются, позиции документов сдвигаются, постинги сортируются по
+        термину устойчиво, поэтому внутри термина позиции по-прежнему растут
+        """
+        vocabulary = {}
+        doc_ids, doc_len, post_terms, post_docs, post_tf = [], [], [], [], []
+        base = 0
+        for part in parts:
+            mapping = np.fromiter(
+                (vocabulary.setdefault(term, len(vocabulary)) for term in part.terms),
+                dtype=np.uint32,
+                count=len(part.terms)
+            )
+            post_terms.append(np.repeat(mapping, np.diff(part.term_offsets).astype(np.int64)))
+            post_docs.append(part.post_docs.astype(np.uint32) + np.uint32(base))
+            post_tf.append(part.post_tf)
+            doc_ids.append(part.doc_ids)
+            doc_len.append(part.doc_len)
+            base += len(part)
+        if not base:
+            return cls([], *_empty_arrays())
+
+        post_terms = np.concatenate(post_terms)
+        order = np.argsort(post_terms, kind="stable")
+        term_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(post_terms, minlength=len(vocabulary)), out=term_offsets[1:])
+
+        return cls(
+            list(vocabulary),
+            np.concatenate(doc_ids),
+            np.concatenate(doc_len),
+            term_offsets,
+            np.concatenate(post_docs)[order],
+            np.concatenate(post_tf)[order]
+        )
+
+    def search(
+        self,
+        terms: List[str],
+        limit: int,
+        after: Optional[Tuple[float, int]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Статьи, содержащие все слова запроса, по убыванию BM25 и id;
+        after - (score, id) последней статьи предыдущей страницы.
+        """
+        term_ids = [self.vocabulary.get(term) for term in dict.fromkeys(terms)]
+        if not term_ids or None in term_ids or not len(self):
+            return []
+
+        # Пересечение постингов начиная с самого редкого термина
+        postings = [
+            (self.post_docs[self.term_offsets[t]:self.term_offsets[t + 1]],
+             self.post_tf[self.term_offsets[t]:self.term_offsets[t + 1]])
+            for t in term_ids
+        ]
+        postings.sort(key=lambda posting: len(posting[0]))
+        candidates = postings[0][0]
+        for docs, _ in postings[1:]:
+            candidates = np.intersect1d(candidates, docs, assume_unique=True)
+            if not len(candidates):
+                return []
+
+        total = len(self)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[candidates] / self.avgdl)
+        scores = np.zeros(len(candidates), dtype=np.float32)
+        for docs, tfs in postings:
+            df = len(docs)
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            tf = tfs[np.searchsorted(docs, candidates)].astype(np.float32)
+            scores += (idf * tf * (BM25_K1 + 1) / (tf + norm)).astype(np.float32)
+
+        ids = self.doc_ids[candidates]
+        if after is not None:
+            last_score, last_id = np.float32(after[0]), after[1]
+            mask = (scores < last_score) | ((scores == last_score) & (ids < last_id))
+            ids, scores = ids[mask], scores[mask]
+
+        if len(ids) > limit:
+            best = np.argpartition(-scores, limit - 1)[:limit]
+            # Статьи с тем же счётом, что и последняя отобранная, тоже претенденты
+            threshold = scores[best].min()
+            best = np.flatnonzero(scores >= threshold)
+            ids, scores = ids[best], scores[best]
+
+        order = np.lexsort((-ids, -scores))[:limit]
+        return [(int(ids[i]), float(scores[i])) for i in order]
+
+    def save(self, path: str) -> None:
+        """
+        Атомарная запись: заголовок с JSON-описанием секций, затем массивы,
+        выровненные по 8 байт. Читатели открывают файл через mmap.
+        """
+        terms_blob = "\n".join(self.terms).encode("utf-8")
+        sections = [
+            ("doc_ids", self.doc_ids.astype(np.int64)),
+            ("doc_len", self.doc_len.astype(np.uint32)),
+            ("term_offsets", self.term_offsets.astype(np.int64)),
+            ("post_docs", self.post_docs.astype(np.uint32)),
+            ("post_tf", self.post_tf.astype(np.uint32)),
+            ("terms", np.frombuffer(terms_blob, dtype=np.uint8)),
+        ]
+
+        layout, offset = {}, 0
+        for name, data in sections:
+            layout[name] = [offset, data.dtype.str, len(data)]
+            offset += _aligned(data.nbytes)
+        header = json.dumps({"sections": layout, "terms": len(self.terms), "analyzer": ANALYZER}).encode("utf-8")
+        start = _aligned(len(FILE_MAGIC) + 8 + len(header))
+
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(FILE_MAGIC + len(header).to_bytes(8, "little") + header)
+            f.write(b"\0" * (start - f.tell()))
+            for _, data in sections:
+                f.write(data.tobytes())
+                f.write(b"\0" * (_aligned(data.nbytes) - data.nbytes))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, target)
+
+    @classmethod
+    def open(cls, path: str) -> Optional["BM25Index"]:
+        """
+        Открытие индекса через mmap без копирования массивов; None, если
+        его нет или он построен с другой нормализацией слов
+        """
+        try:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+
+        if buffer[:len(FILE_MAGIC)] != FILE_MAGIC:
+            raise ValueError(f"Not a search index file: {path}")
+        header_size = int.from_bytes(buffer[len(FILE_MAGIC):len(FILE_MAGIC) + 8], "little")
+        header = json.loads(buffer[len(FILE_MAGIC) + 8:len(FILE_MAGIC) + 8 + header_size])
+        if header.get("analyzer", "plain") != ANALYZER:
+            logger.warning("Search index built with another analyzer, rebuild required", path=path)
+            return None
+        start = _aligned(len(FILE_MAGIC) + 8 + header_size)
+
+        arrays = {
+            name: np.frombuffer(buffer, dtype=np.dtype(dtype), count=count, offset=start + offset)
+            for name, (offset, dtype, count) in header["sections"].items()
+        }
+        terms = arrays.pop("terms").tobytes().decode("utf-8").split("\n") if header["terms"] else []
+        return cls(
+            terms,
+            arrays["doc_ids"],
+            arrays["doc_len"],
+            arrays["term_offsets"],
+            arrays["post_docs"],
+            arrays["post_tf"]
+        )
+
+
+def _aligned(size: int) -> int:
+    return (size + 7) // 8 * 8
+
+
+def _empty_arrays() -> tuple:
+    return (
+        np.zeros(0, dtype=np.int64),
+        np.zeros(0, dtype=np.uint32),
+        np.zeros(1, dtype=np.int64),
+        np.zeros(0, dtype=np.uint32),
+        np.zeros(0, dtype=np.uint32),
+    )
+
+
+class IndexReader:
+    """
+    Индекс для читателей (процессы API). Файл открывается заново, только
+    когда писатель подменил его (изменились mtime или inode), поэтому
+    проверка на запрос стоит одного stat.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._index: Optional[BM25Index] = None
+        self._key: Optional[Tuple[int, int]] = None
+        self._lock = Lock()
+
+    def get(self) -> Optional[BM25Index]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+        key = (stat.st_mtime_ns, stat.st_ino)
+        if key != self._key:
+            with self._lock:
+                if key != self._key:
+                    self._index = BM25Index.open(self.path)
+                    self._key = key
+        return self._index
+
+
+search_index = IndexReader(settings.SEARCH_INDEX_PATH)
+
+
+class SearchIndexService:
+    """
+    Запись встроенного индекса. Писатель один: задачи идут в отдельную
+    очередь Celery, а файл дополнительно защищён блокировкой.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.path = settings.SEARCH_INDEX_PATH
+
+    async def rebuild(self) -> int:
+        """Полная перестройка индекса по опубликованным статьям"""
+        with index_lock(self.path):
+            return await self._rebuild()
+
+    async def refresh(self, article_ids: List[int]) -> int:
+        """
+        Переиндексация статей после публикации, правки или удаления:
+        неопубликованные и удалённые статьи из индекса убираются.
+        """
+        with index_lock(self.path):
+            index = BM25Index.open(self.path)
+            if index is None:
+                return await self._rebuild()
+
+            documents = []
+            async for batch in self.documents(set(article_ids)):
+                documents.extend(batch)
+            index = index.update(documents, article_ids)
+            index.save(self.path)
+
+        logger.info("Search index refreshed", changed=len(article_ids), indexed=len(documents))
+        return len(documents)
+
+    async def _rebuild(self) -> int:
+        started = time.perf_counter()
+        documents = []
+        async for batch in self.documents():
+            documents.extend(batch)
+        index = BM25Index.build(documents)
+        index.save(self.path)
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            "Search index rebuilt",
+            articles=len(index),
+            terms=len(index.terms),
+            seconds=round(elapsed, 2),
+            docs_per_second=round(len(index) / elapsed) if elapsed else None
+        )
+        return len(index)
+
+    async def documents(
+        self,
+        article_ids: Optional[Set[int]] = None,
+        id_range: Optional[Tuple[int, int]] = None
+    ) -> AsyncIterator[List[Document]]:
+        """Опубликованные публичные статьи (все, по id или диапазону id) пачками в виде основ слов"""
+        query = (
+            select(Article.id, *(getattr(Article, field) for field, _ in FIELD_REPEATS))
+            .where(
+                Article.status == ArticleStatus.PUBLISHED,
+                Article.visibility == ArticleVisibility.PUBLIC
+            )
+            .order_by(Article.id)
+            .execution_options(yield_per=DOCUMENT_BATCH_SIZE)
+        )
+        if article_ids is not None:
+            query = query.where(Article.id.in_(article_ids))
+        if id_range is not None:
+            query = query.where(Article.id.between(*id_range))
+
+        result = await self.db.stream(query)
+        async for rows in result.partitions():
+            yield [(row.id, document_tokens(row)) for row in rows]
@@ -0,0 +1,196 @@
+"""
+Полная переиндексация поиска без остановки: параллельно по диапазонам id
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.pool import NullPool
+from sqlalchemy import text
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Tuple
+import asyncio
+import multiprocessing
+import time
+import structlog
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.filelock import index_lock
+from app.models.article import Article, ArticleStatus, ArticleVisibility
+from app.models.search import (
+    FTS_TABLE, POSTGRES_DDL, SQLITE_TRIGGERS, SQLITE_TRIGGER_NAMES, fts_table_ddl, weighted_vector
+)
+from app.services.search_cache import search_cache
+from app.services.search_index import BM25Index, SearchIndexService
+
+logger = structlog.get_logger()
+
+# Новая FTS5-таблица до подмены
+FTS_REBUILD_TABLE = f"{FTS_TABLE}_rebuild"
+
+# (обработано статей, всего статей)
+Progress = Callable[[int, int], None]
+
+
+def id_chunks(ids: List[int], chunk_size: int) -> List[Tuple[int, int]]:
+    """Диапазоны [первый, последний] id по chunk_size статей (ids отсортированы)"""
+    return [(ids[i], ids[min(i + chunk_size, len(ids)) - 1]) for i in range(0, len(ids), chunk_size)]
+
+
+async def reindex_search(workers: int, chunk_size: int, progress: Optional[Progress] = None) -> dict:
+    """
+    Перестройка индекса активного бэкенда поиска. Пока она идёт, поиск
+    обслуживается старым индексом; новый подменяет его атомарно.
+    """
+    started = time.perf_counter()
+    if settings.SEARCH_BACKEND == "bm25":
+        articles = await _reindex_bm25(workers, chunk_size, progress)
+        backend = "bm25"
+    elif engine.dialect.name == "postgresql":
+        articles = await _reindex_postgres(workers, chunk_size, progress)
+        backend = "postgresql"
+    elif engine.dialect.name == "sqlite":
+        articles = await _reindex_fts5(progress)
+        backend = "fts5"
+    else:
+        raise ValueError(f"Full-text search is not supported for {engine.dialect.name}")
+
+    # Страницы, закэшированные по старому индексу, больше не нужны
+    await search_cache.bump()
+
+    elapsed = time.perf_counter() - started
+    logger.info("Search reindexed", backend=backend, articles=articles, seconds=round(elapsed, 2))
+    return {"backend": backend, "articles": articles, "seconds": elapsed}
+
+
+async def _searchable_ids() -> List[int]:
+    async with AsyncSession(engine) as db:
+        result = await db.execute(
+            select(Article.id)
+            .where(Article.status == ArticleStatus.PUBLISHED, Article.visibility == ArticleVisibility.PUBLIC)
+            .order_by(Article.id)
+        )
+        return list(result.scalars().all())
+
+
+async def _run_chunks(
+    worker: Callable,
+    chunks: List[Tuple[int, int]],
+    workers: int,
+    total: int,
+    progress: Optional[Progress]
+) -> list:
+    """
+    Обработка диапазонов в пуле процессов; результаты - в порядке диапазонов.
+    Процессы запускаются через spawn: у каждого свой движок БД, без
+    унаследованных соединений родителя.
+    """
+    loop = asyncio.get_running_loop()
+    results = [None] * len(chunks)
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [loop.run_in_executor(pool, worker, chunk) for chunk in chunks]
+        for future in asyncio.as_completed(futures):
+            count, _ = await future
+            done += count
+            if progress is not None:
+                progress(done, total)
+        for i, future in enumerate(futures):
+            results[i] = future.result()[1]
+    return results
+
+
+async def _reindex_bm25(workers: int, chunk_size: int, progress: Optional[Progress]) -> int:
+    """
+    Части индекса строятся процессами пула (чтение и стемминг - основная
+    работа), затем сливаются и записываются через os.replace; читатели
+    переключаются на новый файл по смене inode. Блокировка файла держится
+    всё время: инкрементальные обновления дождутся её и лягут поверх.
+    """
+    with index_lock(settings.SEARCH_INDEX_PATH):
+        ids = await _searchable_ids()
+        parts = await _run_chunks(_bm25_chunk, id_chunks(ids, chunk_size), workers, len(ids), progress)
+        index = BM25Index.merge(parts)
+        index.save(settings.SEARCH_INDEX_PATH)
+    return len(index)
+
+
+def _bm25_chunk(id_range: Tuple[int, int]) -> Tuple[int, BM25Index]:
+    return asyncio.run(_build_bm25_chunk(id_range))
+
+
+async def _build_bm25_chunk(id_range: Tuple[int, int]) -> Tuple[int, BM25Index]:
+    chunk_engine = create_async_engine(settings.DATABASE_URL, poolclass=NullPool)
+    try:
+        async with AsyncSession(chunk_engine) as db:
+            documents = []
+            async for batch in SearchIndexService(db).documents(id_range=id_range):
+                documents.extend(batch)
+    finally:
+        await chunk_engine.dispose()
+    return len(documents), BM25Index.build(documents)
+
+
+async def _reindex_postgres(workers: int, chunk_size: int, progress: Optional[Progress]) -> int:
+    """
+    tsvector пересчитывается на месте диапазонами id, каждый - своей
+    транзакцией: GIN-индекс остаётся в работе, читатели видят старый или
+    новый вектор строки. Сначала обновляется функция триггера, чтобы
+    правки во время перестройки уже шли с новыми настройками.
+    """
+    async with engine.begin() as conn:
+        await conn.execute(text(POSTGRES_DDL[1]))
+
+    async with AsyncSession(engine) as db:
+        result = await db.execute(select(Article.id).order_by(Article.id))
+        ids = list(result.scalars().all())
+    await _run_chunks(_postgres_chunk, id_chunks(ids, chunk_size), workers, len(ids), progress)
+    return len(ids)
+
+
+def _postgres_chunk(id_range: Tuple[int, int]) -> Tuple[int, None]:
+    return asyncio.run(_update_postgres_chunk(id_range))
+
+
+async def _update_postgres_chunk(id_range: Tuple[int, int]) -> Tuple[int, None]:
+    chunk_engine = create_async_engine(settings.DATABASE_URL, poolclass=NullPool)
+    try:
+        async with chunk_engine.begin() as conn:
+            # search_vector не отображена в модели - обновляется текстовым запросом
+            result = await conn.execute(
+                text(f"UPDATE articles SET search_vector = {weighted_vector()} WHERE id BETWEEN :first AND :last"),
+                {"first": id_range[0], "last": id_range[1]}
+            )
+    finally:
+        await chunk_engine.dispose()
+    return result.rowcount, None
+
+
+async def _reindex_fts5(progress: Optional[Progress]) -> int:
+    """
+    Новая FTS5-таблица заполняется и подменяет старую в одной транзакции
+    (SQLite пишет в один поток, поэтому пул процессов здесь не нужен).
+    Читатели до коммита видят старую таблицу; запись статей ждёт коммита.
+    """
+    async with engine.connect() as conn:
+        # Драйвер sqlite3 не открывает транзакцию перед DDL - открываем явно
+        await conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            await conn.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_REBUILD_TABLE}")
+            await conn.exec_driver_sql(fts_table_ddl(FTS_REBUILD_TABLE))
+            await conn.exec_driver_sql(f"INSERT INTO {FTS_REBUILD_TABLE}({FTS_REBUILD_TABLE}) VALUES ('rebuild')")
+            for trigger in SQLITE_TRIGGER_NAMES:
+                await conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+            await conn.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+            await conn.exec_driver_sql(f"ALTER TABLE {FTS_REBUILD_TABLE} RENAME TO {FTS_TABLE}")
+            for statement in SQLITE_TRIGGERS:
+                await conn.exec_driver_sql(statement)
+            articles = (await conn.exec_driver_sql("SELECT count(*) FROM articles")).scalar()
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+
+    if progress is not None:
+        progress(articles, articles)
+    return articles
@@ -0,0 +1,366 @@
+"""
+Полнотекстовый поиск статей: ранжирование, keyset-пагинация и подсветка
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import String, case, cast, column, func, literal, literal_column, table, tuple_, union_all
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.sql import Select
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import html
+
+from app.core.config import settings
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.article import Article, ArticleStatus, ArticleVisibility
+from app.models.search import FTS5_WEIGHTS, FTS_TABLE
+from app.models.tag import Tag, article_tags
+from app.models.user import User
+from app.services.article_service import ArticleService
+from app.services.search_cache import normalize_query, query_key, search_cache
+from app.services.search_index import TOKEN_RE, search_index, stem, tokenize
+
+# Маркеры подсветки: управляющие символы не встречаются в тексте статей,
+# поэтому текст можно экранировать целиком и заменить их на <mark>
+MARK_START = "\x02"
+MARK_END = "\x03"
+
+MAX_QUERY_TERMS = 16
+
+# Фасет периода публикации: (значение, дней назад); остальное - older
+PUBLISHED_BUCKETS = (("week", 7), ("month", 30), ("year", 365))
+
+_fts = table(FTS_TABLE, column("rowid"))
+
+
+class SearchUnavailableError(Exception):
+    """Полнотекстовый индекс не поддерживается СУБД"""
+    pass
+
+
+def query_terms(q: str) -> List[str]:
+    """Слова запроса в нижнем регистре (без операторов и пунктуации)"""
+    return tokenize(q)[:MAX_QUERY_TERMS]
+
+
+def fts_match(terms: List[str]) -> str:
+    """Запрос FTS5: каждое слово в кавычках, все слова обязательны"""
+    return " ".join('"%s"' % term for term in terms)
+
+
+def mark_terms(text: Optional[str], terms: Set[str], words: Optional[int] = None) -> Optional[str]:
+    """
+    Обрамление слов, основы которых (stem) есть в terms, маркерами
+    подсветки. С words возвращается только фрагмент из words слов вокруг
+    первого совпадения.
+    """
+    if not text:
+        return text
+
+    matches = list(TOKEN_RE.finditer(text))
+    if words is not None:
+        first = next((i for i, m in enumerate(matches) if stem(m.group().lower()) in terms), 0)
+        begin = max(0, first - words // 4)
+        matches = matches[begin:begin + words]
+        if not matches:
+            return ""
+        prefix = "… " if begin > 0 else ""
+        suffix = " …" if matches[-1].end() < len(text.rstrip()) else ""
+        start, end = matches[0].start(), matches[-1].end()
+    else:
+        prefix = suffix = ""
+        start, end = 0, len(text)
+
+    parts, position = [], start
+    for match in matches:
+        if stem(match.group().lower()) in terms:
+            parts.append(text[position:match.start()])
+            parts.append(MARK_START + match.group() + MARK_END)
+            position = match.end()
+    parts.append(text[position:end])
+    return prefix + "".join(parts) + suffix
+
+
+def highlight_html(text: Optional[str]) -> Optional[str]:
+    """Экранирование фрагмента и замена маркеров подсветки на <mark>"""
+    if text is None:
+        return None
+    return html.escape(text).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+class SearchService:
+    """
+    Поиск по title, subtitle, excerpt и content опубликованных публичных
+    статей через индекс СУБД (tsvector/GIN в PostgreSQL, FTS5 в SQLite, см.
+    app.models.search) или встроенный BM25-индекс (app.services.search_index).
+    Табличного сканирования с LIKE нет.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def search_articles(
+        self,
+        q: str,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Страница результатов по убыванию релевантности; курсор - (score, id)
+        последней статьи. При SEARCH_BACKEND=bm25 и построенном индексе
+        ранжирует встроенный индекс, иначе - полнотекстовый индекс СУБД.
+        Фрагменты с подсветкой строятся только для статей страницы; страницы
+        кэшируются по нормализованному запросу (app.services.search_cache).
+        """
+        q = normalize_query(q)
+        terms = query_terms(q)
+        if not terms:
+            return [], None
+
+        key = await search_cache.key(
+            "articles", query_key(q), limit, cursor, tuple(sorted(fields)) if fields is not None else None
+        )
+        page = search_cache.get(key)
+        if page is None:
+            page = await self._search_page(q, terms, limit, cursor, fields)
+            search_cache.set(key, page)
+        return page
+
+    async def _search_page(
+        self,
+        q: str,
+        terms: List[str],
+        limit: int,
+        cursor: Optional[str],
+        fields: Optional[Iterable[str]]
+    ) -> Tuple[List[dict], Optional[str]]:
+        after = tuple(decode_cursor(cursor, float, int)) if cursor else None
+        index = search_index.get() if settings.SEARCH_BACKEND == "bm25" else None
+        if index is not None:
+            # В индексе - основы слов, посчитанные при индексации; здесь
+            # нормализуются только слова запроса
+            hits = index.search([stem(term) for term in terms], limit + 1, after)
+        else:
+            hits = await self.ranked_ids(q, terms, limit + 1, after)
+
+        next_cursor = None
+        if len(hits) > limit:
+            hits = hits[:limit]
+            next_cursor = encode_cursor(hits[-1][1], hits[-1][0])
+
+        ids = [article_id for article_id, _ in hits]
+        scores = dict(hits)
+        articles = await ArticleService(self.db).get_published_by_ids(ids, fields)
+        if index is not None:
+            highlights = await self._text_highlights(terms, ids)
+        else:
+            highlights = await self._highlights(q, terms, ids)
+
+        results = [
+            {
+                **article.to_dict(include_content=False, fields=fields),
+                "score": scores[article.id],
+                "highlight": highlights.get(article.id, {}),
+            }
+            for article in articles
+        ]
+        return results, next_cursor
+
+    async def ranked_ids(
+        self,
+        q: str,
+        terms: List[str],
+        limit: int,
+        after: Optional[Tuple[float, int]]
+    ) -> List[Tuple[int, float]]:
+        """(id, score) статей по полнотекстовому индексу СУБД"""
+        ranked = self._ranked_query(q, terms).subquery()
+        page_query = (
+            select(ranked.c.id, ranked.c.score)
+            .order_by(ranked.c.score.desc(), ranked.c.id.desc())
+            .limit(limit)
+        )
+        if after is not None:
+            page_query = page_query.where(tuple_(ranked.c.score, ranked.c.id) < after)
+
+        result = await self.db.execute(page_query)
+        return [(row.id, row.score) for row in result]
+
+    def _ranked_query(self, q: str, terms: List[str]) -> Select:
+        """Опубликованные публичные статьи, подходящие под запрос: (id, score) без порядка"""
+        dialect = self._dialect()
+        if dialect == "postgresql":
+            tsquery = func.websearch_to_tsquery(cast(settings.SEARCH_TS_CONFIG, REGCONFIG), q)
+            vector = literal_column("articles.search_vector")
+            score = func.ts_rank_cd(vector, tsquery, 1)
+            query = select(Article.id, score.label("score")).where(vector.op("@@")(tsquery))
+        elif dialect == "sqlite":
+            # bm25 тем меньше, чем релевантнее; знак меняется для общего порядка
+            score = -func.bm25(literal_column(FTS_TABLE), *FTS5_WEIGHTS)
+            query = (
+                select(Article.id, score.label("score"))
+                .select_from(_fts.join(Article, Article.id == _fts.c.rowid))
+                .where(literal_column(FTS_TABLE).op("MATCH")(fts_match(terms)))
+            )
+        else:
+            raise SearchUnavailableError(f"Full-text search is not supported for {dialect}")
+
+        return query.where(
+            Article.status == ArticleStatus.PUBLISHED,
+            Article.visibility == ArticleVisibility.PUBLIC
+        )
+
+    async def facets(self, q: str) -> dict:
+        """
+        Фасеты результатов: теги, авторы и период публикации. Считаются по
+        первым SEARCH_FACET_MAX_DOCS подходящим статьям (capped - выборка
+        обрезана) одним запросом из GROUP BY по каждому фасету, объединённых
+        UNION ALL, и кэшируются по нормализованному запросу.
+        """
+        q = normalize_query(q)
+        terms = query_terms(q)
+        if not terms:
+            return {"total": 0, "capped": False, "tags": [], "authors": [], "published": []}
+
+        key = await search_cache.key("facets", query_key(q))
+        facets = search_cache.get(key)
+        if facets is None:
+            facets = await self._facets(q, terms)
+            search_cache.set(key, facets)
+        return facets
+
+    async def _facets(self, q: str, terms: List[str]) -> dict:
+        cap = settings.SEARCH_FACET_MAX_DOCS
+        size = settings.SEARCH_FACET_SIZE
+
+        index = search_index.get() if settings.SEARCH_BACKEND == "bm25" else None
+        if index is not None:
+            hits = index.search([stem(term) for term in terms], cap)
+            matched = (
+                select(Article.id, Article.author_id, Article.published_at)
+                .where(Article.id.in_([article_id for article_id, _ in hits]))
+                .subquery()
+            )
+        else:
+            # Без сортировки по релевантности: для широких запросов СУБД
+            # останавливается на первых cap совпадениях
+            ranked = self._ranked_query(q, terms).limit(cap).subquery()
+            matched = (
+                select(Article.id, Article.author_id, Article.published_at)
+                .join(ranked, ranked.c.id == Article.id)
+                .subquery()
+            )
+
+        now = datetime.now(timezone.utc)
+        period = case(
+            *((matched.c.published_at >= now - timedelta(days=days), name) for name, days in PUBLISHED_BUCKETS),
+            else_="older"
+        )
+        count = func.count().label("count")
+        parts = [
+            select(
+                literal("total", String).label("facet"),
+                literal(None, String).label("value"),
+                literal(None, String).label("label"),
+                count
+            )
+            .select_from(matched),
+            select(literal("tags", String), Tag.slug, Tag.name, count)
+            .select_from(matched)
+            .join(article_tags, article_tags.c.article_id == matched.c.id)
+            .join(Tag, Tag.id == article_tags.c.tag_id)
+            .group_by(Tag.slug, Tag.name)
+            .order_by(count.desc(), Tag.slug)
+            .limit(size),
+            select(literal("authors", String), User.username, User.display_name, count)
+            .select_from(matched)
+            .join(User, User.id == matched.c.author_id)
+            .group_by(User.username, User.display_name)
+            .order_by(count.desc(), User.username)
+            .limit(size),
+            select(literal("published", String), period, literal(None, String), count)
+            .select_from(matched)
+            .group_by(period),
+        ]
+        # Части с LIMIT оборачиваются в подзапросы (в SQLite LIMIT внутри UNION запрещён)
+        result = await self.db.execute(union_all(*(select(part.subquery()) for part in parts)))
+
+        facets = {"total": 0, "capped": False, "tags": [], "authors": [], "published": []}
+        for facet, value, label, number in result:
+            if facet == "total":
+                facets["total"] = number
+                facets["capped"] = number >= cap
+            elif facet == "published":
+                facets["published"].append({"value": value, "count": number})
+            else:
+                facets[facet].append({"value": value, "label": label or value, "count": number})
+
+        facets["tags"].sort(key=lambda item: (-item["count"], item["value"]))
+        facets["authors"].sort(key=lambda item: (-item["count"], item["value"]))
+        order = [name for name, _ in PUBLISHED_BUCKETS] + ["older"]
+        facets["published"].sort(key=lambda item: order.index(item["value"]))
+        return facets
+
+    async def _text_highlights(self, terms: List[str], ids: List[int]) -> Dict[int, dict]:
+        """Подсветка по текстам статей страницы (для встроенного индекса)"""
+        if not ids:
+            return {}
+
+        result = await self.db.execute(
+            select(Article.id, Article.title, Article.content).where(Article.id.in_(ids))
+        )
+        wanted = {stem(term) for term in terms}
+        return {
+            row.id: {
+                "title": highlight_html(mark_terms(row.title, wanted)),
+                "snippet": highlight_html(mark_terms(row.content, wanted, settings.SEARCH_SNIPPET_WORDS)),
+            }
+            for row in result
+        }
+
+    def _dialect(self) -> str:
+        return self.db.get_bind().dialect.name
+
+    async def _highlights(self, q: str, terms: List[str], ids: List[int]) -> Dict[int, dict]:
+        """Заголовок и фрагмент текста с подсветкой совпадений средствами СУБД"""
+        if not ids:
+            return {}
+
+        if self._dialect() == "postgresql":
+            tsquery = func.websearch_to_tsquery(cast(settings.SEARCH_TS_CONFIG, REGCONFIG), q)
+            options = f"StartSel={MARK_START}, StopSel={MARK_END}"
+            snippet_options = (
+                f"{options}, MaxWords={settings.SEARCH_SNIPPET_WORDS}, "
+                f"MinWords={settings.SEARCH_SNIPPET_WORDS // 2}, MaxFragments=2, FragmentDelimiter=\" … \""
+            )
+            query = (
+                select(
+                    Article.id,
+                    func.ts_headline(
+                        cast(settings.SEARCH_TS_CONFIG, REGCONFIG), Article.title, tsquery,
+                        f"{options}, HighlightAll=true"
+                    ).label("title"),
+                    func.ts_headline(
+                        cast(settings.SEARCH_TS_CONFIG, REGCONFIG), Article.content, tsquery, snippet_options
+                    ).label("snippet")
+                )
+                .where(Article.id.in_(ids))
+            )
+        else:
+            fts = literal_column(FTS_TABLE)
+            query = (
+                select(
+                    _fts.c.rowid.label("id"),
+                    func.highlight(fts, 0, MARK_START, MARK_END).label("title"),
+                    func.snippet(fts, 3, MARK_START, MARK_END, " … ", settings.SEARCH_SNIPPET_WORDS).label("snippet")
+                )
+                .where(fts.op("MATCH")(fts_match(terms)), _fts.c.rowid.in_(ids))
+            )
+
+        result = await self.db.execute(query)
+        return {
+            row.id: {"title": highlight_html(row.title), "snippet": highlight_html(row.snippet)}
+            for row in result
+        }
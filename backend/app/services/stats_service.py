@@ -0,0 +1,223 @@
+"""
+Сервис статистики статей: сырые события и инкрементальные агрегаты
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import case, delete, func, insert, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import structlog
+
+from app.core.config import settings
+from app.models.stats import ArticleEvent, ArticleStatsDaily, ArticleStatsHourly, StatsWatermark
+
+logger = structlog.get_logger()
+
+ROLLUP_WATERMARK = "article_stats"
+
+# Тип события -> колонка агрегата, куда суммируется count
+EVENT_COLUMNS = {
+    "view": "views",
+    "like": "likes",
+    "comment": "comments",
+    "share": "shares",
+    "read": "reads",
+}
+
+# Колонка агрегата, куда суммируется value событий time (секунды на странице)
+READ_SECONDS_COLUMN = "read_seconds"
+READ_SECONDS_EVENT = "time"
+
+STATS_COLUMNS = tuple(EVENT_COLUMNS.values()) + (READ_SECONDS_COLUMN,)
+
+
+async def record_events(db: AsyncSession, events: List[dict]) -> None:
+    """
+    Пакетная вставка сырых событий одним многострочным INSERT.
+    Событие: {"article_id", "event_type", "count"?, "value"?, "created_at"?}.
+    Сессию фиксирует вызывающий код.
+    """
+    if not events:
+        return
+    rows = [
+        {
+            "article_id": event["article_id"],
+            "event_type": event["event_type"],
+            "count": event.get("count", 1),
+            "value": event.get("value"),
+            "created_at": event.get("created_at") or datetime.now(timezone.utc),
+        }
+        for event in events
+    ]
+    await db.execute(insert(ArticleEvent), rows)
+
+
+class StatsService:
+    """
+    Агрегаты article_stats_hourly/daily пополняются по сырым событиям с
+    id больше водяной отметки. События моложе STATS_ROLLUP_LAG_SECONDS
+    не берутся: транзакции, получившие id раньше, могли ещё не завершиться,
+    и отметка перескочила бы через них.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def rollup(self, now: Optional[datetime] = None) -> int:
+        """Учёт новых событий в агрегатах; агрегаты и отметка меняются в одной транзакции"""
+        now = now or datetime.now(timezone.utc)
+        watermark = await self._lock_watermark()
+
+        result = await self.db.execute(
+            select(func.max(ArticleEvent.id))
+            .where(
+                ArticleEvent.id > watermark,
+                ArticleEvent.id <= watermark + settings.STATS_ROLLUP_BATCH_SIZE,
+                ArticleEvent.created_at <= now - timedelta(seconds=settings.STATS_ROLLUP_LAG_SECONDS)
+            )
+        )
+        upper = result.scalar_one_or_none()
+        if upper is None:
+            await self.db.commit()
+            return 0
+
+        hourly = await self._aggregate_hours(watermark, upper)
+
+        daily: Dict[Tuple[int, date], Dict[str, float]] = defaultdict(lambda: dict.fromkeys(STATS_COLUMNS, 0))
+        for (article_id, bucket), values in hourly.items():
+            totals = daily[(article_id, bucket.date())]
+            for column in STATS_COLUMNS:
+                totals[column] += values[column]
+
+        await self._upsert(ArticleStatsHourly, hourly)
+        await self._upsert(ArticleStatsDaily, daily)
+        await self.db.execute(
+            update(StatsWatermark)
+            .where(StatsWatermark.name == ROLLUP_WATERMARK)
+            .values(last_event_id=upper)
+        )
+        await self.db.commit()
+
+        logger.info("Article stats rolled up", events_up_to=upper, buckets=len(hourly))
+        return len(hourly)
+
+    async def cleanup_events(self, now: Optional[datetime] = None) -> int:
+        """Удаление уже учтённых сырых событий старше STATS_EVENTS_RETENTION_DAYS"""
+        now = now or datetime.now(timezone.utc)
+        result = await self.db.execute(
+            select(StatsWatermark.last_event_id).where(StatsWatermark.name == ROLLUP_WATERMARK)
+        )
+        watermark = result.scalar_one_or_none() or 0
+
+        result = await self.db.execute(
+            delete(ArticleEvent)
+            .where(
+                ArticleEvent.id <= watermark,
+                ArticleEvent.created_at < now - timedelta(days=settings.STATS_EVENTS_RETENTION_DAYS)
+            )
+        )
+        await self.db.commit()
+        return result.rowcount
+
+    async def get_article_stats(
+        self,
+        article_id: int,
+        granularity: str = "day",
+        since: Optional[datetime] = None
+    ) -> List[dict]:
+        """Агрегаты статьи по часам или дням, начиная с since"""
+        model = ArticleStatsHourly if granularity == "hour" else ArticleStatsDaily
+        query = (
+            select(model.bucket, *(getattr(model, column) for column in STATS_COLUMNS))
+            .where(model.article_id == article_id)
+            .order_by(model.bucket)
+        )
+        if since is not None:
+            query = query.where(model.bucket >= (since if model is ArticleStatsHourly else since.date()))
+
+        result = await self.db.execute(query)
+        return [dict(row._mapping) for row in result]
+
+    async def _lock_watermark(self) -> int:
+        """Текущая отметка с блокировкой строки (параллельный rollup ждёт)"""
+        result = await self.db.execute(
+            select(StatsWatermark.last_event_id)
+            .where(StatsWatermark.name == ROLLUP_WATERMARK)
+            .with_for_update()
+        )
+        watermark = result.scalar_one_or_none()
+        if watermark is None:
+            self.db.add(StatsWatermark(name=ROLLUP_WATERMARK, last_event_id=0))
+            await self.db.flush()
+            watermark = 0
+        return watermark
+
+    async def _aggregate_hours(self, lower: int, upper: int) -> Dict[Tuple[int, datetime], Dict[str, float]]:
+        """Суммы событий диапазона (lower, upper] по статьям и часам - одним GROUP BY"""
+        bucket = self._hour_bucket()
+        sums = [
+            func.sum(case((ArticleEvent.event_type == event_type, ArticleEvent.count), else_=0)).label(column)
+            for event_type, column in EVENT_COLUMNS.items()
+        ]
+        sums.append(
+            func.sum(
+                case((ArticleEvent.event_type == READ_SECONDS_EVENT, func.coalesce(ArticleEvent.value, 0)), else_=0)
+            ).label(READ_SECONDS_COLUMN)
+        )
+        result = await self.db.execute(
+            select(ArticleEvent.article_id, bucket.label("bucket"), *sums)
+            .where(ArticleEvent.id > lower, ArticleEvent.id <= upper)
+            .group_by(ArticleEvent.article_id, bucket)
+        )
+
+        hourly = {}
+        for row in result:
+            values = row._mapping
+            hourly[(row.article_id, self._as_datetime(row.bucket))] = {
+                column: values[column] or 0 for column in STATS_COLUMNS
+            }
+        return hourly
+
+    def _dialect(self) -> str:
+        return self.db.get_bind().dialect.name
+
+    def _hour_bucket(self):
+        """Начало часа события (UTC) средствами конкретной СУБД"""
+        dialect = self._dialect()
+        if dialect == "postgresql":
+            return func.date_trunc("hour", func.timezone("UTC", ArticleEvent.created_at))
+        if dialect == "mysql":
+            return func.date_format(ArticleEvent.created_at, "%Y-%m-%d %H:00:00")
+        return func.strftime("%Y-%m-%d %H:00:00", ArticleEvent.created_at)
+
+    @staticmethod
+    def _as_datetime(value) -> datetime:
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+    async def _upsert(self, model, buckets: Dict[tuple, Dict[str, float]]) -> None:
+        """Прибавление сумм к агрегатам: INSERT ... ON CONFLICT/DUPLICATE KEY UPDATE"""
+        if not buckets:
+            return
+        rows = [
+            {"article_id": article_id, "bucket": bucket, **values}
+            for (article_id, bucket), values in buckets.items()
+        ]
+
+        dialect = self._dialect()
+        if dialect == "mysql":
+            stmt = mysql.insert(model)
+            stmt = stmt.on_duplicate_key_update({
+                column: getattr(model, column) + stmt.inserted[column] for column in STATS_COLUMNS
+            })
+        else:
+            stmt = (postgresql if dialect == "postgresql" else sqlite).insert(model)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["article_id", "bucket"],
+                set_={column: getattr(model, column) + stmt.excluded[column] for column in STATS_COLUMNS}
+            )
+        await self.db.execute(stmt, rows)
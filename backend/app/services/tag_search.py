@@ -0,0 +1,207 @@
+"""
+Автодополнение тегов: отсортированный массив имён и slug в памяти процесса
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from redis.exceptions import RedisError
+from asyncio import Lock as AsyncLock
+from bisect import bisect_left, insort
+from heapq import nlargest
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import time
+import structlog
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.models.tag import Tag
+
+logger = structlog.get_logger()
+
+TAG_VERSION_KEY = "search:tags:version"
+TAG_CHANGES_KEY = "search:tags:changes"  # ZSET tag_id -> версия изменения
+
+# Сколько последних версий хранится в журнале изменений; отставший сильнее
+# процесс перечитывает теги целиком
+MAX_TRACKED_VERSIONS = 1000
+
+# Префиксы до этой длины совпадают с большой частью тегов, поэтому их
+# топ считается один раз и кэшируется до изменения подходящих тегов
+CACHED_PREFIX_LENGTH = 2
+
+MAX_COMPLETIONS = 20
+
+# Версия увеличивается и изменённые теги записываются в журнал атомарно,
+# иначе процесс мог бы прочитать новую версию без её изменений
+_NOTIFY_SCRIPT = """
+local version = redis.call('INCR', KEYS[1])
+for i = 2, #ARGV do
+    redis.call('ZADD', KEYS[2], version, ARGV[i])
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', version - tonumber(ARGV[1]))
+return version
+"""
+
+_MAX_CHAR = "\U0010ffff"
+
+
+class TagCompletionIndex:
+    """
+    Ключи (имя и slug в нижнем регистре) отсортированы вместе с id тега,
+    поэтому теги с префиксом - непрерывный диапазон, находимый bisect.
+    Процессы синхронизируются по версии в Redis: изменённые теги берутся из
+    журнала и перечитываются из БД точечно. Без Redis индекс перечитывается
+    целиком раз в TAG_INDEX_REFRESH_INTERVAL.
+    """
+
+    def __init__(self):
+        self._lock = AsyncLock()
+        self.keys: List[Tuple[str, int]] = []
+        self.tags: Dict[int, Tuple[str, str, int]] = {}  # id -> (name, slug, articles_count)
+        self.top: Dict[str, List[int]] = {}
+        self.version: Optional[int] = None
+        self.checked_at = 0.0
+        self.loaded_at = 0.0
+        self.ready = False
+
+    def complete(self, prefix: str, limit: int = 10) -> List[dict]:
+        """Теги, имя или slug которых начинается с prefix, по числу статей"""
+        prefix = " ".join(prefix.lower().split())
+        if not prefix:
+            return []
+        limit = min(limit, MAX_COMPLETIONS)
+
+        if len(prefix) <= CACHED_PREFIX_LENGTH:
+            ids = self.top.get(prefix)
+            if ids is None:
+                ids = self.top[prefix] = self._top(prefix, MAX_COMPLETIONS)
+            ids = ids[:limit]
+        else:
+            ids = self._top(prefix, limit)
+
+        return [
+            {"id": tag_id, "name": self.tags[tag_id][0], "slug": self.tags[tag_id][1], "articles_count": self.tags[tag_id][2]}
+            for tag_id in ids
+        ]
+
+    def _top(self, prefix: str, limit: int) -> List[int]:
+        start = bisect_left(self.keys, (prefix,))
+        end = bisect_left(self.keys, (prefix + _MAX_CHAR,), start)
+        ids = {tag_id for _, tag_id in self.keys[start:end]}
+        return nlargest(limit, ids, key=lambda tag_id: (self.tags[tag_id][2], -tag_id))
+
+    def load(self, rows: Iterable) -> None:
+        """Полная сборка индекса"""
+        tags = {row.id: (row.name, row.slug, row.articles_count or 0) for row in rows}
+        keys = sorted({(key, tag_id) for tag_id, tag in tags.items() for key in _keys(tag)})
+        self.tags, self.keys, self.top = tags, keys, {}
+        self.ready = True
+
+    def apply(self, rows: Iterable, removed: Iterable[int] = ()) -> None:
+        """Точечное обновление: новые и изменённые теги, удалённые id"""
+        for tag_id in removed:
+            self._remove(tag_id)
+        for row in rows:
+            self._remove(row.id)
+            tag = (row.name, row.slug, row.articles_count or 0)
+            self.tags[row.id] = tag
+            for key in _keys(tag):
+                insort(self.keys, (key, row.id))
+                self._invalidate(key)
+
+    def _remove(self, tag_id: int) -> None:
+        tag = self.tags.pop(tag_id, None)
+        if tag is None:
+            return
+        for key in _keys(tag):
+            i = bisect_left(self.keys, (key, tag_id))
+            if i < len(self.keys) and self.keys[i] == (key, tag_id):
+                del self.keys[i]
+            self._invalidate(key)
+
+    def _invalidate(self, key: str) -> None:
+        for length in range(1, CACHED_PREFIX_LENGTH + 1):
+            self.top.pop(key[:length], None)
+
+    async def sync(self, db: AsyncSession) -> None:
+        """
+        Проверка версии не чаще раза в TAG_INDEX_CHECK_INTERVAL; между
+        проверками запросы обслуживаются без обращений к Redis и БД
+        """
+        now = time.monotonic()
+        if self.ready and now - self.checked_at < settings.TAG_INDEX_CHECK_INTERVAL:
+            return
+
+        async with self._lock:
+            if self.ready and time.monotonic() - self.checked_at < settings.TAG_INDEX_CHECK_INTERVAL:
+                return
+
+            version, changed = await self._changes()
+            if version is None:
+                # Без Redis изменения других процессов не видны - только полная перезагрузка
+                if not self.ready or now - self.loaded_at >= settings.TAG_INDEX_REFRESH_INTERVAL:
+                    await self._load(db)
+            elif not self.ready or self.version is None or version - self.version > MAX_TRACKED_VERSIONS:
+                await self._load(db)
+            elif changed:
+                result = await db.execute(
+                    select(Tag.id, Tag.name, Tag.slug, Tag.articles_count).where(Tag.id.in_(changed))
+                )
+                rows = result.all()
+                self.apply(rows, removed=changed - {row.id for row in rows})
+
+            self.version = version
+            self.checked_at = time.monotonic()
+
+    async def _changes(self) -> Tuple[Optional[int], Set[int]]:
+        """Текущая версия и теги, изменённые после версии индекса"""
+        redis = await get_redis()
+        if redis is None:
+            return None, set()
+        try:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.get(TAG_VERSION_KEY)
+                pipe.zrangebyscore(TAG_CHANGES_KEY, f"({self.version or 0}", "+inf")
+                version, changed = await pipe.execute()
+        except RedisError as e:
+            logger.warning("Failed to read tag index version from Redis", error=str(e))
+            return None, set()
+        return int(version or 0), {int(tag_id) for tag_id in changed}
+
+    async def _load(self, db: AsyncSession) -> None:
+        result = await db.execute(select(Tag.id, Tag.name, Tag.slug, Tag.articles_count))
+        self.load(result.all())
+        self.loaded_at = time.monotonic()
+        logger.info("Tag completion index built", tags=len(self.tags))
+
+
+def _keys(tag: Tuple[str, str, int]) -> Set[str]:
+    name, slug, _ = tag
+    return {key for key in (" ".join(name.lower().split()), slug.lower()) if key}
+
+
+tag_index = TagCompletionIndex()
+
+
+async def notify_tags_changed(tag_ids: Iterable[int]) -> None:
+    """
+    Публикация изменения тегов (создание, смена счётчика) для всех процессов;
+    вызывается после коммита
+    """
+    tag_ids = list(tag_ids)
+    if not tag_ids:
+        return
+
+    redis = await get_redis()
+    if redis is not None:
+        try:
+            await redis.eval(
+                _NOTIFY_SCRIPT, 2, TAG_VERSION_KEY, TAG_CHANGES_KEY,
+                MAX_TRACKED_VERSIONS, *[str(tag_id) for tag_id in tag_ids]
+            )
+            return
+        except RedisError as e:
+            logger.warning("Failed to publish tag changes to Redis", error=str(e))
+
+    # Без Redis - хотя бы индекс текущего процесса увидит изменения сразу
+    tag_index.checked_at = tag_index.loaded_at = 0.0
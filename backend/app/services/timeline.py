@@ -0,0 +1,258 @@
+"""
+Лента подписок: гибридная рассылка (fan-out) по Redis и чтение крупных авторов из БД
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import func, tuple_
+from redis.exceptions import RedisError
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+import structlog
+
+from app.core.config import settings
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.redis import get_redis
+from app.models.article import Article, ArticleStatus, ArticleVisibility
+from app.models.follow import Follow
+from app.models.user import User
+
+logger = structlog.get_logger()
+
+# Запас по score при чтении страницы: published_at хранится как float и
+# при переводе в timestamp может округлиться
+SCORE_SLACK = 1.0
+
+# Статьи добавляются только в существующую ленту: отсутствующая (холодная
+# или истёкшая) лента при первом чтении заполняется из БД целиком
+_PUSH_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('ZADD', KEYS[1], unpack(ARGV, 2))
+redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -tonumber(ARGV[1]) - 1)
+return 1
+"""
+
+
+def timeline_key(user_id: int) -> str:
+    return f"timeline:{user_id}"
+
+
+def _utc(value: datetime) -> datetime:
+    """SQLite возвращает даты без часового пояса - они в UTC"""
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def _sort_key(row) -> Tuple[datetime, int]:
+    return _utc(row.published_at), row.id
+
+
+class TimelineService:
+    """
+    Лента статей авторов, на которых подписан пользователь. Статьи авторов
+    с аудиторией до TIMELINE_FANOUT_MAX_FOLLOWERS при публикации
+    раскладываются в ленты подписчиков (ZSET article_id -> published_at,
+    не длиннее TIMELINE_MAX_SIZE). Статьи более крупных авторов в ленты не
+    пишутся - их слишком много получателей - и подмешиваются при чтении
+    одним запросом по индексу (author_id, published_at). Без Redis лента
+    целиком читается из БД.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_page(
+        self,
+        user_id: int,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[int], Optional[str]]:
+        """id статей страницы, новые первыми; курсор - (published_at, id) последней"""
+        after = None
+        if cursor:
+            published_at, article_id = decode_cursor(cursor, datetime, int)
+            after = (_utc(published_at), article_id)
+
+        pushed = None
+        redis = await get_redis()
+        if redis is not None:
+            try:
+                pushed = await self._pushed(redis, user_id, limit, after)
+            except RedisError as e:
+                logger.warning("Failed to read timeline from Redis", user_id=user_id, error=str(e))
+
+        if pushed is None:
+            rows = await self._latest(await self._followed_authors(user_id), limit + 1, after)
+        else:
+            large = await self._followed_authors(user_id, large=True)
+            rows = pushed + await self._latest(large, limit + 1, after)
+
+        # Статья крупного автора могла попасть в ленту, пока он был небольшим
+        merged = {row.id: row for row in rows}
+        rows = sorted(merged.values(), key=_sort_key, reverse=True)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].published_at, rows[-1].id)
+        return [row.id for row in rows], next_cursor
+
+    async def _pushed(self, redis, user_id: int, limit: int, after: Optional[Tuple[datetime, int]]) -> list:
+        """
+        Статьи из ленты в Redis после курсора. Снятые с публикации и
+        удалённые статьи отсеиваются по БД, поэтому id читаются с запасом
+        """
+        key = timeline_key(user_id)
+        async with redis.pipeline(transaction=False) as pipe:
+            # EXPIRE заодно сообщает, существует ли лента
+            pipe.expire(key, settings.TIMELINE_TTL)
+            exists, = await pipe.execute()
+        if not exists:
+            await self._backfill(redis, user_id)
+
+        max_score = after[0].timestamp() + SCORE_SLACK if after else "+inf"
+        batch = 2 * limit + 1
+        rows, offset = [], 0
+        while len(rows) <= limit:
+            ids = await redis.zrevrangebyscore(key, max_score, "-inf", start=offset, num=batch)
+            offset += len(ids)
+            if ids:
+                found = await self._published([int(article_id) for article_id in ids])
+                rows.extend(row for row in found if after is None or _sort_key(row) < after)
+            if len(ids) < batch:
+                break
+        return rows
+
+    async def _backfill(self, redis, user_id: int) -> int:
+        """Заполнение холодной ленты последними статьями небольших авторов из подписок"""
+        rows = await self._latest(await self._followed_authors(user_id, large=False), settings.TIMELINE_MAX_SIZE)
+        if rows:
+            key = timeline_key(user_id)
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.zadd(key, {str(row.id): _utc(row.published_at).timestamp() for row in rows})
+                pipe.expire(key, settings.TIMELINE_TTL)
+                await pipe.execute()
+        return len(rows)
+
+    async def _followed_authors(self, user_id: int, large: Optional[bool] = None) -> List[int]:
+        """Авторы из подписок: все, только крупные (large=True) или только небольшие"""
+        query = select(Follow.following_id).where(Follow.follower_id == user_id)
+        if large is not None:
+            followers = func.coalesce(User.followers_count, 0)
+            threshold = settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+            query = query.join(User, User.id == Follow.following_id).where(
+                followers > threshold if large else followers <= threshold
+            )
+        return list((await self.db.execute(query)).scalars().all())
+
+    async def _latest(self, author_ids: List[int], limit: int, after: Optional[Tuple[datetime, int]] = None) -> list:
+        """Последние публичные статьи авторов: (id, published_at) до курсора"""
+        if not author_ids:
+            return []
+        query = (
+            select(Article.id, Article.published_at)
+            .where(
+                Article.author_id.in_(author_ids),
+                Article.status == ArticleStatus.PUBLISHED,
+                Article.visibility == ArticleVisibility.PUBLIC,
+                Article.published_at.isnot(None)
+            )
+            .order_by(Article.published_at.desc(), Article.id.desc())
+            .limit(limit)
+        )
+        if after:
+            query = query.where(tuple_(Article.published_at, Article.id) < after)
+        return list((await self.db.execute(query)).all())
+
+    async def _published(self, article_ids: List[int]) -> list:
+        result = await self.db.execute(
+            select(Article.id, Article.published_at).where(
+                Article.id.in_(article_ids),
+                Article.status == ArticleStatus.PUBLISHED,
+                Article.visibility == ArticleVisibility.PUBLIC,
+                Article.published_at.isnot(None)
+            )
+        )
+        return list(result.all())
+
+    async def fan_out(self, article_ids: List[int]) -> int:
+        """
+        Рассылка опубликованных статей в ленты подписчиков небольших авторов.
+        Подписчики читаются потоком по индексу idx_follow_followers, записи в
+        Redis уходят одним конвейером на пачку. Возвращает число лент.
+        """
+        redis = await get_redis()
+        if redis is None:
+            return 0
+
+        result = await self.db.execute(
+            select(Article.id, Article.author_id, Article.published_at)
+            .join(User, User.id == Article.author_id)
+            .where(
+                Article.id.in_(article_ids),
+                Article.status == ArticleStatus.PUBLISHED,
+                Article.visibility == ArticleVisibility.PUBLIC,
+                Article.published_at.isnot(None),
+                func.coalesce(User.followers_count, 0) <= settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+            )
+        )
+        entries: Dict[int, list] = {}
+        for row in result:
+            entries.setdefault(row.author_id, []).extend([_utc(row.published_at).timestamp(), str(row.id)])
+
+        push = redis.register_script(_PUSH_SCRIPT)
+        delivered = 0
+        try:
+            for author_id, args in entries.items():
+                stream = await self.db.stream(
+                    select(Follow.follower_id)
+                    .where(Follow.following_id == author_id)
+                    .execution_options(yield_per=settings.TIMELINE_FANOUT_BATCH_SIZE)
+                )
+                async for followers in stream.scalars().partitions():
+                    await self._push_many(push, redis, followers, args)
+                    delivered += len(followers)
+        except RedisError as e:
+            logger.warning("Failed to fan out articles to timelines", error=str(e))
+
+        logger.info("Articles fanned out to timelines", articles=len(article_ids), timelines=delivered)
+        return delivered
+
+    @staticmethod
+    async def _push_many(push, redis, user_ids: Iterable[int], args: list) -> None:
+        async with redis.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                await push(keys=[timeline_key(user_id)], args=[settings.TIMELINE_MAX_SIZE, *args], client=pipe)
+            await pipe.execute()
+
+    async def add_author(self, user_id: int, author_id: int) -> None:
+        """После подписки: последние статьи небольшого автора - в ленту подписчика"""
+        redis = await get_redis()
+        if redis is None:
+            return
+        followers = await self.db.scalar(select(User.followers_count).where(User.id == author_id))
+        if (followers or 0) > settings.TIMELINE_FANOUT_MAX_FOLLOWERS:
+            return
+
+        rows = await self._latest([author_id], settings.TIMELINE_MAX_SIZE)
+        if not rows:
+            return
+        args = [value for row in rows for value in (_utc(row.published_at).timestamp(), str(row.id))]
+        try:
+            await self._push_many(redis.register_script(_PUSH_SCRIPT), redis, [user_id], args)
+        except RedisError as e:
+            logger.warning("Failed to add author to timeline", user_id=user_id, error=str(e))
+
+    async def remove_author(self, user_id: int, author_id: int) -> None:
+        """После отписки: статьи автора убираются из ленты"""
+        redis = await get_redis()
+        if redis is None:
+            return
+        rows = await self._latest([author_id], settings.TIMELINE_MAX_SIZE)
+        if not rows:
+            return
+        try:
+            await redis.zrem(timeline_key(user_id), *[str(row.id) for row in rows])
+        except RedisError as e:
+            logger.warning("Failed to remove author from timeline", user_id=user_id, error=str(e))
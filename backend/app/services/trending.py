@@ -0,0 +1,274 @@
+"""
+Рейтинг популярных статей с экспоненциальным затуханием
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from redis.exceptions import RedisError
+from asyncio import Lock as AsyncLock
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+import time
+import structlog
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.models.article import Article, ArticleStatus, ArticleVisibility
+
+logger = structlog.get_logger()
+
+TRENDING_KEY = "articles:trending"
+TRENDING_EPOCH_KEY = "articles:trending:epoch"
+TRENDING_SEEDED_KEY = "articles:trending:seeded"  # Начальное заполнение выполнено
+TRENDING_SEED_LOCK_KEY = "articles:trending:seed_lock"
+TRENDING_REBUILD_KEY = "articles:trending:rebuild"  # Новый рейтинг до подмены
+
+# Сколько может длиться начальное заполнение, прежде чем его повторит другой процесс
+SEED_LOCK_TIMEOUT = 300
+
+# Вес события в рейтинге; соответствует колонкам *_count статьи
+EVENT_WEIGHTS = {
+    "view": 1.0,
+    "like": 4.0,
+    "comment": 6.0,
+    "share": 8.0,
+}
+
+# Через сколько периодов полураспада вклад событий пересчитывается к новой эпохе
+REBASE_AFTER_HALF_LIVES = 64
+
+# Вклад события: weight * 2^((t - epoch) / half_life). Рейтинг инвариантен к
+# общему множителю, поэтому старые очки не нужно уменьшать - новые просто
+# весят больше. Когда множитель становится большим, все очки делятся на него,
+# а эпоха сдвигается (атомарно, в одном скрипте).
+_RECORD_SCRIPT = """
+local now = tonumber(ARGV[1])
+local half_life = tonumber(ARGV[2])
+local rebase_after = tonumber(ARGV[3])
+local max_size = tonumber(ARGV[4])
+local epoch = tonumber(redis.call('GET', KEYS[2]))
+if not epoch then
+    epoch = now
+    redis.call('SET', KEYS[2], tostring(epoch))
+end
+if now - epoch > rebase_after * half_life then
+    local factor = 2 ^ (-(now - epoch) / half_life)
+    redis.call('ZUNIONSTORE', KEYS[1], 1, KEYS[1], 'WEIGHTS', tostring(factor))
+    epoch = now
+    redis.call('SET', KEYS[2], tostring(epoch))
+end
+for i = 5, #ARGV, 2 do
+    local increment = tonumber(ARGV[i + 1]) * 2 ^ ((now - epoch) / half_life)
+    redis.call('ZINCRBY', KEYS[1], increment, ARGV[i])
+end
+local overflow = redis.call('ZCARD', KEYS[1]) - max_size
+if overflow > 0 then
+    redis.call('ZREMRANGEBYRANK', KEYS[1], 0, overflow - 1)
+end
+return epoch
+"""
+
+
+class _LocalRanking:
+    """Внутрипроцессный рейтинг: очки в словаре и отсортированный список для top-k"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.epoch: Optional[float] = None
+        self._scores: Dict[int, float] = {}
+        self._order: List[Tuple[float, int]] = []  # (-score, article_id)
+        self._lock = Lock()
+
+    def record(self, now: float, half_life: float, increments: Dict[int, float]) -> None:
+        with self._lock:
+            if self.epoch is None:
+                self.epoch = now
+            if now - self.epoch > REBASE_AFTER_HALF_LIVES * half_life:
+                factor = 2 ** (-(now - self.epoch) / half_life)
+                self._scores = {key: score * factor for key, score in self._scores.items()}
+                self._order = [(neg * factor, key) for neg, key in self._order]
+                self.epoch = now
+
+            multiplier = 2 ** ((now - self.epoch) / half_life)
+            for article_id, weight in increments.items():
+                old = self._scores.get(article_id)
+                if old is not None:
+                    del self._order[bisect_left(self._order, (-old, article_id))]
+                score = (old or 0.0) + weight * multiplier
+                self._scores[article_id] = score
+                insort(self._order, (-score, article_id))
+
+            while len(self._order) > self.max_size:
+                _, article_id = self._order.pop()
+                del self._scores[article_id]
+
+    def load(self, epoch: float, scores: Dict[int, float]) -> None:
+        """Замена рейтинга целиком (после перестройки)"""
+        order = sorted((-score, article_id) for article_id, score in scores.items())[:self.max_size]
+        with self._lock:
+            self.epoch = epoch
+            self._order = order
+            self._scores = {article_id: -neg for neg, article_id in order}
+
+    def top(self, limit: int) -> List[Tuple[int, float]]:
+        with self._lock:
+            return [(article_id, -neg) for neg, article_id in self._order[:limit]]
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+
+class TrendingRanking:
+    """
+    Инкрементальный рейтинг популярных статей: Redis ZSET, если Redis
+    доступен, иначе отсортированная структура в памяти процесса.
+    """
+
+    def __init__(self):
+        self.half_life = settings.TRENDING_HALF_LIFE_HOURS * 3600.0
+        self.max_size = settings.TRENDING_MAX_SIZE
+        self._local = _LocalRanking(self.max_size)
+        self._seeded = False
+        self._seed_lock = AsyncLock()
+
+    async def record(self, article_id: int, event: str, count: int = 1) -> None:
+        """Учёт события взаимодействия со статьёй"""
+        await self.record_many({article_id: EVENT_WEIGHTS[event] * count})
+
+    async def record_many(self, increments: Dict[int, float], now: Optional[float] = None) -> None:
+        """Учёт пачки взвешенных событий {article_id: вес}"""
+        if not increments:
+            return
+        now = time.time() if now is None else now
+
+        redis = await get_redis()
+        if redis is not None:
+            args: List[object] = [now, self.half_life, REBASE_AFTER_HALF_LIVES, self.max_size]
+            for article_id, weight in increments.items():
+                args.extend([str(article_id), weight])
+            try:
+                await redis.eval(_RECORD_SCRIPT, 2, TRENDING_KEY, TRENDING_EPOCH_KEY, *args)
+                return
+            except RedisError as e:
+                logger.warning("Failed to update trending ranking in Redis", error=str(e))
+
+        self._local.record(now, self.half_life, increments)
+
+    async def top(self, limit: int) -> List[Tuple[int, float]]:
+        """Первые limit статей рейтинга: O(log N + k)"""
+        redis = await get_redis()
+        if redis is not None:
+            try:
+                entries = await redis.zrevrange(TRENDING_KEY, 0, limit - 1, withscores=True)
+                return [(int(article_id), score) for article_id, score in entries]
+            except RedisError as e:
+                logger.warning("Failed to read trending ranking from Redis", error=str(e))
+
+        return self._local.top(limit)
+
+    async def ensure_seeded(self, db: AsyncSession) -> None:
+        """
+        Однократное начальное заполнение рейтинга (после первого запуска
+        или потери данных Redis). Признак заполнения хранится отдельно от
+        рейтинга, поэтому пустой рейтинг не перестраивается на каждом
+        запросе; заполняет один процесс - тот, кто взял блокировку.
+        """
+        if self._seeded:
+            return
+
+        redis = await get_redis()
+        if redis is not None:
+            try:
+                if await redis.exists(TRENDING_SEEDED_KEY):
+                    self._seeded = True
+                    return
+                if not await redis.set(TRENDING_SEED_LOCK_KEY, "1", nx=True, ex=SEED_LOCK_TIMEOUT):
+                    return
+                try:
+                    await self.rebuild(db)
+                    await redis.set(TRENDING_SEEDED_KEY, "1")
+                    self._seeded = True
+                finally:
+                    await redis.delete(TRENDING_SEED_LOCK_KEY)
+                return
+            except RedisError as e:
+                logger.warning("Failed to seed trending ranking in Redis", error=str(e))
+
+        async with self._seed_lock:
+            if not self._seeded:
+                await self.rebuild(db)
+                self._seeded = True
+
+    async def rebuild(self, db: AsyncSession) -> int:
+        """
+        Заполнение рейтинга по счётчикам *_count статей, опубликованных за
+        последние TRENDING_WINDOW_DAYS дней (события считаются произошедшими
+        в момент публикации). Очки считаются в процессе относительно эпохи
+        "сейчас", пишутся во временный ключ одним конвейером и подменяют
+        рейтинг через RENAME вместе с эпохой.
+        """
+        now = time.time()
+        since = datetime.fromtimestamp(now, timezone.utc) - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+        result = await self._load_counts(db, since)
+
+        scores: Dict[int, float] = {}
+        for article_id, published_at, counts in result:
+            weight = sum(EVENT_WEIGHTS[event] * (counts[event] or 0) for event in EVENT_WEIGHTS)
+            if weight:
+                scores[article_id] = weight * 2 ** ((published_at.timestamp() - now) / self.half_life)
+        if len(scores) > self.max_size:
+            scores = dict(sorted(scores.items(), key=lambda item: item[1], reverse=True)[:self.max_size])
+
+        redis = await get_redis()
+        if redis is not None and scores:
+            try:
+                async with redis.pipeline(transaction=True) as pipe:
+                    pipe.delete(TRENDING_REBUILD_KEY)
+                    pipe.zadd(TRENDING_REBUILD_KEY, {str(article_id): score for article_id, score in scores.items()})
+                    pipe.rename(TRENDING_REBUILD_KEY, TRENDING_KEY)
+                    pipe.set(TRENDING_EPOCH_KEY, str(now))
+                    await pipe.execute()
+            except RedisError as e:
+                logger.warning("Failed to rebuild trending ranking in Redis", error=str(e))
+        self._local.load(now, scores)
+
+        logger.info("Trending ranking rebuilt", articles=len(result), ranked=len(scores))
+        return len(result)
+
+    @staticmethod
+    async def _load_counts(db: AsyncSession, since: datetime) -> List[Tuple[int, datetime, Dict[str, int]]]:
+        """Счётчики взаимодействий недавно опубликованных статей"""
+        result = await db.execute(
+            select(
+                Article.id,
+                Article.published_at,
+                Article.views_count,
+                Article.likes_count,
+                Article.comments_count,
+                Article.shares_count
+            )
+            .where(
+                Article.status == ArticleStatus.PUBLISHED,
+                Article.visibility == ArticleVisibility.PUBLIC,
+                Article.published_at >= since
+            )
+            .order_by(Article.published_at)
+        )
+        return [
+            (
+                row.id,
+                row.published_at if row.published_at.tzinfo else row.published_at.replace(tzinfo=timezone.utc),
+                {
+                    "view": row.views_count,
+                    "like": row.likes_count,
+                    "comment": row.comments_count,
+                    "share": row.shares_count,
+                }
+            )
+            for row in result
+        ]
+
+
+trending = TrendingRanking()
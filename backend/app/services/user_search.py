@@ -0,0 +1,233 @@
+"""
+Триграммный индекс пользователей в памяти процесса (для СУБД без pg_trgm)
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import or_
+from array import array
+from bisect import bisect_left, insort
+from datetime import datetime
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import structlog
+
+from app.core.database import AsyncSessionLocal
+from app.models.user import User
+
+logger = structlog.get_logger()
+
+# Пользователей, читаемых из БД за один fetch
+USER_BATCH_SIZE = 5000
+
+# Кандидатов на лимит результата, которые проверяются по самим строкам
+CANDIDATES_PER_RESULT = 20
+
+# Доля триграмм запроса, которую должен содержать кандидат
+MIN_TRIGRAM_SHARE = 0.5
+
+# Изменения, после которых дельта вливается в основные массивы
+DELTA_COMPACT_SIZE = 50000
+
+
+def trigrams(text: str) -> List[str]:
+    """Триграммы слов строки (без выравнивания пробелами)"""
+    result = []
+    for word in text.split():
+        result.extend(word[i:i + 3] for i in range(len(word) - 2))
+    return result
+
+
+def match_score(query: str, name: str) -> float:
+    """
+    Итоговая близость имени к запросу: совпадение с начала имени и с
+    начала слова выше подстроки, подстрока - выше частичного совпадения триграмм
+    """
+    if not name:
+        return 0.0
+    if name.startswith(query):
+        return 1.0 + len(query) / len(name)
+    if any(word.startswith(query) for word in name.split()):
+        return 0.9
+    if query in name:
+        return 0.8
+    query_trigrams = set(trigrams(query))
+    if not query_trigrams:
+        return 0.0
+    share = len(query_trigrams & set(trigrams(name))) / len(query_trigrams)
+    return 0.7 * share if share >= MIN_TRIGRAM_SHARE else 0.0
+
+
+class UserTrigramIndex:
+    """
+    Позиции пользователей в массивах user_ids/names/followers; постинги
+    триграмм хранятся CSR-массивами (offsets + postings) плюс небольшая
+    дельта для изменений после последней сборки. Устаревшие постинги после
+    переименования не удаляются: кандидаты всё равно проверяются по
+    актуальным именам в names.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.user_ids = array("q")
+        self.names: List[str] = []  # "username display_name" в нижнем регистре
+        self.usernames: List[str] = []
+        self.followers = array("q")
+        self.alive = bytearray()
+        self.positions: Dict[int, int] = {}
+        self.trigram_ids: Dict[str, int] = {}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.postings = np.zeros(0, dtype=np.uint32)
+        self.delta: Dict[str, array] = {}
+        self.delta_size = 0
+        self.sorted_usernames: List[Tuple[str, int]] = []
+        self.max_user_id = 0
+        self.changed_since: Optional[datetime] = None
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def apply(self, rows) -> None:
+        """Добавление, переименование и деактивация пользователей"""
+        with self._lock:
+            for row in rows:
+                position = self.positions.get(row.id)
+                if position is None:
+                    if not row.is_active:
+                        continue
+                    position = self.positions[row.id] = len(self.user_ids)
+                    self.user_ids.append(row.id)
+                    self.names.append("")
+                    self.usernames.append("")
+                    self.followers.append(0)
+                    self.alive.append(1)
+
+                self.alive[position] = 1 if row.is_active else 0
+                self.followers[position] = row.followers_count or 0
+                name = " ".join(filter(None, (row.username, row.display_name))).lower()
+                if self.names[position] != name:
+                    username = row.username.lower()
+                    if self.ready:
+                        self._reindex(position, name, username)
+                    self.names[position] = name
+                    self.usernames[position] = username
+
+                self.max_user_id = max(self.max_user_id, row.id)
+                changed = row.updated_at
+                if changed is not None and (self.changed_since is None or changed > self.changed_since):
+                    self.changed_since = changed
+
+            if self.delta_size > DELTA_COMPACT_SIZE:
+                self._compact()
+
+    def _reindex(self, position: int, name: str, username: str) -> None:
+        """Постинги нового имени - в дельту, username - в отсортированный список"""
+        for trigram in set(trigrams(name)):
+            self.delta.setdefault(trigram, array("I")).append(position)
+            self.delta_size += 1
+
+        old = (self.usernames[position], position)
+        i = bisect_left(self.sorted_usernames, old)
+        if i < len(self.sorted_usernames) and self.sorted_usernames[i] == old:
+            del self.sorted_usernames[i]
+        insort(self.sorted_usernames, (username, position))
+
+    def _compact(self) -> None:
+        """Перестройка CSR-массивов постингов по текущим именам"""
+        lists: Dict[str, array] = {}
+        for position, name in enumerate(self.names):
+            if not self.alive[position]:
+                continue
+            for trigram in set(trigrams(name)):
+                lists.setdefault(trigram, array("I")).append(position)
+
+        self.trigram_ids = {trigram: i for i, trigram in enumerate(lists)}
+        sizes = np.fromiter((len(postings) for postings in lists.values()), dtype=np.int64, count=len(lists))
+        self.offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=self.offsets[1:])
+        self.postings = np.frombuffer(b"".join(postings.tobytes() for postings in lists.values()), dtype=np.uint32)
+        self.delta = {}
+        self.delta_size = 0
+
+    def search(self, query: str, limit: int) -> List[int]:
+        """id пользователей по убыванию близости имени к запросу"""
+        query = " ".join(query.lower().split())
+        query_trigrams = list(dict.fromkeys(trigrams(query)))
+
+        # Совпадения с начала username - по отсортированному списку
+        cap = limit * CANDIDATES_PER_RESULT
+        start = bisect_left(self.sorted_usernames, (query,))
+        candidates = set()
+        for username, position in self.sorted_usernames[start:start + cap]:
+            if not username.startswith(query):
+                break
+            candidates.add(position)
+
+        if query_trigrams:
+            # Остальные - по числу общих триграмм
+            parts = []
+            for trigram in query_trigrams:
+                trigram_id = self.trigram_ids.get(trigram)
+                if trigram_id is not None:
+                    parts.append(self.postings[self.offsets[trigram_id]:self.offsets[trigram_id + 1]])
+                if trigram in self.delta:
+                    parts.append(np.array(self.delta[trigram], dtype=np.uint32))
+            if parts:
+                counts = np.bincount(np.concatenate(parts), minlength=len(self.user_ids))
+                need = max(1, int(len(query_trigrams) * MIN_TRIGRAM_SHARE))
+                positions = np.flatnonzero(counts >= need)
+                if len(positions) > cap:
+                    positions = positions[np.argpartition(-counts[positions], cap - 1)[:cap]]
+                candidates.update(positions.tolist())
+
+        candidates = [position for position in candidates if self.alive[position]]
+        ranked = sorted(
+            ((match_score(query, self.names[position]), self.followers[position], position) for position in candidates),
+            reverse=True
+        )
+        return [self.user_ids[position] for score, _, position in ranked[:limit] if score > 0]
+
+    async def refresh(self, db: AsyncSession) -> int:
+        """
+        Догрузка пользователей, созданных или изменённых после прошлой
+        синхронизации (по id и updated_at, оба индексированы)
+        """
+        query = (
+            select(User.id, User.username, User.display_name, User.is_active, User.followers_count, User.updated_at)
+            .order_by(User.id)
+            .execution_options(yield_per=USER_BATCH_SIZE)
+        )
+        if self.ready:
+            conditions = [User.id > self.max_user_id]
+            if self.changed_since is not None:
+                conditions.append(User.updated_at >= self.changed_since)
+            else:
+                conditions.append(User.updated_at.isnot(None))
+            query = query.where(or_(*conditions))
+
+        loaded = 0
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            self.apply(rows)
+            loaded += len(rows)
+
+        if not self.ready:
+            with self._lock:
+                self._compact()
+                self.sorted_usernames = sorted(
+                    (username, position) for position, username in enumerate(self.usernames)
+                )
+                self.ready = True
+            logger.info("User search index built", users=len(self))
+        return loaded
+
+
+user_index = UserTrigramIndex()
+
+
+async def refresh_user_index() -> int:
+    """Синхронизация индекса пользователей в отдельной сессии БД"""
+    async with AsyncSessionLocal() as db:
+        return await user_index.refresh(db)
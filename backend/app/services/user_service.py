@@ -5,17 +5,43 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from sqlalchemy import update
-from datetime import datetime
-from typing import Optional, List
+from sqlalchemy import case, delete, func, literal, or_, tuple_, update
+from pydantic import BaseModel
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, List, Tuple, Union
 
+from app.models.article import Article, ArticleStatus
+from app.models.follow import Follow
 from app.models.user import User, UserRole
 from app.schemas.auth import UserCreate
+from app.schemas.user import UserUpdate
+from app.core.database import insert_ignore
+from app.core.pagination import decode_cursor, encode_cursor
 from app.core.security import security_utils
+from app.services.profile_cache import profile_cache
+from app.services.search_cache import normalize_query, search_cache
+from app.services.timeline import TimelineService
+from app.services.user_search import user_index
 import structlog
 
 logger = structlog.get_logger()
 
+# Колонки профиля в read model (кроме агрегатов по статьям)
+PROFILE_COLUMNS = (
+    "id", "username", "display_name", "bio", "avatar_url", "website", "location",
+    "is_public_profile", "articles_count", "followers_count", "following_count",
+    "version", "created_at", "updated_at"
+)
+
+# Счётчики профиля (колонки и агрегаты по статьям) - входят в ETag профиля
+PROFILE_COUNTERS = ("articles_count", "followers_count", "following_count", "total_views", "total_likes")
+
+# Не меняются через update_user
+_READONLY_FIELDS = {"id", "hashed_password", "version", "created_at", "updated_at"}
+
+# Имена полей во внешних данных (схемы Telegram) -> колонки
+_FIELD_ALIASES = {"telegram_id": "telegram_chat_id"}
+
 class UserService:
     """Сервис для работы с пользователями"""
     
@@ -43,6 +69,67 @@ class UserService:
         )
         return result.scalar_one_or_none()
     
+    async def get_by_telegram_id(self, telegram_id: str) -> Optional[User]:
+        """Получение пользователя по id чата Telegram"""
+        result = await self.db.execute(
+            select(User).where(User.telegram_chat_id == str(telegram_id))
+        )
+        return result.scalar_one_or_none()
+    
+    async def get_user_profile(self, user_id: Union[int, str]) -> Optional[dict]:
+        """Профиль с агрегатами по id (read model, см. ProfileCache)"""
+        user_id = int(user_id)
+        profile = await profile_cache.get(user_id)
+        if profile is None:
+            profile = await self._load_profile(User.id == user_id)
+            if profile is not None:
+                await profile_cache.set(profile)
+        return profile
+    
+    async def get_profile_by_username(self, username: str) -> Optional[dict]:
+        """
+        Профиль с агрегатами по username; в нём же поля для ETag/Last-Modified
+        и проверки приватности
+        """
+        username = username.lower()
+        profile = await profile_cache.get_by_username(username)
+        if profile is None:
+            profile = await self._load_profile(User.username == username)
+            if profile is not None:
+                await profile_cache.set(profile)
+        return profile
+    
+    async def _load_profile(self, condition) -> Optional[dict]:
+        """
+        Профиль одним запросом: колонки пользователя и суммы просмотров и
+        лайков опубликованных статей (коррелированные подзапросы по
+        idx_article_author_status)
+        """
+        def total(column):
+            return (
+                select(func.coalesce(func.sum(column), 0))
+                .where(Article.author_id == User.id, Article.status == ArticleStatus.PUBLISHED)
+                .scalar_subquery()
+            )
+        
+        result = await self.db.execute(
+            select(
+                *(getattr(User, column) for column in PROFILE_COLUMNS),
+                total(Article.views_count).label("total_views"),
+                total(Article.likes_count).label("total_likes")
+            )
+            .where(condition)
+        )
+        row = result.one_or_none()
+        if row is None:
+            return None
+        
+        profile = dict(row._mapping)
+        profile["display_name"] = profile["display_name"] or profile["username"]
+        for counter in ("articles_count", "followers_count", "following_count"):
+            profile[counter] = profile[counter] or 0
+        return profile
+    
     async def create_user(self, user_data: UserCreate) -> User:
         """Создание нового пользователя"""
         hashed_password = security_utils.get_password_hash(user_data.password)
@@ -64,6 +151,40 @@ class UserService:
         logger.info("User created", user_id=user.id, username=user.username)
         return user
     
+    async def update_user(self, user_id: Union[int, str], data: Union[UserUpdate, Dict[str, Any]]) -> Optional[User]:
+        """
+        Обновление полей пользователя (из схемы - только переданные поля).
+        Ключ, которому нет колонки, - ValueError до каких-либо изменений;
+        кэш профиля сбрасывается
+        """
+        values = data.model_dump(exclude_unset=True) if isinstance(data, BaseModel) else dict(data)
+        values = {_FIELD_ALIASES.get(key, key): value for key, value in values.items()}
+        
+        columns = set(User.__table__.columns.keys()) - _READONLY_FIELDS
+        unknown = sorted(key for key in values if key not in columns)
+        if unknown:
+            raise ValueError(f"Unknown user fields: {', '.join(unknown)}")
+        
+        user = await self.get_by_id(int(user_id))
+        if not user:
+            return None
+        
+        for key, value in values.items():
+            if key == "username" and value:
+                value = value.lower()
+            setattr(user, key, value)
+        # Версия профиля (ETag профиля и статей автора) - атомарным инкрементом
+        # в СУБД: параллельные правки не конфликтуют и не теряют увеличение
+        user.version = User.version + 1
+        
+        await self.db.commit()
+        # updated_at выставляется СУБД (onupdate) - перечитываем
+        await self.db.refresh(user)
+        await profile_cache.invalidate([user.id])
+        
+        logger.info("User updated", user_id=user.id, fields=sorted(values))
+        return user
+    
     async def update_password(self, user_id: int, new_password: str) -> bool:
         """Обновление пароля пользователя"""
         hashed_password = security_utils.get_password_hash(new_password)
@@ -112,6 +233,7 @@ class UserService:
         )
         
         await self.db.commit()
+        await profile_cache.invalidate([user_id])
         
         logger.info("User deactivated", user_id=user_id)
         return result.rowcount > 0
@@ -124,17 +246,169 @@ class UserService:
         return result.scalars().all()
     
     async def search_users(self, query: str, limit: int = 10) -> List[User]:
-        """Поиск пользователей"""
+        """
+        Поиск активных пользователей по username и отображаемому имени с
+        ранжированием по близости: pg_trgm в PostgreSQL, иначе триграммный
+        индекс в памяти процесса (app.services.user_search)
+        """
+        query = normalize_query(query)
+        if not query:
+            return []
+
+        # Кэшируется ранжированный список id; сами профили читаются по PK
+        key = await search_cache.key("users", query, limit)
+        user_ids = search_cache.get(key)
+        if user_ids is None:
+            if self.db.get_bind().dialect.name == "postgresql":
+                user_ids = await self._search_user_ids_trgm(query, limit)
+            else:
+                if not user_index.ready:
+                    await user_index.refresh(self.db)
+                user_ids = user_index.search(query, limit)
+            search_cache.set(key, user_ids)
+
+        if not user_ids:
+            return []
         result = await self.db.execute(
-            select(User)
-            .where(
-                (User.username.ilike(f"%{query}%")) |
-                (User.display_name.ilike(f"%{query}%"))
-            )
-            .limit(limit)
+            select(User).where(User.id.in_(user_ids), User.is_active.is_(True))
         )
-        return result.scalars().all()
+        users = {user.id: user for user in result.scalars().all()}
+        return [users[user_id] for user_id in user_ids if user_id in users]
+
+    async def _search_user_ids_trgm(self, query: str, limit: int) -> List[int]:
+        """id пользователей по триграммным индексам pg_trgm"""
+        username = func.lower(User.username)
+        display_name = func.lower(User.display_name)
+
+        if len(query) < 3:
+            # Короче триграммы - префикс username по btree text_pattern_ops
+            statement = (
+                select(User.id)
+                .where(username.startswith(query, autoescape=True), User.is_active.is_(True))
+                .order_by(User.followers_count.desc(), User.id)
+            )
+        else:
+            similarity = func.greatest(
+                func.word_similarity(query, username),
+                func.coalesce(func.word_similarity(query, display_name), 0)
+            )
+            statement = (
+                select(User.id)
+                .where(
+                    or_(literal(query).op("<%")(username), literal(query).op("<%")(display_name)),
+                    User.is_active.is_(True)
+                )
+                .order_by(similarity.desc(), User.followers_count.desc(), User.id)
+            )
+
+        result = await self.db.execute(statement.limit(limit))
+        return list(result.scalars().all())
     
+    async def follow_user(self, follower_id: int, following_id: int) -> bool:
+        """
+        Подписка и счётчики обоих пользователей в одной транзакции. Повторная
+        подписка ничего не меняет (INSERT без конфликта по первичному ключу)
+        """
+        if follower_id == following_id:
+            return False
+
+        result = await self.db.execute(
+            insert_ignore(self.db, Follow).values(follower_id=follower_id, following_id=following_id, created_at=datetime.now(timezone.utc))
+        )
+        if result.rowcount:
+            await self._shift_follow_counts(follower_id, following_id, 1)
+        await self.db.commit()
+
+        if result.rowcount:
+            await profile_cache.invalidate([follower_id, following_id])
+            await TimelineService(self.db).add_author(follower_id, following_id)
+            logger.info("User followed", follower_id=follower_id, following_id=following_id)
+        return True
+
+    async def unfollow_user(self, follower_id: int, following_id: int) -> bool:
+        """Отписка; False, если подписки не было"""
+        result = await self.db.execute(
+            delete(Follow).where(Follow.follower_id == follower_id, Follow.following_id == following_id)
+        )
+        if result.rowcount:
+            await self._shift_follow_counts(follower_id, following_id, -1)
+        await self.db.commit()
+
+        if result.rowcount:
+            await profile_cache.invalidate([follower_id, following_id])
+            await TimelineService(self.db).remove_author(follower_id, following_id)
+        return result.rowcount > 0
+
+    async def _shift_follow_counts(self, follower_id: int, following_id: int, delta: int) -> None:
+        """
+        following_count подписчика и followers_count автора одним UPDATE;
+        version и updated_at не меняются - счётчики не входят в ETag профиля
+        """
+        await self.db.execute(
+            update(User)
+            .where(User.id.in_([follower_id, following_id]))
+            .values(
+                following_count=func.coalesce(User.following_count, 0)
+                + case((User.id == follower_id, delta), else_=0),
+                followers_count=func.coalesce(User.followers_count, 0)
+                + case((User.id == following_id, delta), else_=0),
+                updated_at=User.updated_at
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def is_following(self, follower_id: int, following_id: int) -> bool:
+        """Подписан ли follower_id на following_id (поиск по первичному ключу)"""
+        result = await self.db.execute(
+            select(Follow.follower_id).where(Follow.follower_id == follower_id, Follow.following_id == following_id)
+        )
+        return result.first() is not None
+
+    async def get_followers(
+        self,
+        user_id: int,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[User], Optional[str]]:
+        """Подписчики пользователя, новые первыми; курсор - (created_at, id) последнего"""
+        return await self._follow_page(Follow.following_id, Follow.follower_id, user_id, limit, cursor)
+
+    async def get_following(
+        self,
+        user_id: int,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[User], Optional[str]]:
+        """Подписки пользователя, новые первыми; курсор - (created_at, id) последнего"""
+        return await self._follow_page(Follow.follower_id, Follow.following_id, user_id, limit, cursor)
+
+    async def _follow_page(self, own_column, other_column, user_id: int, limit: int, cursor: Optional[str]):
+        """
+        Keyset-страница по индексу (own_column, created_at, other_column):
+        id страницы берутся из индекса, пользователи - по первичному ключу
+        """
+        query = (
+            select(other_column.label("user_id"), Follow.created_at)
+            .where(own_column == user_id)
+            .order_by(Follow.created_at.desc(), other_column.desc())
+            .limit(limit + 1)
+        )
+        if cursor:
+            created_at, last_id = decode_cursor(cursor, datetime, int)
+            query = query.where(tuple_(Follow.created_at, other_column) < (created_at, last_id))
+
+        rows = (await self.db.execute(query)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].created_at, rows[-1].user_id)
+
+        if not rows:
+            return [], None
+        result = await self.db.execute(select(User).where(User.id.in_([row.user_id for row in rows])))
+        users = {user.id: user for user in result.scalars().all()}
+        return [users[row.user_id] for row in rows if row.user_id in users], next_cursor
+
     async def get_user_stats(self, user_id: int) -> dict:
         """Получение статистики пользователя"""
         user = await self.get_by_id(user_id)
@@ -0,0 +1,203 @@
+"""
+Буферизованный счётчик просмотров статей (write-behind)
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import update, case, func
+from redis.exceptions import RedisError, ResponseError
+from collections import Counter
+from threading import Lock
+from typing import Dict, Iterable, Optional, Tuple
+import secrets
+import structlog
+
+from app.core.database import AsyncSessionLocal
+from app.core.redis import get_redis
+from app.models.article import Article
+from app.models.stats import StatsWatermark
+from app.services.stats_service import record_events
+
+logger = structlog.get_logger()
+
+PENDING_KEY = "articles:views:pending"
+FLUSHING_KEY = "articles:views:flushing"
+FLUSH_LOCK_KEY = "articles:views:flush-lock"
+FLUSH_LOCK_TTL = 60
+
+# Поле FLUSHING_KEY с номером пачки и строка stats_watermarks, где
+# хранится номер последней применённой пачки
+BATCH_FIELD = "batch"
+VIEWS_FLUSH_MARKER = "views_flush"
+
+
+class ViewCounter:
+    """
+    Накопитель просмотров: инкременты копятся в Redis (HINCRBY) или, если
+    Redis недоступен, в памяти процесса, и сбрасываются в БД одним UPDATE.
+    """
+
+    def __init__(self):
+        self._local: Counter = Counter()
+        self._lock = Lock()
+
+    async def incr(self, article_id: int, amount: int = 1) -> None:
+        """Учёт просмотра без обращения к таблице articles"""
+        redis = await get_redis()
+        if redis is not None:
+            try:
+                await redis.hincrby(PENDING_KEY, str(article_id), amount)
+                return
+            except RedisError as e:
+                logger.warning("Failed to buffer view in Redis", error=str(e))
+
+        with self._lock:
+            self._local[article_id] += amount
+
+    async def pending(self, article_ids: Iterable[int]) -> Dict[int, int]:
+        """Ещё не сброшенные в БД просмотры для указанных статей"""
+        ids = list(article_ids)
+        with self._lock:
+            result = {article_id: self._local.get(article_id, 0) for article_id in ids}
+
+        redis = await get_redis()
+        if redis is not None and ids:
+            try:
+                keys = [str(article_id) for article_id in ids]
+                pending = await redis.hmget(PENDING_KEY, keys)
+                flushing = await redis.hmget(FLUSHING_KEY, keys)
+                for article_id, value, in_flight in zip(ids, pending, flushing):
+                    result[article_id] += int(value or 0) + int(in_flight or 0)
+            except RedisError as e:
+                logger.warning("Failed to read pending views", error=str(e))
+
+        return result
+
+    async def flush(self, db: AsyncSession) -> int:
+        """
+        Сброс накопленных просмотров в БД одним пакетным UPDATE и событиями view.
+        Redis-пачка помечается случайным номером, который фиксируется в
+        stats_watermarks той же транзакцией: если процесс упал после коммита,
+        но до удаления FLUSHING_KEY, повторный сброс её пропустит.
+        """
+        with self._lock:
+            local = dict(self._local)
+            self._local.clear()
+
+        redis = await get_redis()
+        remote, batch = {}, None
+        if redis is not None:
+            try:
+                taken = await self._take_remote(redis)
+            except RedisError as e:
+                # Локальные просмотры сбрасываются и без Redis (блокировка истечёт сама)
+                logger.warning("Failed to read views buffer from Redis", error=str(e))
+                taken = None
+            if taken is None:
+                redis = None
+            else:
+                remote, batch = taken
+
+        if not local and not remote:
+            if redis is not None:
+                await self._release(redis, FLUSHING_KEY)
+            return 0
+
+        try:
+            deltas = Counter(local)
+            if remote and await self._mark_batch(db, int(batch)):
+                deltas.update(remote)
+            if deltas:
+                await db.execute(
+                    update(Article)
+                    .where(Article.id.in_(list(deltas)))
+                    .values(
+                        views_count=func.coalesce(Article.views_count, 0)
+                        + case(dict(deltas), value=Article.id, else_=0),
+                        # Просмотр не является правкой статьи
+                        updated_at=Article.updated_at
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                # Сырые события для агрегатов статистики - одна строка на статью
+                await record_events(db, [
+                    {"article_id": article_id, "event_type": "view", "count": delta}
+                    for article_id, delta in deltas.items() if delta > 0
+                ])
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            # Локальные инкременты возвращаются в буфер, Redis-часть
+            # остаётся в FLUSHING_KEY до следующей попытки
+            with self._lock:
+                self._local.update(local)
+            if redis is not None:
+                await self._release(redis)
+            raise
+
+        if redis is not None:
+            # Если удалить пачку не удастся, повторный сброс её пропустит (_mark_batch)
+            await self._release(redis, FLUSHING_KEY)
+
+        logger.info("Article views flushed", articles=len(deltas), views=sum(deltas.values()))
+        return len(deltas)
+
+    @staticmethod
+    async def _take_remote(redis) -> Optional[Tuple[Dict[int, int], Optional[str]]]:
+        """
+        Захват Redis-буфера: (просмотры пачки, номер пачки). None, если
+        буфер сейчас сбрасывает другой процесс
+        """
+        if not await redis.set(FLUSH_LOCK_KEY, 1, nx=True, ex=FLUSH_LOCK_TTL):
+            return None
+        try:
+            # Остаток неудачного прошлого сброса обрабатывается первым
+            if not await redis.exists(FLUSHING_KEY):
+                await redis.rename(PENDING_KEY, FLUSHING_KEY)
+        except ResponseError:
+            pass  # Новых просмотров нет
+        flushing = await redis.hgetall(FLUSHING_KEY)
+        batch = flushing.pop(BATCH_FIELD, None)
+        remote = {int(article_id): int(value) for article_id, value in flushing.items()}
+        if remote and batch is None:
+            batch = secrets.randbits(62)
+            await redis.hset(FLUSHING_KEY, BATCH_FIELD, batch)
+        return remote, batch
+
+    @staticmethod
+    async def _release(redis, *keys: str) -> None:
+        """Снятие блокировки сброса (и удаление ключей); ошибки Redis не мешают сбросу"""
+        try:
+            await redis.delete(*keys, FLUSH_LOCK_KEY)
+        except RedisError as e:
+            logger.warning("Failed to release views flush lock", error=str(e))
+
+    @staticmethod
+    async def _mark_batch(db: AsyncSession, batch: int) -> bool:
+        """
+        Отметка Redis-пачки как применённой (строка отметки блокируется до
+        коммита). False - пачка уже применена прошлым сбросом.
+        """
+        result = await db.execute(
+            select(StatsWatermark)
+            .where(StatsWatermark.name == VIEWS_FLUSH_MARKER)
+            .with_for_update()
+        )
+        marker = result.scalar_one_or_none()
+        if marker is None:
+            db.add(StatsWatermark(name=VIEWS_FLUSH_MARKER, last_event_id=batch))
+            return True
+        if marker.last_event_id == batch:
+            logger.warning("Views batch already applied, skipping", batch=batch)
+            return False
+        marker.last_event_id = batch
+        return True
+
+
+view_counter = ViewCounter()
+
+
+async def flush_article_views() -> int:
+    """Сброс буфера просмотров в отдельной сессии БД"""
+    async with AsyncSessionLocal() as db:
+        return await view_counter.flush(db)
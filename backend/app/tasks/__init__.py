@@ -19,6 +19,10 @@ from app.tasks.payment_tasks import (
     process_yoomoney_payment_task,
     process_kaspi_payment_task
 )
+from app.tasks.search_tasks import (
+    update_search_index_task,
+    rebuild_search_index_task
+)
 from app.tasks.cleanup_tasks import (
     cleanup_expired_tokens_task,
     cleanup_old_notifications_task,
@@ -47,6 +51,10 @@ __all__ = [
     "process_yoomoney_payment_task",
     "process_kaspi_payment_task",
     
+    # Search tasks
+    "update_search_index_task",
+    "rebuild_search_index_task",
+    
     # Cleanup tasks
     "cleanup_expired_tokens_task",
     "cleanup_old_notifications_task",
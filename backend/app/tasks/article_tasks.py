@@ -1,13 +1,38 @@
-from celery import shared_task
+from celery import shared_task, group
+from kombu.exceptions import OperationalError
+from sqlalchemy.future import select
+from datetime import datetime, timezone
+from typing import List
 import structlog
 
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.article import Article
+from app.services.article_service import ArticleService
+from app.services.related_service import RelatedService
+from app.services.render_service import RenderService, content_hash
+from app.services.stats_service import StatsService
+from app.services.timeline import TimelineService
+from app.services.view_counter import flush_article_views
+from app.tasks.notification_tasks import notify_articles_published_task
+from app.tasks.search_tasks import update_search_index_task
+from app.tasks.utils import run_async
+
 logger = structlog.get_logger()
 
 @shared_task
 def update_article_statistics_task():
     """Обновление статистики статей"""
     logger.info("Updating article statistics")
-    return {"status": "success"}
+    
+    async def _update():
+        flushed = await flush_article_views()
+        async with AsyncSessionLocal() as db:
+            buckets = await StatsService(db).rollup()
+        return flushed, buckets
+    
+    flushed, buckets = run_async(_update())
+    return {"status": "success", "views_flushed": flushed, "stats_buckets": buckets}
 
 @shared_task
 def generate_article_preview_task(article_id: str):
@@ -16,7 +41,112 @@ def generate_article_preview_task(article_id: str):
     return {"status": "success", "article_id": article_id}
 
 @shared_task
-def process_markdown_task(content: str):
-    """Обработка Markdown контента"""
-    logger.info("Processing markdown content")
-    return {"status": "success", "processed_content": content} 
\ No newline at end of file
+def process_markdown_task(article_id: int):
+    """Пререндеринг Markdown статьи в очищенный HTML"""
+    logger.info(f"Processing markdown for article {article_id}")
+    
+    async def _process():
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(Article).where(Article.id == article_id))
+            article = result.scalar_one_or_none()
+            if not article:
+                return {"status": "not_found", "article_id": article_id}
+            
+            changed = article.content_hash != content_hash(article.content)
+            if changed:
+                await RenderService(db).ensure_rendered(article)
+            
+            return {
+                "status": "success",
+                "article_id": article_id,
+                "content_hash": article.content_hash,
+                "rendered": changed
+            }
+    
+    return run_async(_process()) 
+
+@shared_task
+def render_articles_task(article_ids: List[int]):
+    """Пакетный пререндеринг опубликованных статей"""
+    
+    async def _render():
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(Article).where(Article.id.in_(article_ids)))
+            rendered = 0
+            for article in result.scalars().all():
+                if article.content_hash != content_hash(article.content):
+                    await RenderService(db).ensure_rendered(article)
+                    rendered += 1
+            return rendered
+    
+    return {"status": "success", "rendered": run_async(_render())}
+
+@shared_task
+def update_related_articles_task(article_ids: List[int]):
+    """Инкрементальное обновление похожих статей для изменённых статей"""
+    
+    async def _refresh():
+        async with AsyncSessionLocal() as db:
+            return await RelatedService(db).refresh(article_ids)
+    
+    return {"status": "success", "updated": run_async(_refresh())}
+
+@shared_task
+def rebuild_related_articles_task():
+    """Полная перестройка индекса похожих статей (новый словарь и idf)"""
+    
+    async def _rebuild():
+        async with AsyncSessionLocal() as db:
+            return await RelatedService(db).rebuild()
+    
+    return {"status": "success", "articles": run_async(_rebuild())}
+
+@shared_task
+def fan_out_timelines_task(article_ids: List[int]):
+    """Рассылка опубликованных статей в ленты подписчиков"""
+    
+    async def _fan_out():
+        async with AsyncSessionLocal() as db:
+            return await TimelineService(db).fan_out(article_ids)
+    
+    return {"status": "success", "timelines": run_async(_fan_out())}
+
+# Пост-обработка публикации: каждая задача получает пачку id статей
+AFTER_PUBLISH_TASKS = [
+    render_articles_task,
+    notify_articles_published_task,
+    update_related_articles_task,
+    update_search_index_task,
+    fan_out_timelines_task,
+]
+
+def dispatch_after_publish(article_ids: List[int]) -> bool:
+    """
+    Запуск пост-обработки опубликованных статей одной группой задач;
+    False, если брокер недоступен (публикация при этом уже закоммичена)
+    """
+    chunk = settings.SCHEDULED_PUBLISH_FANOUT_CHUNK
+    chunks = [article_ids[i:i + chunk] for i in range(0, len(article_ids), chunk)]
+    try:
+        group(
+            task.si(ids).set(ignore_result=True) for task in AFTER_PUBLISH_TASKS for ids in chunks
+        ).apply_async()
+        return True
+    except OperationalError as e:
+        logger.warning("Failed to dispatch after-publish tasks", articles=len(article_ids), error=str(e))
+        return False
+
+@shared_task
+def publish_scheduled_articles_task():
+    """Публикация статей, время которых наступило (один UPDATE за проход)"""
+    
+    async def _publish():
+        async with AsyncSessionLocal() as db:
+            return await ArticleService(db).publish_due(
+                datetime.now(timezone.utc), settings.SCHEDULED_PUBLISH_BATCH_SIZE
+            )
+    
+    article_ids = run_async(_publish())
+    if article_ids:
+        dispatch_after_publish(article_ids)
+    return {"status": "success", "published": len(article_ids)}
@@ -1,6 +1,11 @@
 from celery import shared_task
 import structlog
 
+from app.core.database import AsyncSessionLocal
+from app.services.render_service import RenderService
+from app.services.stats_service import StatsService
+from app.tasks.utils import run_async
+
 logger = structlog.get_logger()
 
 @shared_task
@@ -19,4 +24,28 @@ def cleanup_old_notifications_task():
 def cleanup_temp_files_task():
     """Очистка временных файлов"""
     logger.info("Cleaning up temporary files")
-    return {"status": "success"} 
\ No newline at end of file
+    return {"status": "success"}
+
+@shared_task
+def cleanup_article_events_task():
+    """Удаление учтённых в агрегатах сырых событий статей"""
+    logger.info("Cleaning up article events")
+    
+    async def _cleanup():
+        async with AsyncSessionLocal() as db:
+            return await StatsService(db).cleanup_events()
+    
+    deleted = run_async(_cleanup())
+    return {"status": "success", "deleted": deleted}
+
+@shared_task
+def cleanup_orphan_renders_task():
+    """Удаление рендеров HTML, не нужных ни одной статье"""
+    logger.info("Cleaning up orphan article renders")
+    
+    async def _cleanup():
+        async with AsyncSessionLocal() as db:
+            return await RenderService(db).cleanup_orphans()
+    
+    deleted = run_async(_cleanup())
+    return {"status": "success", "deleted": deleted}
@@ -1,6 +1,14 @@
 from celery import shared_task
+from sqlalchemy import insert
+from sqlalchemy.future import select
+from typing import List
 import structlog
 
+from app.core.database import AsyncSessionLocal
+from app.models.article import Article
+from app.models.interaction import Notification, NotificationType
+from app.tasks.utils import run_async
+
 logger = structlog.get_logger()
 
 @shared_task
@@ -19,4 +27,31 @@ def send_daily_digest_task():
 def create_notification_task(user_id: str, notification_type: str, data: dict):
     """Создание уведомления"""
     logger.info(f"Creating notification for user {user_id}")
-    return {"status": "success", "user_id": user_id} 
\ No newline at end of file
+    return {"status": "success", "user_id": user_id} 
+
+@shared_task
+def notify_articles_published_task(article_ids: List[int]):
+    """Уведомления авторам об опубликованных статьях (один INSERT на пачку)"""
+    
+    async def _notify():
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Article.id, Article.author_id, Article.title).where(Article.id.in_(article_ids))
+            )
+            rows = [
+                {
+                    "user_id": author_id,
+                    "type": NotificationType.ARTICLE_PUBLISHED,
+                    "target_type": "article",
+                    "target_id": article_id,
+                    "title": "Статья опубликована",
+                    "message": f"Статья «{title}» опубликована"
+                }
+                for article_id, author_id, title in result
+            ]
+            if rows:
+                await db.execute(insert(Notification.__table__), rows)
+                await db.commit()
+            return len(rows)
+    
+    return {"status": "success", "notified": run_async(_notify())}
@@ -0,0 +1,39 @@
+from celery import shared_task
+from typing import List
+import structlog
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.services.search_cache import search_cache
+from app.services.search_index import SearchIndexService
+from app.tasks.utils import run_async
+
+logger = structlog.get_logger()
+
+@shared_task
+def update_search_index_task(article_ids: List[int]):
+    """Переиндексация статей во встроенном поисковом индексе"""
+    if settings.SEARCH_BACKEND != "bm25":
+        return {"status": "skipped"}
+    
+    async def _refresh():
+        async with AsyncSessionLocal() as db:
+            indexed = await SearchIndexService(db).refresh(article_ids)
+        # Результаты, закэшированные до переиндексации, устарели
+        await search_cache.bump()
+        return indexed
+    
+    return {"status": "success", "indexed": run_async(_refresh())}
+
+@shared_task
+def rebuild_search_index_task():
+    """Полная перестройка встроенного поискового индекса"""
+    logger.info("Rebuilding search index")
+    
+    async def _rebuild():
+        async with AsyncSessionLocal() as db:
+            articles = await SearchIndexService(db).rebuild()
+        await search_cache.bump()
+        return articles
+    
+    return {"status": "success", "articles": run_async(_rebuild())}
@@ -0,0 +1,46 @@
+"""
+Запуск задач Celery: постановка в очередь и асинхронный код внутри задач
+"""
+
+from celery import Task
+from kombu.exceptions import OperationalError
+from typing import Any, Coroutine
+import asyncio
+import structlog
+
+from app.core.database import engine
+from app.core.redis import close_redis
+
+logger = structlog.get_logger()
+
+
+def enqueue(task: Task, *args: Any) -> bool:
+    """
+    Постановка задачи в очередь без ожидания результата (без подписки на
+    backend результатов, которая при его недоступности ждёт переподключения).
+    Недоступный брокер не делает запрос ошибочным - изменения к этому
+    моменту уже закоммичены, - задача только пропускается с предупреждением.
+    """
+    try:
+        task.apply_async(args, ignore_result=True)
+        return True
+    except OperationalError as e:
+        logger.warning("Failed to enqueue task", task=task.name, error=str(e))
+        return False
+
+
+def run_async(coro: Coroutine) -> Any:
+    """
+    Выполнение корутины задачи в новом event loop. Соединения пула БД и
+    клиент Redis привязаны к циклу, в котором созданы, поэтому закрываются
+    до его завершения - иначе следующая задача воркера получит соединения
+    уже закрытого цикла.
+    """
+    async def _run():
+        try:
+            return await coro
+        finally:
+            await close_redis()
+            await engine.dispose()
+
+    return asyncio.run(_run())
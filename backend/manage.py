@@ -13,6 +13,7 @@ sys.path.append(str(Path(__file__).parent))
 from app.core.config import settings
 from app.core.database import engine, Base
 from app.models import *  # Импортируем все модели
+from app.models.search import ensure_search_schema
 
 
 @click.group()
@@ -30,6 +31,7 @@ def init_db():
         try:
             async with engine.begin() as conn:
                 await conn.run_sync(Base.metadata.create_all)
+                await ensure_search_schema(conn)
             click.echo("База данных инициализирована успешно!")
         except Exception as e:
             click.echo(f"Ошибка инициализации базы данных: {e}")
@@ -37,6 +39,19 @@ def init_db():
     asyncio.run(_init_db())
 
 
+@cli.command()
+def init_search():
+    """Создание поисковых индексов в существующей базе данных"""
+    import asyncio
+    
+    async def _init_search():
+        async with engine.begin() as conn:
+            created = await ensure_search_schema(conn)
+        click.echo("Поисковые индексы созданы" if created else "Поисковые индексы уже существуют")
+    
+    asyncio.run(_init_search())
+
+
 @cli.command()
 def create_migration():
     """Создание новой миграции"""
@@ -104,6 +119,309 @@ def create_admin(email, username, password):
     asyncio.run(_create_admin())
 
 
+@cli.command()
+@click.option('--older-than-days', default=30, show_default=True, help='Перепаковывать версии старше N дней')
+@click.option('--keep-every', default=1, show_default=True, help='Оставлять каждую N-ю старую версию')
+def compact_revisions(older_than_days, keep_every):
+    """Перепаковка старых цепочек версий статей"""
+    import asyncio
+    from datetime import datetime, timedelta, timezone
+    from sqlalchemy import select
+    from app.core.database import AsyncSessionLocal
+    from app.models.revision import ArticleRevision
+    from app.services.revision_service import RevisionService
+    
+    older_than = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    
+    async def _compact_revisions():
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(ArticleRevision.article_id)
+                .where(ArticleRevision.created_at < older_than)
+                .distinct()
+            )
+            article_ids = list(result.scalars().all())
+            
+            revision_service = RevisionService(db)
+            total_before = total_after = 0
+            for article_id in article_ids:
+                before, after = await revision_service.compact(article_id, older_than, keep_every)
+                total_before += before
+                total_after += after
+            
+            click.echo(
+                f"Статей: {len(article_ids)}, "
+                f"байт до: {total_before}, байт после: {total_after}"
+            )
+    
+    asyncio.run(_compact_revisions())
+
+
+@cli.command()
+@click.option('--revisions', default=200, show_default=True, help='Число версий в синтетической цепочке')
+@click.option('--size', default=20000, show_default=True, help='Размер текста в символах')
+@click.option('--codec', type=click.Choice(['zlib', 'zstd']), default='zlib', show_default=True)
+def benchmark_revisions(revisions, size, codec):
+    """Бенчмарк истории версий: байт на версию и время сборки"""
+    import random
+    import time
+    from app.core.textdiff import make_delta
+    from app.models.revision import ArticleRevision
+    from app.services.revision_service import encode_delta, encode_keyframe, restore
+    
+    rng = random.Random(42)
+    words = [''.join(rng.choice('абвгдеёжзиклмнопрстуфхцчшщэюя') for _ in range(rng.randint(2, 9)))
+             for _ in range(2000)]
+    
+    def paragraph():
+        return ' '.join(rng.choice(words) for _ in range(rng.randint(20, 80))) + '\n\n'
+    
+    text = ''
+    while len(text) < size:
+        text += paragraph()
+    
+    # Правки как у живого автора: замена слова, новый абзац, удаление абзаца
+    texts = [text]
+    for _ in range(revisions - 1):
+        paragraphs = text.split('\n\n')
+        index = rng.randrange(len(paragraphs))
+        action = rng.random()
+        if action < 0.7:
+            tokens = paragraphs[index].split(' ')
+            tokens[rng.randrange(len(tokens))] = rng.choice(words)
+            paragraphs[index] = ' '.join(tokens)
+        elif action < 0.9:
+            paragraphs.insert(index, paragraph().strip())
+        elif len(paragraphs) > 2:
+            del paragraphs[index]
+        text = '\n\n'.join(paragraphs)
+        texts.append(text)
+    
+    full_bytes = sum(len(t.encode('utf-8')) for t in texts)
+    click.echo(f"Версий: {revisions}, средний размер текста: {full_bytes // revisions} байт, кодек: {codec}")
+    click.echo(f"{'N':>4} {'байт/версию':>12} {'от полной копии':>16} {'сборка худшей, мс':>18}")
+    
+    for interval in (1, 4, 8, 16, 32, 64):
+        entries = []
+        started = time.perf_counter()
+        for index, current in enumerate(texts):
+            if index % interval == 0:
+                payload = encode_keyframe(current, codec)
+            else:
+                payload = encode_delta(make_delta(texts[index - 1], current), codec)
+            entries.append(ArticleRevision(
+                revision=index + 1,
+                is_keyframe=index % interval == 0,
+                codec=codec,
+                payload=payload
+            ))
+        encode_ms = (time.perf_counter() - started) * 1000
+        stored = sum(len(entry.payload) for entry in entries)
+        
+        # Худший случай - последняя версия перед очередным ключевым кадром
+        worst = min(interval, revisions) - 1
+        chain = entries[:worst + 1]
+        started = time.perf_counter()
+        for _ in range(20):
+            assert restore(chain) == texts[worst]
+        restore_ms = (time.perf_counter() - started) * 1000 / 20
+        
+        click.echo(
+            f"{interval:>4} {stored // revisions:>12} {stored / full_bytes:>15.1%} {restore_ms:>18.2f}"
+            f"   (запись цепочки: {encode_ms:.0f} мс)"
+        )
+
+
+@cli.command()
+@click.argument('path', type=click.Path(dir_okay=False, writable=True, allow_dash=True))
+@click.option('--batch-size', default=1000, show_default=True, help='Строк на один fetch серверного курсора')
+def export_articles(path, batch_size):
+    """Экспорт статей в NDJSON (PATH или - для stdout)"""
+    import asyncio
+    from app.core.database import AsyncSessionLocal
+    from app.services.article_transfer import export_articles as _export
+    
+    async def _export_articles():
+        with click.open_file(path, 'w', encoding='utf-8') as out:
+            async with AsyncSessionLocal() as db:
+                count = await _export(db, out, batch_size)
+        click.echo(f"Экспортировано статей: {count}", err=True)
+    
+    asyncio.run(_export_articles())
+
+
+@cli.command()
+@click.argument('path', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option('--batch-size', default=1000, show_default=True, help='Статей в одном многострочном INSERT')
+@click.option('--default-author', default=None, help='Username для статей с неизвестным автором')
+def import_articles(path, batch_size, default_author):
+    """Импорт статей из NDJSON (PATH или - для stdin)"""
+    import asyncio
+    from app.core.database import AsyncSessionLocal
+    from app.core.redis import close_redis
+    from app.services.article_transfer import import_articles as _import
+    
+    async def _import_articles():
+        with click.open_file(path, 'r', encoding='utf-8') as lines:
+            async with AsyncSessionLocal() as db:
+                try:
+                    stats = await _import(db, lines, batch_size, default_author)
+                except ValueError as e:
+                    raise click.ClickException(str(e))
+                finally:
+                    await close_redis()
+        click.echo(
+            f"Импортировано: {stats['imported']}, пропущено: {stats['skipped']}, "
+            f"новых тегов: {stats['tags_created']}"
+        )
+    
+    asyncio.run(_import_articles())
+
+
+@cli.command()
+@click.option('--articles', default=20000, show_default=True, help='Статей в синтетическом корпусе')
+@click.option('--queries', default=300, show_default=True, help='Число запросов')
+@click.option('--words', default=2, show_default=True, help='Слов в запросе')
+def benchmark_search(articles, queries, words):
+    """Бенчмарк поиска на временной SQLite-базе: BM25-индекс против FTS5"""
+    import asyncio
+    import random
+    import statistics
+    import tempfile
+    import time
+    from datetime import datetime, timezone
+    from sqlalchemy import insert
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from app.models.article import Article, ArticleStatus, ArticleVisibility
+    from app.models.user import User
+    from types import SimpleNamespace
+    from app.services.search_index import ANALYZER, BM25Index, document_tokens, stem
+    from app.services.search_service import SearchService
+    
+    rng = random.Random(42)
+    vocabulary = [''.join(rng.choice('абвгдеёжзиклмнопрстуфхцчшщэюя') for _ in range(rng.randint(3, 10)))
+                  for _ in range(30000)]
+    # Частоты слов по закону Ципфа, как в живом тексте
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    
+    def text(count):
+        return ' '.join(rng.choices(vocabulary, weights, k=count))
+    
+    async def _benchmark_search():
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            
+            rows = [
+                {
+                    "title": text(rng.randint(3, 8)),
+                    "slug": f"bench-{i}",
+                    "subtitle": None,
+                    "excerpt": text(20),
+                    "content": text(rng.randint(200, 1500)),
+                    "status": ArticleStatus.PUBLISHED,
+                    "visibility": ArticleVisibility.PUBLIC,
+                    "published_at": datetime.now(timezone.utc),
+                }
+                for i in range(articles)
+            ]
+            
+            async with AsyncSession(engine) as db:
+                author = User(username="bench", email="bench@example.com", hashed_password="-")
+                db.add(author)
+                await db.flush()
+                started = time.perf_counter()
+                for start in range(0, len(rows), 1000):
+                    await db.execute(
+                        insert(Article.__table__),
+                        [dict(row, author_id=author.id) for row in rows[start:start + 1000]]
+                    )
+                await db.commit()
+                sql_build = time.perf_counter() - started
+                
+                started = time.perf_counter()
+                documents = [(i + 1, document_tokens(SimpleNamespace(**row))) for i, row in enumerate(rows)]
+                analyze_time = time.perf_counter() - started
+                index = BM25Index.build(documents)
+                index.save(f"{tmp}/index.bin")
+                index = BM25Index.open(f"{tmp}/index.bin")
+                bm25_build = time.perf_counter() - started
+                click.echo(
+                    f"Статей: {articles}; вставка с FTS5-триггерами: {sql_build:.1f} с, "
+                    f"построение BM25: {bm25_build:.1f} с "
+                    f"({len(index.terms)} слов, {len(index.post_docs)} постингов)"
+                )
+                click.echo(
+                    f"Нормализация слов ({ANALYZER}): {articles / analyze_time:.0f} статей/с, "
+                    f"индексация целиком: {articles / bm25_build:.0f} статей/с"
+                )
+                
+                # Запросы из слов средней частоты: у самых частых огромные списки
+                samples = [rng.sample(vocabulary[50:3000], words) for _ in range(queries)]
+                service = SearchService(db)
+                timings = {"FTS5": [], "BM25": []}
+                overlap = []
+                for terms in samples:
+                    started = time.perf_counter()
+                    sql_hits = await service.ranked_ids(' '.join(terms), terms, 20, None)
+                    timings["FTS5"].append(time.perf_counter() - started)
+                    
+                    started = time.perf_counter()
+                    bm25_hits = index.search([stem(term) for term in terms], 20)
+                    timings["BM25"].append(time.perf_counter() - started)
+                    
+                    if sql_hits:
+                        top = {article_id for article_id, _ in sql_hits[:10]}
+                        overlap.append(len(top & {article_id for article_id, _ in bm25_hits[:10]}) / len(top))
+            await engine.dispose()
+        
+        click.echo(f"{'движок':>8} {'среднее, мс':>12} {'p50, мс':>9} {'p95, мс':>9} {'запросов/с':>11}")
+        for name, values in timings.items():
+            values.sort()
+            mean = statistics.fmean(values)
+            click.echo(
+                f"{name:>8} {mean * 1000:>12.2f} {values[len(values) // 2] * 1000:>9.2f} "
+                f"{values[int(len(values) * 0.95)] * 1000:>9.2f} {1 / mean:>11.0f}"
+            )
+        if overlap:
+            click.echo(f"Совпадение top-10 с FTS5: {statistics.fmean(overlap):.0%}")
+    
+    asyncio.run(_benchmark_search())
+
+
+@cli.command()
+@click.option('--workers', default=os.cpu_count() or 1, show_default=True, help='Процессов, строящих индекс')
+@click.option('--chunk-size', default=5000, show_default=True, help='Статей в одном диапазоне id')
+def reindex_search(workers, chunk_size):
+    """Перестройка поискового индекса без остановки поиска (с атомарной подменой)"""
+    import asyncio
+    import time
+    from app.core.redis import close_redis
+    from app.services.search_reindex import reindex_search as _reindex
+    
+    started = time.perf_counter()
+    
+    def progress(done, total):
+        elapsed = time.perf_counter() - started
+        click.echo(f"\r{done}/{total} статей, {done / elapsed if elapsed else 0:.0f} статей/с", nl=False)
+    
+    async def _reindex_search():
+        try:
+            return await _reindex(workers, chunk_size, progress)
+        finally:
+            await close_redis()
+    
+    try:
+        result = asyncio.run(_reindex_search())
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(
+        f"\nИндекс {result['backend']} перестроен: {result['articles']} статей за {result['seconds']:.1f} с "
+        f"({result['articles'] / result['seconds'] if result['seconds'] else 0:.0f} статей/с)"
+    )
+
+
 @cli.command()
 def run_tests():
     """Запуск тестов"""
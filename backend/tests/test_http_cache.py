@@ -0,0 +1,38 @@
+"""
+Валидаторы условных GET: ETag представлений в разных кодировках
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.http_cache import encoded_etag, is_not_modified, make_etag
+
+
+def request(**headers):
+    return SimpleNamespace(headers={name.replace("_", "-"): value for name, value in headers.items()})
+
+
+def test_encoded_etag_differs_per_encoding():
+    etag = make_etag("article", 1)
+    variants = {encoded_etag(etag, encoding) for encoding in (None, "identity", "br", "gzip")}
+    assert len(variants) == 3
+    assert encoded_etag(etag, "br") == etag[:-1] + '-br"'
+
+
+def test_weak_etag_is_shared_by_encodings():
+    etag = make_etag("article", 1, weak=True)
+    assert etag.startswith('W/"')
+    assert encoded_etag(etag, "br") == etag
+
+
+@pytest.mark.parametrize("encoding", [None, "br", "gzip"])
+def test_any_encoding_of_etag_matches(encoding):
+    etag = make_etag("article", 1)
+    assert is_not_modified(request(if_none_match=encoded_etag(etag, encoding)), etag)
+    assert is_not_modified(request(if_none_match='"other", W/' + encoded_etag(etag, encoding)), etag)
+
+
+def test_other_etag_does_not_match():
+    etag = make_etag("article", 1)
+    assert not is_not_modified(request(if_none_match=encoded_etag(make_etag("article", 2), "br")), etag)
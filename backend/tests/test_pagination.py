@@ -0,0 +1,42 @@
+"""
+Курсоры keyset-пагинации
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from app.core.pagination import decode_cursor, encode_cursor
+
+
+def test_round_trip_datetime_and_id():
+    published_at = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    cursor = encode_cursor(published_at, 42)
+    assert decode_cursor(cursor, datetime, int) == [published_at, 42]
+
+
+def test_round_trip_score_and_id():
+    cursor = encode_cursor(3.25, 7)
+    assert decode_cursor(cursor, float, int) == [3.25, 7]
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor("ключ?&/=", 10 ** 12)
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+    assert decode_cursor(cursor, str, int) == ["ключ?&/=", 10 ** 12]
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "%%%", encode_cursor({"a": 1}, 1)])
+def test_malformed_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, datetime, int)
+
+
+def test_wrong_arity():
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(1, 2, 3), int, int)
+
+
+def test_wrong_value_type():
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("yesterday", 1), datetime, int)
@@ -0,0 +1,84 @@
+"""
+История версий: текстовые дельты и сборка текста из ключевого кадра и дельт
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.textdiff import apply_delta, make_delta
+from app.services.revision_service import (
+    RevisionService, compress, decompress, encode_delta, encode_keyframe, restore
+)
+
+VERSIONS = [
+    "# Заголовок\n\nПервый абзац.\n",
+    "# Заголовок\n\nПервый абзац, исправленный.\n",
+    "# Новый заголовок\n\nПервый абзац, исправленный.\n\nВторой абзац.\n",
+    "Второй абзац.\n",
+    "",
+    "Текст с нуля\nи ещё строка\n",
+]
+
+
+@pytest.mark.parametrize("old, new", list(zip(VERSIONS, VERSIONS[1:])))
+def test_delta_round_trip(old, new):
+    assert apply_delta(old, make_delta(old, new)) == new
+
+
+def test_delta_of_unchanged_text_is_empty():
+    assert make_delta(VERSIONS[2], VERSIONS[2]) == []
+
+
+def test_large_replaced_block_round_trip():
+    old = "a" * 5000 + "\nконец\n"
+    new = "b" * 5000 + "\nконец\n"
+    assert apply_delta(old, make_delta(old, new)) == new
+
+
+@pytest.mark.parametrize("ops", [[10], [-10], [True], [1.5]])
+def test_delta_that_does_not_fit(ops):
+    with pytest.raises(ValueError):
+        apply_delta("abc", ops)
+
+
+@pytest.mark.parametrize("best", [False, True])
+def test_compress_round_trip(best):
+    data = "текст ".encode("utf-8") * 100
+    assert decompress(compress(data, "zlib", best), "zlib") == data
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        compress(b"data", "lz4")
+
+
+def chain(versions, keyframe_every, codec="zlib"):
+    """Записи версий так, как их хранит RevisionService"""
+    entries = []
+    for revision, text in enumerate(versions, start=1):
+        is_keyframe = (revision - 1) % keyframe_every == 0
+        payload = (
+            encode_keyframe(text, codec) if is_keyframe
+            else encode_delta(make_delta(versions[revision - 2], text), codec)
+        )
+        entries.append(SimpleNamespace(revision=revision, is_keyframe=is_keyframe, codec=codec, payload=payload))
+    return entries
+
+
+def test_restore_from_keyframe_and_deltas():
+    assert restore(chain(VERSIONS, keyframe_every=len(VERSIONS))) == VERSIONS[-1]
+
+
+@pytest.mark.parametrize("keyframe_every", [1, 2, 4, 100])
+def test_restore_every_revision(keyframe_every):
+    entries = chain(VERSIONS, keyframe_every)
+    for revision, text in enumerate(VERSIONS, start=1):
+        assert RevisionService._restore_from(entries, revision) == text
+
+
+def test_restore_requires_keyframe():
+    with pytest.raises(ValueError):
+        restore(chain(VERSIONS, keyframe_every=100)[1:])
+    with pytest.raises(ValueError):
+        restore([])
@@ -0,0 +1,34 @@
+"""
+Нормализация поисковых запросов для ключа кэша
+"""
+
+import pytest
+
+from app.services.search_cache import normalize_query, query_key
+
+
+def key(q: str) -> str:
+    return query_key(normalize_query(q))
+
+
+def test_word_order_does_not_matter():
+    assert key("Python  asyncio") == key("asyncio python") == "asyncio python"
+
+
+def test_or_groups_are_commutative():
+    assert key("a or b") == key("b OR a") == "a or b"
+    assert key("x y or z") == key("z or y x") == "x y or z"
+
+
+def test_and_binds_tighter_than_or():
+    assert key("a b or c") != key("a or b c")
+
+
+def test_duplicates_collapse():
+    assert key("b a b") == "a b"
+    assert key("a or b or a") == "a or b"
+
+
+@pytest.mark.parametrize("q", ['"event loop" python', "python -django", "or python", "python or", "a or or b"])
+def test_kept_verbatim(q):
+    assert key(q) == normalize_query(q)
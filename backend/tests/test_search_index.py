@@ -0,0 +1,89 @@
+"""
+Встроенный поисковый индекс BM25: инкрементальное обновление, слияние
+частей и постраничная выдача по (score, id)
+"""
+
+import pytest
+
+from app.services.search_index import BM25Index
+
+DOCUMENTS = [
+    (1, ["python", "asyncio", "event", "loop"]),
+    (2, ["python", "python", "typing"]),
+    (3, ["rust", "ownership", "borrow"]),
+    (4, ["python", "asyncio", "tasks", "asyncio"]),
+    (5, ["go", "goroutine", "channel"]),
+    (6, ["python", "packaging"]),
+    (7, ["asyncio", "python", "event", "loop"]),
+    (8, ["python", "typing", "generics", "python"]),
+]
+
+QUERIES = [["python"], ["asyncio"], ["python", "asyncio"], ["event", "loop"], ["rust"], ["missing"]]
+
+
+def assert_same_results(actual: BM25Index, expected: BM25Index) -> None:
+    assert len(actual) == len(expected)
+    for query in QUERIES:
+        got = actual.search(query, limit=100)
+        want = expected.search(query, limit=100)
+        assert [article_id for article_id, _ in got] == [article_id for article_id, _ in want]
+        assert [score for _, score in got] == pytest.approx([score for _, score in want])
+
+
+def test_update_matches_full_build():
+    index = BM25Index.build(DOCUMENTS[:5]).update(DOCUMENTS[5:], removed=())
+    assert_same_results(index, BM25Index.build(DOCUMENTS))
+
+
+def test_update_replaces_and_removes_documents():
+    changed = (2, ["rust", "python"])
+    index = BM25Index.build(DOCUMENTS).update([changed], removed=[5])
+
+    expected = [changed if article_id == 2 else (article_id, tokens)
+                for article_id, tokens in DOCUMENTS if article_id != 5]
+    assert_same_results(index, BM25Index.build(expected))
+    assert index.search(["goroutine"], limit=10) == []
+
+
+def test_merge_matches_full_build():
+    parts = [BM25Index.build(DOCUMENTS[:3]), BM25Index.build(DOCUMENTS[3:6]), BM25Index.build(DOCUMENTS[6:])]
+    assert_same_results(BM25Index.merge(parts), BM25Index.build(DOCUMENTS))
+
+
+def test_merge_of_nothing_is_empty():
+    index = BM25Index.merge([])
+    assert len(index) == 0
+    assert index.search(["python"], limit=10) == []
+
+
+def test_results_are_ordered_by_score_then_id():
+    results = BM25Index.build(DOCUMENTS).search(["python"], limit=100)
+    assert results == sorted(results, key=lambda result: (-result[1], -result[0]))
+
+
+def test_keyset_pages_cover_results_without_gaps():
+    # Одинаковые документы дают одинаковый счёт - страницы режут группы равных
+    documents = DOCUMENTS + [(article_id, ["python", "draft"]) for article_id in range(10, 20)]
+    index = BM25Index.build(documents)
+    expected = index.search(["python"], limit=100)
+
+    pages, after = [], None
+    while True:
+        page = index.search(["python"], limit=3, after=after)
+        if not page:
+            break
+        assert len(page) <= 3
+        pages.extend(page)
+        article_id, score = page[-1]
+        after = (score, article_id)
+
+    assert pages == expected
+
+
+def test_save_and_open_round_trip(tmp_path):
+    path = tmp_path / "index.bin"
+    index = BM25Index.build(DOCUMENTS)
+    index.save(str(path))
+
+    assert_same_results(BM25Index.open(str(path)), index)
+    assert BM25Index.open(str(tmp_path / "missing.bin")) is None